@@ -1,27 +1,133 @@
+import time
+# start timing before anything else is imported, so the timeline covers importing too.
+from psomi.utils.startup import StartupTimeline
+startup = StartupTimeline()
+
+import argparse
 import datetime
 import json
-import time
+import os
 import discord
-import aiohttp
 from discord import RawReactionActionEvent
 from discord.ext import tasks
 
 from psomi.commands import command_groups
-from psomi.utils.bot import PsomiBot
-from psomi.utils.parsing import parse_message
-from psomi.errors import NotFoundError
+from psomi.errors import OverloadedError
+from psomi.launcher import EXIT_FATAL
+from psomi.utils.admission import Priority
+from psomi.utils.bot import PsomiBot, ShardedPsomiBot
+from psomi.utils.metrics import MetricsExporter
+from psomi.utils.proxying import handle_message
+from psomi.utils.sharding import shard_status, write_status
+from psomi.utils.tracing import QueryTracer
 from psomi.utils.reactions import edit_reaction
+startup.mark("imports")
+
+# these are only ever passed by the launcher (python -m psomi.launcher), when running as one of its workers.
+parser = argparse.ArgumentParser(prog="python -m psomi", description="Run PSOMI.v2.")
+parser.add_argument("--worker", type=int, help="This worker's ID.")
+parser.add_argument("--shard-ids", type=lambda x: [int(_) for _ in x.split(",")],
+                    help="Comma separated IDs of the shards this worker owns.")
+parser.add_argument("--shard-count", type=int, help="The total amount of shards, across every worker.")
+parser.add_argument("--status-dir", default="shard-status", help="Where every worker writes its status.")
+args = parser.parse_args()
 
 intents = discord.Intents.default() #Defining intents
 intents.message_content = True # Adding the message_content intent so that the bot can read user messages
-bot = PsomiBot(command_prefix="p!", db_path="database.db", wc_path="wccache.db", intents=intents)
+
+with open("config.json", "r") as f:
+    config = json.load(f)
+
+storage_config = config.get("storage", {})
+storage_engine = storage_config.get("engine", "sqlite")
+references_config = config.get("references", {})
+gateway_config = config.get("gateway", {})
+webhooks_config = config.get("webhooks", {})
+snapshot_config = config.get("snapshot", {})
+proxying_config = config.get("proxying", {})
+admission_config = config.get("admission", {})
+stats_config = config.get("stats", {})
+if storage_engine == "memory" and args.shard_ids is not None:
+    # the memory engine's journal can only ever have a single writer.
+    print("The memory storage engine can't be shared between workers! Use the SQLite engine instead.")
+    raise SystemExit(EXIT_FATAL) # so the launcher doesn't keep restarting us
+
+bot_kwargs = dict(
+    command_prefix="p!",
+    db_path=config.get("db", "database.db"),
+    wc_path="wccache.db",
+    intents=intents,
+    storage_engine=storage_engine,
+    reference_store_bytes=references_config.get("max_bytes", 4 * 1024 * 1024),
+    fetch_references=references_config.get("fetch_on_miss", True),
+    # replies are quoted from the (much leaner) reference store, so py-cord's own message cache can stay small.
+    max_messages=references_config.get("message_cache", 100),
+    # requesting every guild's members delays becoming ready (by a lot, on larger guilds), and we don't need them.
+    chunk_guilds_at_startup=gateway_config.get("chunk_guilds_at_startup", False),
+    guild_ready_timeout=gateway_config.get("guild_ready_timeout", 2.0),
+    startup=startup,
+    prefetch_webhooks=webhooks_config.get("prefetch", True),
+    precreate_webhooks=webhooks_config.get("precreate_recent", False),
+    proxy_queue_size=proxying_config.get("queue_size", 100),
+    proxy_concurrency=proxying_config.get("concurrency"),
+    admission_limits={
+        Priority[name.upper()]: limit for name, limit in admission_config.get("limits", {}).items()
+    },
+    lag_threshold=admission_config.get("lag_threshold", 0.25),
+    depth_threshold=admission_config.get("depth_threshold", 200),
+    per_guild_stats=stats_config.get("per_guild", True),
+    change_retention=storage_config.get("change_retention", 60 * 60),
+    # SQL tracing is opt-in, as it adds a fair bit of overhead to every query.
+    query_tracer=QueryTracer(
+        slow_threshold=config["tracing"].get("slow_threshold", 0.05)
+    ) if config.get("tracing", {}).get("enabled") else None
+)
+if snapshot_config.get("enabled", True):
+    snapshot_path = snapshot_config.get("path", "cache-snapshot.json")
+    if args.worker is not None:
+        # every worker has caches of its own.
+        root, ext = os.path.splitext(snapshot_path)
+        snapshot_path = f"{root}-{args.worker}{ext}"
+    bot_kwargs.update(
+        snapshot_path=snapshot_path,
+        # recently seen messages include their content, which is only ever written to disk if opted into.
+        snapshot_references=snapshot_config.get("references", False),
+        snapshot_max_age=snapshot_config.get("max_age", 24 * 60 * 60)
+    )
+if args.shard_ids is not None:
+    bot = ShardedPsomiBot(
+        shard_ids=args.shard_ids,
+        shard_count=args.shard_count,
+        worker_id=args.worker,
+        status_dir=args.status_dir,
+        **bot_kwargs
+    )
+else:
+    bot = PsomiBot(**bot_kwargs)
+
+metrics_file = config.get("metrics", {}).get("file")
+metrics_port = config.get("metrics", {}).get("port")
+if bot.worker_id is not None:
+    # every worker exports its own metrics, so they can't share a file or port.
+    if metrics_file:
+        root, ext = os.path.splitext(metrics_file)
+        metrics_file = f"{root}-{bot.worker_id}{ext}"
+    if metrics_port is not None:
+        metrics_port += bot.worker_id
+metrics_exporter = MetricsExporter(
+    bot.metrics,
+    file_path=metrics_file,
+    interval=config.get("metrics", {}).get("interval", 15.0),
+    http_host=config.get("metrics", {}).get("host", "127.0.0.1"),
+    http_port=metrics_port
+)
 
 @bot.event
 async def on_ready():
-    print("Performing initial stress-test...")
-    result = bot.preform_stress_test()
-    print(f"Finished user bulk-test in: {result["user_time"]} seconds ({result["user_count"]} constructed)!")
-    print(f"Finished mass bulk-test in: {result["mass_time"]} seconds ({result["mass_count"]} constructed)!")
+    startup.mark("ready")
+    print("Warming up and performing initial health probe (in the background)...")
+    bot.loop.create_task(report_health_probe())
+    await metrics_exporter.start()
 
     await bot.change_presence(
         activity=discord.Activity(
@@ -30,116 +136,43 @@ async def on_ready():
         )
     )
 
-    clear_webhooks.start()
+    if bot.worker_id is not None and not report_status.is_running():
+        report_status.start()
+    # even a lone instance might share its database with admin tools.
+    if not sync_database.is_running():
+        sync_database.start()
+    if not write_back.is_running():
+        write_back.start()
+    # the webhook cache (and proxy stats) are shared, so only one worker needs to purge (or compact) them.
+    if bot.worker_id in (None, 0) and not clear_webhooks.is_running():
+        clear_webhooks.start()
+    if bot.worker_id in (None, 0) and not compact_stats.is_running():
+        compact_stats.start()
+    if bot.worker_id in (None, 0) and not prune_changes.is_running():
+        prune_changes.start()
+
+async def report_health_probe():
+    result = await bot.warm_up()
+    if result is None:
+        return
+    print(f"Finished health probe in: {result["probe_time"]} seconds ({result["user_count"]} users sampled)!")
+    print(f"get_user p50/p95/p99: {result["get_user"]["p50"]}/{result["get_user"]["p95"]}/"
+          f"{result["get_user"]["p99"]} seconds")
+    print(f"get_character p50/p95/p99: {result["get_character"]["p50"]}/{result["get_character"]["p95"]}/"
+          f"{result["get_character"]["p99"]} seconds")
 
 @bot.event
 async def on_raw_reaction_add(payload: RawReactionActionEvent):
     if str(payload.emoji) == "📝":
-        await edit_reaction(bot, payload)
-
-@bot.event
-async def on_message(message: discord.Message):
-    if message.author.bot:
-        return
-
-    try:
-        user = bot.database.get_user(str(message.author.id))
-    except NotFoundError: # user isn't in the database, we don't need to continue
-        await bot.process_commands(message)
-        return
-
-    try:
-        channel_webhooks = await bot.http.channel_webhooks(message.channel.id)
-    except discord.errors.NotFound:
-        return
-    
-    psomi_webhook = None
-    for hook in channel_webhooks:
-        if hook.get("name", None) == bot.webhook_name:
-            psomi_webhook = hook
-            break
-    if not psomi_webhook:
-        psomi_webhook = await bot.http.create_webhook(message.channel.id, name=bot.webhook_name)
-
-    psomi_webhook_id = psomi_webhook.get("id")
-    psomi_webhook_token = psomi_webhook.get("token")
-    psomi_webhook_url = f"https://discord.com/api/webhooks/{psomi_webhook_id}/{psomi_webhook_token}"
-
-    if not psomi_webhook_token:
-        await message.channel.send("Webhook error! Please contact the instance owner!")
-        raise AttributeError(f"Failed to retrieve token for webhook under the name '{bot.webhook_name}!'"
-                             f" Something is wrong!")
-
-    parsed_message = parse_message(user, message.content)
-
-    # do on_message based character updates
-    for character in parsed_message:
-        # get the updated Character class...
-        updated_character = bot.database.update_character(
-            user, character["character"], "proxy_count", character["character"].proxy_count + 1
-        )
-        # then update it across the entire list.
-        for i, _ in enumerate(parsed_message):
-            if _["character"].name == updated_character.name:
-                parsed_message[i] = {"character": updated_character, "message": _["message"]}
-
-
-    async with aiohttp.ClientSession() as session:
-        for i, character in enumerate(parsed_message):
-            character_webhook = discord.Webhook.from_url(psomi_webhook_url, session=session)
-            character_content: str = '\n'.join(character["message"])
-            prefix, suffix = character["character"].prefix.split("text")
-
-            if prefix:
-                character_content = character_content.removeprefix(prefix)
-            if suffix:
-                character_content = character_content.removesuffix(suffix)
-
-            # construct reference
-            if i == 0 and message.reference:
-                try:
-                    referenced_message = message.reference.cached_message
-                    replied_user = referenced_message.author
-                    referenced_content = referenced_message.content
-                    referenced_content = referenced_content.split("\n")
-
-                    # Get rid of the last reply to make it look cleaner.
-                    for i, _ in enumerate(referenced_content):
-                        if _.startswith("> "):
-                            referenced_content.remove(_)
-
-                    replied_content = " ".join(referenced_content)
-                    replied_content = replied_content.replace(
-                        "\n", " "
-                    )
-                    # print(referenced_message)
-                    channel_id = referenced_message.channel.id
-                    message_id = referenced_message.id
-
-                    character_content = (
-                        f"> {replied_content}\n{replied_user.mention} - [Jump](<https://discord.com/channels/@me/{channel_id}/{message_id}>)\n"
-                        + character_content
-                    )
-                except AttributeError:
-                    pass
-
-            proxied_message = await character_webhook.send(
-                character_content,
-                username=character["character"].name,
-                avatar_url=character["character"].avatar if character["character"].avatar else discord.MISSING,
-                wait=True
-            )
-
-            bot.webhook_cache.add_user_webhook(user, str(proxied_message.id), character_webhook.url)
-            # await asyncio.sleep(0.2)
-
-    if parsed_message:
         try:
-            await message.delete()
-        except discord.errors.NotFound: # message doesn't exist anymore, no need to do anything
+            async with bot.admission.admit(Priority.REACTION):
+                await edit_reaction(bot, payload)
+        except OverloadedError: # they can always react again once things calm down
             pass
 
-    await bot.process_commands(message)
+@bot.event
+async def on_message(message: discord.Message):
+    await handle_message(bot, message)
 
 @tasks.loop(minutes=1)
 async def clear_webhooks():
@@ -152,20 +185,82 @@ async def clear_webhooks():
     if now.hour != run_at.hour or now.minute != run_at.minute or now.strftime("%A") not in run_at_day:
         return
 
-    print("Running Webhook purge...")
-    purge_start = time.time()
-    for user_id in bot.database.get_all_user_ids():
-        user = bot.database.get_user(user_id)
-
-        bot.webhook_cache.purge_old_records(user, 50)
-    purge_end = time.time()-purge_start
+    try:
+        async with bot.admission.admit(Priority.BACKGROUND):
+            print("Running Webhook purge...")
+            purge_start = time.time()
+            for user_id in bot.database.get_all_user_ids():
+                user = bot.database.get_user(user_id)
+
+                bot.webhook_cache.purge_old_records(user, 50)
+            purge_end = time.time()-purge_start
+    except OverloadedError:
+        return
     print(f"Finished Webhook purge! (took {round(purge_end, 3)} seconds)")
 
+@tasks.loop(seconds=10)
+async def report_status():
+    try:
+        write_status(bot.status_dir, f"worker-{bot.worker_id}", {
+            "worker_id": bot.worker_id,
+            "pid": os.getpid(),
+            "shards": shard_status(bot),
+            "messages_seen": bot.metrics.counters.get("messages_seen", 0),
+        })
+    except OSError as e:
+        print(f"Failed to write worker status to '{bot.status_dir}'! ({e!r})")
+
+@tasks.loop(seconds=5)
+async def sync_database():
+    # other workers (or admin tools) may have registered users or changed their rosters since we last looked.
+    try:
+        async with bot.admission.admit(Priority.BACKGROUND):
+            stale = await bot.run_db(bot.database.sync)
+    except OverloadedError:
+        return
+    if stale:
+        bot.metrics.increment("database_syncs")
+        bot.metrics.increment("users_invalidated", len(stale))
+        bot.forget_users(stale)
+
+@tasks.loop(hours=1)
+async def prune_changes():
+    # every worker has long since synced these.
+    try:
+        async with bot.admission.admit(Priority.BACKGROUND):
+            await bot.run_db(bot.database.prune_changes)
+    except OverloadedError:
+        return
+
+@tasks.loop(seconds=30)
+async def write_back():
+    # fronts and proxy stats are changed in memory, and only written back every so often.
+    if not bot.database.pending_fronts and not bot.database.pending_proxy_stats:
+        return
+    try:
+        async with bot.admission.admit(Priority.BACKGROUND):
+            bot.metrics.increment("fronts_flushed", await bot.run_db(bot.database.flush_fronts))
+            bot.metrics.increment("proxy_stats_flushed", await bot.run_db(bot.database.flush_proxy_stats))
+    except OverloadedError:
+        return
+    except Exception as e: # they're kept around (and retried) until they make it
+        print(f"Failed to write back fronts and proxy stats! ({e!r})")
+
+@tasks.loop(hours=24)
+async def compact_stats():
+    try:
+        async with bot.admission.admit(Priority.BACKGROUND):
+            folded = await bot.run_db(bot.database.compact_proxy_stats, stats_config.get("keep_days", 90))
+    except OverloadedError:
+        return
+    if folded:
+        print(f"Compacted {folded} days of proxy stats into months!")
+
 if __name__ == "__main__":
     print(command_groups)
     for group in command_groups:
         bot.load_extension(group)
+    startup.mark("extensions")
 
 
-    with open("config.json", "r") as f:
-        bot.run(json.load(f)["token"])
+    bot.run(config["token"])
@@ -0,0 +1,9 @@
+"""
+PSOMI Benchmarks
+
+An offline benchmark suite, ran against synthetic databases. Use `python -m psomi.bench --help` for options.
+"""
+from psomi.bench.generator import generate_databases
+from psomi.bench.suite import run_benchmarks, compare_results, BENCHMARKS
+
+__all__ = ["generate_databases", "run_benchmarks", "compare_results", "BENCHMARKS"]
@@ -0,0 +1,66 @@
+import argparse
+import json
+import sys
+from psomi.bench.suite import run_benchmarks, compare_results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m psomi.bench",
+        description="Run PSOMI's offline benchmark suite against a synthetic database."
+    )
+    parser.add_argument("--users", type=int, default=200, help="How many Users to generate.")
+    parser.add_argument("--groups", type=int, default=5, help="How many ProxyGroups each User has.")
+    parser.add_argument("--characters", type=int, default=50, help="How many Characters each User has.")
+    parser.add_argument("--messages", type=int, default=100, help="How many message cache rows each User has.")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed iterations per benchmark.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed used for generation and sampling.")
+    parser.add_argument("--only", action="append", help="Only run benchmarks containing this (repeatable).")
+    parser.add_argument("--engine", default="sqlite", choices=["sqlite", "memory"],
+                        help="Which storage engine to benchmark. (default: sqlite)")
+    parser.add_argument("--workdir", help="Generate the databases here (and keep them) instead of a temp dir.")
+    parser.add_argument("--output", "-o", help="Write the JSON results to this file instead of stdout.")
+    parser.add_argument("--compare", help="A previous JSON result to compare against.")
+    parser.add_argument("--metric", default="p50", help="Which statistic to compare by. (default: p50)")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Slowdown ratio at which a benchmark counts as regressed. (default: 1.25)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        users=args.users,
+        groups_per_user=args.groups,
+        characters_per_user=args.characters,
+        messages_per_user=args.messages,
+        iterations=args.iterations,
+        seed=args.seed,
+        only=args.only,
+        workdir=args.workdir,
+        engine=args.engine,
+        progress=lambda name: print(f"Running {name}...", file=sys.stderr)
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, "r") as f:
+        baseline = json.load(f)
+
+    regressed = False
+    print(f"\nComparing {args.metric} against {baseline["meta"].get("commit")} (us):", file=sys.stderr)
+    for entry in compare_results(baseline, results, args.metric, args.threshold):
+        marker = " <- REGRESSION" if entry["regression"] else ""
+        regressed = regressed or entry["regression"]
+        print(f"  {entry["name"]:<36} {entry["before"]:>12} -> {entry["after"]:>12} (x{entry["ratio"]}){marker}",
+              file=sys.stderr)
+
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
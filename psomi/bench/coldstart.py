@@ -0,0 +1,300 @@
+import time
+# as early as possible, so that importing the rest counts towards the cold start.
+STARTED = time.perf_counter()
+STARTED_WALL = time.time()
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import types
+
+# modules that should only ever be imported once they're actually needed.
+LAZY_MODULES = ["rapidfuzz", "cachetools", "aiohttp.web"]
+STAGES = [
+    "interpreter", "imports", "construct", "login", "webhooks", "first_proxy", "warmup", "second_proxy",
+    "autocomplete", "total"
+]
+# everything up to (and including) the first proxied message.
+COLD_STAGES = ["interpreter", "imports", "construct", "login", "webhooks", "first_proxy"]
+# the webhook our (fake) channel already has, the same across every run like it would be across restarts.
+WEBHOOK_ID = 1_050_000_000_000_000_000
+WEBHOOK_TOKEN = "coldstart-webhook-token".ljust(68, "x") # shaped like a real one
+
+
+async def _measure(child: dict) -> dict:
+    timings = {}
+
+    # the same imports `python -m psomi` does before anything else.
+    import discord
+    from discord.http import Route
+    from psomi.commands import command_groups
+    from psomi.utils.autocomplete import chr_name_autocomplete
+    from psomi.utils.bot import PsomiBot
+    from psomi.utils.proxying import handle_message
+    from psomi.utils.startup import StartupTimeline
+    timings["imports"] = time.perf_counter() - STARTED
+
+    # setting up the fake API isn't part of PSOMI's startup, so it isn't timed.
+    from psomi.bench.fakediscord import FakeDiscord
+    fake = FakeDiscord(latency=child["api_latency"])
+    await fake.start()
+    original_base = Route.API_BASE_URL
+    Route.API_BASE_URL = fake.api_base
+    loaded_before = {_ for _ in LAZY_MODULES if _ in sys.modules}
+
+    now = time.perf_counter()
+    intents = discord.Intents.default()
+    intents.message_content = True
+    bot = PsomiBot(
+        command_prefix="p!", db_path=child["data_path"], wc_path=child["wc_path"], intents=intents,
+        storage_engine=child["engine"], chunk_guilds_at_startup=False, startup=StartupTimeline(STARTED, log=False),
+        snapshot_path=child.get("snapshot_path")
+    )
+    for group in command_groups:
+        bot.load_extension(group)
+    timings["construct"] = time.perf_counter() - now
+
+    try:
+        now = time.perf_counter()
+        await bot.login("fake.token")
+        timings["login"] = time.perf_counter() - now
+        loaded = sorted({_ for _ in LAZY_MODULES if _ in sys.modules} - loaded_before)
+
+        state = bot._connection
+        guild = discord.Guild(data={"id": "1000000000000000100", "name": "Guild"}, state=state)
+        state._add_guild(guild)
+        channel = discord.TextChannel(
+            state=state, guild=guild, data={"id": "100000000000000010000", "type": 0, "name": "channel", "position": 0}
+        )
+        guild._add_channel(channel)
+        fake.register_channel(channel.id, guild.id)
+        # like after any restart, our webhook is still around from last time.
+        fake.add_webhook(channel.id, bot.webhook_name, WEBHOOK_ID, WEBHOOK_TOKEN)
+        fake.reset_calls()
+
+        # the same as once ready, guilds restored from a snapshot are skipped.
+        now = time.perf_counter()
+        if child["prefetch"]:
+            await bot.prefetch_webhooks([_ for _ in bot.guilds if not bot.channel_webhooks.knows_guild(_.id)])
+        timings["webhooks"] = time.perf_counter() - now
+        startup_calls = fake.total_calls
+        fake.reset_calls()
+
+        author_id = child["author_id"]
+
+        def make_message(message_id: int) -> discord.Message:
+            return discord.Message(state=state, channel=channel, data={
+                "id": str(message_id), "type": 0, "channel_id": str(channel.id), "guild_id": str(guild.id),
+                "author": {"id": str(author_id), "username": "user", "discriminator": "0000", "avatar": None},
+                "content": child["content"], "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None,
+                "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+                "embeds": [], "pinned": False
+            })
+
+        # nothing has had a chance to warm up here, which is exactly what the first proxied message after a restart
+        # looks like.
+        now = time.perf_counter()
+        await handle_message(bot, make_message(1_200_000_000_000_000_000))
+        timings["first_proxy"] = time.perf_counter() - now
+        first_proxy_calls = fake.total_calls
+
+        now = time.perf_counter()
+        await bot.warm_up()
+        timings["warmup"] = time.perf_counter() - now
+
+        now = time.perf_counter()
+        await handle_message(bot, make_message(1_200_000_000_000_000_001))
+        timings["second_proxy"] = time.perf_counter() - now
+
+        # the first autocomplete after a restart would otherwise have to load the User's entire roster.
+        ctx = types.SimpleNamespace(
+            bot=bot, value=child["content"][:3], interaction=types.SimpleNamespace(user=types.SimpleNamespace(id=author_id))
+        )
+        now = time.perf_counter()
+        chr_name_autocomplete(ctx)
+        timings["autocomplete"] = time.perf_counter() - now
+    finally:
+        await bot.close()
+        Route.API_BASE_URL = original_base
+        await fake.stop()
+
+    return {
+        "started": STARTED_WALL,
+        "timings": timings,
+        "lazy_loaded_before_ready": loaded,
+        "startup_rest_calls": startup_calls,
+        "first_proxy_rest_calls": first_proxy_calls,
+        "snapshot": bot.snapshot_stats
+    }
+
+
+def _prepare(workdir: str, users: int, characters: int, seed: int) -> dict:
+    from psomi.bench.generator import generate_databases
+    from psomi.utils.data import Data
+
+    os.makedirs(workdir, exist_ok=True)
+    # anything left by a previous run (its databases were modified, and its snapshot taken of them) starts over.
+    for name in os.listdir(workdir):
+        if name.startswith(("database.db", "wccache.db", "cache-snapshot.json")):
+            os.remove(os.path.join(workdir, name))
+
+    data_path = os.path.join(workdir, "database.db")
+    wc_path = os.path.join(workdir, "wccache.db")
+    generated = generate_databases(data_path, wc_path, users, 3, characters, 0, seed)
+
+    author_id = generated["user_ids"][0]
+    data = Data(data_path)
+    try:
+        # suffix-only brackets never proxy, so make sure the first message will.
+        prefix, suffix = next(
+            _ for _ in (_.prefix.split("text") for _ in data.get_user(author_id).characters_flattened) if _[0]
+        )
+    finally:
+        data.close()
+    return {"data_path": data_path, "wc_path": wc_path, "author_id": int(author_id),
+            "content": f"{prefix}a cold start{suffix}"}
+
+
+def _run_child(child: dict) -> dict:
+    spawned = time.time()
+    process = subprocess.run(
+        [sys.executable, "-m", "psomi.bench.coldstart", "--child", json.dumps(child)],
+        capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Cold start run failed!\n{process.stderr}")
+    # in case anything else was printed, only the last line is ours.
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result["timings"]["interpreter"] = max(result["started"] - spawned, 0.0)
+    return result
+
+
+def run_cold_starts(
+        runs: int = 5,
+        users: int = 200,
+        characters: int = 50,
+        engine: str = "sqlite",
+        seed: int = 0,
+        workdir: str | None = None,
+        prefetch: bool = True,
+        api_latency: float = 0.0,
+        snapshot: bool = False
+) -> dict:
+    """
+    Measure PSOMI's cold start, by starting it up (against a fake Discord API) in a fresh interpreter several times.
+
+    :param runs: How many fresh interpreters to start.
+    :param users: How many Users to generate.
+    :param characters: How many Characters each User has.
+    :param engine: Which storage engine to start with.
+    :param seed: The seed used for generation.
+    :param workdir: Generate the databases here (and keep them) instead of a temp dir, replacing any from a previous
+        run. Created if need be.
+    :param prefetch: Whether to prefetch the guild's webhooks before the first proxy.
+    :param api_latency: How long (in seconds) the fake API should take to answer each request.
+    :param snapshot: Whether to warm-restart from a cache snapshot, written by an untimed run beforehand.
+    :return: Per-stage timings (in milliseconds) across every run.
+    :rtype: dict
+    """
+    from psomi.utils.timing import summarize
+
+    with tempfile.TemporaryDirectory(prefix="psomi-coldstart-") as tmp:
+        base_dir = workdir or tmp
+        prepared = _prepare(base_dir, users, characters, seed)
+        base = {**prepared, "engine": engine, "prefetch": prefetch, "api_latency": api_latency}
+        if snapshot:
+            # a run like any other, except that it leaves a snapshot (and its changes to the database) behind. the
+            # fake API's message IDs start over every run, so the message cache it fills is thrown away instead.
+            prime_dir = os.path.join(tmp, "prime")
+            os.makedirs(prime_dir)
+            _run_child({
+                **base,
+                "wc_path": shutil.copy(prepared["wc_path"], prime_dir),
+                "snapshot_path": os.path.join(base_dir, "cache-snapshot.json")
+            })
+
+        samples: dict[str, list[float]] = {_: [] for _ in STAGES}
+        lazy_loaded = set()
+        startup_calls = []
+        first_proxy_calls = []
+        restored = None
+        for i in range(runs):
+            # every run starts off the same (untouched) databases and snapshot, including whatever the memory
+            # engine or SQLite's WAL keep next to them.
+            run_dir = os.path.join(tmp, f"run-{i}")
+            os.makedirs(run_dir)
+            for name in os.listdir(base_dir):
+                if name.startswith(("database.db", "wccache.db", "cache-snapshot.json")):
+                    shutil.copy(os.path.join(base_dir, name), run_dir)
+            child = {
+                **base,
+                "data_path": os.path.join(run_dir, "database.db"),
+                "wc_path": os.path.join(run_dir, "wccache.db"),
+                "snapshot_path": os.path.join(run_dir, "cache-snapshot.json") if snapshot else None
+            }
+
+            result = _run_child(child)
+            timings = result["timings"]
+            timings["total"] = sum(timings[_] for _ in COLD_STAGES)
+            for stage in STAGES:
+                samples[stage].append(timings[stage] * 1000)
+            lazy_loaded.update(result["lazy_loaded_before_ready"])
+            startup_calls.append(result["startup_rest_calls"])
+            first_proxy_calls.append(result["first_proxy_rest_calls"])
+            restored = result["snapshot"]
+
+    return {
+        "params": {"runs": runs, "users": users, "characters": characters, "engine": engine, "seed": seed,
+                   "prefetch": prefetch, "api_latency": api_latency, "snapshot": snapshot},
+        "unit": "ms",
+        "stages": {stage: summarize(samples[stage], 3) for stage in STAGES},
+        "startup_rest_calls": max(startup_calls),
+        "first_proxy_rest_calls": max(first_proxy_calls),
+        "snapshot_restored": restored,
+        # anything listed here was imported while starting up, despite only being needed later on.
+        "lazy_loaded_before_ready": sorted(lazy_loaded)
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m psomi.bench.coldstart",
+        description="Measure PSOMI's cold start (imports, construction, login and first proxy) in fresh interpreters."
+    )
+    parser.add_argument("--runs", type=int, default=5, help="How many fresh interpreters to start.")
+    parser.add_argument("--users", type=int, default=200, help="How many Users to generate.")
+    parser.add_argument("--characters", type=int, default=50, help="How many Characters each User has.")
+    parser.add_argument("--engine", default="sqlite", choices=["sqlite", "memory"],
+                        help="Which storage engine to start with. (default: sqlite)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed used for generation.")
+    parser.add_argument("--workdir", help="Generate the databases here (and keep them) instead of a temp dir.")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file instead of stdout.")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Fake API latency per request (ms).")
+    parser.add_argument("--no-prefetch", action="store_true", help="Don't prefetch webhooks before the first proxy.")
+    parser.add_argument("--snapshot", action="store_true", help="Warm-restart from a cache snapshot.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_measure(json.loads(args.child)))))
+        return 0
+
+    report = run_cold_starts(
+        args.runs, args.users, args.characters, args.engine, args.seed, args.workdir, not args.no_prefetch,
+        args.api_latency / 1000, args.snapshot
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import asyncio
+import datetime
+import itertools
+import json
+import secrets
+from collections import Counter
+from aiohttp import web
+
+
+def _json_response(payload, status: int = 200) -> web.Response:
+    # py-cord only parses bodies whose content-type is exactly "application/json", without a charset.
+    return web.Response(body=json.dumps(payload).encode(), status=status, headers={"Content-Type": "application/json"})
+
+
+class FakeDiscord:
+    """
+    A local aiohttp server imitating the parts of Discord's REST API that PSOMI uses.
+
+    Only keeps enough state to answer consistently (created webhooks and the messages sent through them), while
+    counting every call it receives so that load tests can report REST calls per proxied message.
+    """
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        """
+        Initializes the fake API. Call `start` to begin serving.
+
+        :param latency: How long (in seconds) every request should take to be answered, imitating network latency.
+        :type latency: float
+        :param host: The host to bind to.
+        :type host: str
+        :param port: The port to bind to, or 0 to pick a free one.
+        :type port: int
+        """
+        self.latency = latency
+        self.host = host
+        self.port = port
+
+        self.calls: Counter = Counter()
+        self.webhooks: dict[int, list[dict]] = {} # channel id -> webhooks
+        self.channel_guilds: dict[int, int] = {} # channel id -> guild id
+        self.webhook_messages: dict[int, dict] = {} # message id -> message
+        self.deleted_messages: set[int] = set()
+
+        self.__snowflakes = itertools.count(1_100_000_000_000_000_000)
+        self.__runner: web.AppRunner | None = None
+
+    def snowflake(self) -> int:
+        return next(self.__snowflakes)
+
+    def register_channel(self, channel_id: int, guild_id: int):
+        """
+        Let the fake API know which guild a channel belongs to, so that guild-level endpoints can answer.
+        """
+        self.channel_guilds[channel_id] = guild_id
+
+    @property
+    def api_base(self) -> str:
+        """
+        :return: The base URL to use in place of Discord's, with py-cord's `{API_VERSION}` placeholder.
+        :rtype: str
+        """
+        return f"http://{self.host}:{self.port}/api/v{{API_VERSION}}"
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    async def start(self):
+        app = web.Application(middlewares=[self.__count_middleware])
+        app.add_routes([
+            web.get("/api/v{version}/users/@me", self.get_me),
+            web.get("/api/v{version}/channels/{channel_id}/webhooks", self.get_channel_webhooks),
+            web.post("/api/v{version}/channels/{channel_id}/webhooks", self.create_webhook),
+            web.get("/api/v{version}/guilds/{guild_id}/webhooks", self.get_guild_webhooks),
+            web.post("/api/v{version}/webhooks/{webhook_id}/{token}", self.execute_webhook),
+            web.patch("/api/v{version}/webhooks/{webhook_id}/{token}/messages/{message_id}", self.edit_message),
+            web.delete("/api/v{version}/channels/{channel_id}/messages/{message_id}", self.delete_message),
+        ])
+
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, self.host, self.port)
+        await site.start()
+        # find out which port was picked, in case it was left up to the OS.
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.__runner:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+    @web.middleware
+    async def __count_middleware(self, request: web.Request, handler):
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.calls[f"{request.method} {route}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    def __message_payload(self, message_id: int, channel_id: int, content: str, username: str, webhook_id: int):
+        return {
+            "id": str(message_id),
+            "type": 0,
+            "channel_id": str(channel_id),
+            "webhook_id": str(webhook_id),
+            "content": content,
+            "author": {"id": str(webhook_id), "username": username, "discriminator": "0000", "avatar": None,
+                       "bot": True},
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+        }
+
+    async def get_me(self, request: web.Request):
+        return _json_response({
+            "id": "1000000000000000001", "username": "psomi", "discriminator": "0000", "avatar": None, "bot": True
+        })
+
+    async def get_channel_webhooks(self, request: web.Request):
+        return _json_response(self.webhooks.get(int(request.match_info["channel_id"]), []))
+
+    async def get_guild_webhooks(self, request: web.Request):
+        guild_id = request.match_info["guild_id"]
+        return _json_response([
+            hook for hooks in self.webhooks.values() for hook in hooks if hook["guild_id"] == guild_id
+        ])
+
+    def add_webhook(self, channel_id: int, name: str, webhook_id: int | None = None, token: str | None = None) -> dict:
+        """
+        Create a webhook without going through the API, such as one left over from before a restart.
+        """
+        hook = {
+            "id": str(webhook_id or self.snowflake()),
+            "type": 1,
+            "name": name,
+            "channel_id": str(channel_id),
+            "guild_id": str(self.channel_guilds[channel_id]) if channel_id in self.channel_guilds else None,
+            "token": token or secrets.token_urlsafe(48), # real tokens are 68 characters long
+        }
+        self.webhooks.setdefault(channel_id, []).append(hook)
+        return hook
+
+    async def create_webhook(self, request: web.Request):
+        payload = await request.json()
+        return _json_response(self.add_webhook(int(request.match_info["channel_id"]), payload.get("name")))
+
+    async def execute_webhook(self, request: web.Request):
+        webhook_id = int(request.match_info["webhook_id"])
+        hook = next(
+            (_ for hooks in self.webhooks.values() for _ in hooks
+             if int(_["id"]) == webhook_id and _["token"] == request.match_info["token"]),
+            None
+        )
+        if hook is None:
+            return _json_response({"message": "Unknown Webhook", "code": 10015}, status=404)
+
+        if request.content_type == "multipart/form-data":
+            payload = {}
+            async for part in await request.multipart():
+                if part.name == "payload_json":
+                    payload = await part.json()
+        else:
+            payload = await request.json()
+
+        message = self.__message_payload(
+            self.snowflake(), int(hook["channel_id"]), payload.get("content", ""),
+            payload.get("username", hook["name"]), webhook_id
+        )
+        self.webhook_messages[int(message["id"])] = message
+
+        if request.query.get("wait", "false").lower() in ("true", "1"):
+            return _json_response(message)
+        return web.Response(status=204)
+
+    async def edit_message(self, request: web.Request):
+        message = self.webhook_messages.get(int(request.match_info["message_id"]))
+        if message is None:
+            return _json_response({"message": "Unknown Message", "code": 10008}, status=404)
+
+        payload = await request.json()
+        message["content"] = payload.get("content", message["content"])
+        return _json_response(message)
+
+    async def delete_message(self, request: web.Request):
+        self.deleted_messages.add(int(request.match_info["message_id"]))
+        return web.Response(status=204)
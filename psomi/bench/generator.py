@@ -0,0 +1,125 @@
+import random
+import sqlite3
+import uuid
+from psomi.utils.data import Data, WebhookCache
+
+_SYLLABLES = ["ka", "ri", "mo", "ne", "sa", "to", "lu", "vi", "an", "el", "or", "yu", "zen", "ha", "qi", "do"]
+
+
+def _random_name(rng: random.Random, index: int) -> str:
+    first = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    last = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 3))).capitalize()
+    return f"{first} {last} {index}"
+
+
+def _brackets(index: int) -> str:
+    """
+    Build unique brackets for the n-th Character of a User, cycling between prefix-only, prefix/suffix and
+    suffix-only styles.
+    """
+    tag = format(index, "x")
+    match index % 3:
+        case 0:
+            return f"{tag}:text"
+        case 1:
+            return f"[{tag}|text]"
+        case _:
+            return f"text-{tag}"
+
+
+def generate_databases(
+        data_path: str,
+        wc_path: str,
+        users: int,
+        groups_per_user: int,
+        characters_per_user: int,
+        messages_per_user: int,
+        seed: int = 0
+) -> dict:
+    """
+    Generate a synthetic PSOMI database (and message cache) to benchmark against.
+
+    Rows are bulk-inserted directly, as going through `Data` for every Character would take far longer than the
+    benchmarks themselves.
+
+    :param data_path: Where to create the database. Must not exist yet.
+    :type data_path: str
+    :param wc_path: Where to create the message (webhook) cache. Must not exist yet.
+    :type wc_path: str
+    :param users: How many Users to create.
+    :type users: int
+    :param groups_per_user: How many ProxyGroups each User should have.
+    :type groups_per_user: int
+    :param characters_per_user: How many Characters each User should have. Roughly a fifth stay Uncategorized.
+    :type characters_per_user: int
+    :param messages_per_user: How many message cache rows each User should have.
+    :type messages_per_user: int
+    :param seed: The seed for the random generator, so that runs are comparable.
+    :type seed: int
+    :return: A dict containing the generated User UUIDs, alongside the parameters used.
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+
+    # let the classes lay out the schema, so it always matches what PSOMI expects.
+    Data(data_path)
+    WebhookCache(wc_path)
+
+    user_rows, group_rows, character_rows, message_rows = [], [], [], []
+    for u in range(users):
+        did = str(100000000000000000 + u)
+        user_tid = str(uuid.UUID(int=rng.getrandbits(128)))
+        user_rows.append((user_tid, did))
+
+        group_tids = []
+        for g in range(groups_per_user):
+            group_tid = str(uuid.UUID(int=rng.getrandbits(128)))
+            group_tids.append(group_tid)
+            group_rows.append((group_tid, user_tid, f"Group {g}"))
+
+        for c in range(characters_per_user):
+            # leave roughly a fifth of every roster uncategorized.
+            if group_tids and rng.random() > 0.2:
+                group_tid = rng.choice(group_tids)
+            else:
+                group_tid = None
+            character_rows.append((
+                str(uuid.UUID(int=rng.getrandbits(128))),
+                group_tid,
+                user_tid,
+                _random_name(rng, c),
+                _brackets(c),
+                f"https://example.com/avatars/{u}/{c}.png" if rng.random() > 0.5 else None,
+                rng.randint(0, 5000)
+            ))
+
+        for m in range(messages_per_user):
+            message_rows.append((
+                str(uuid.UUID(int=rng.getrandbits(128))),
+                user_tid,
+                str(200000000000000000 + u * messages_per_user + m),
+                f"https://discord.com/api/webhooks/{u}/token"
+            ))
+
+    with sqlite3.connect(data_path) as conn:
+        conn.executemany("INSERT INTO users (tid, did) VALUES (?, ?)", user_rows)
+        conn.executemany("INSERT INTO proxy_groups (tid, user_tid, title) VALUES (?, ?, ?)", group_rows)
+        conn.executemany(
+            "INSERT INTO characters (tid, proxygroup_tid, user_tid, name, prefix, avatar, proxy_count) VALUES "
+            "(?, ?, ?, ?, ?, ?, ?)",
+            character_rows
+        )
+    with sqlite3.connect(wc_path) as conn:
+        conn.executemany(
+            "INSERT INTO messages (tid, author_tid, message_did, webhook_url) VALUES (?, ?, ?, ?)",
+            message_rows
+        )
+
+    return {
+        "user_ids": [_[1] for _ in user_rows],
+        "users": users,
+        "groups_per_user": groups_per_user,
+        "characters_per_user": characters_per_user,
+        "messages_per_user": messages_per_user,
+        "seed": seed
+    }
@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import discord
+from discord.http import Route
+from psomi.bench.fakediscord import FakeDiscord
+from psomi.bench.generator import generate_databases
+from psomi.utils.bot import PsomiBot
+from psomi.utils.data import User
+from psomi.utils.proxying import handle_message
+from psomi.utils.startup import StartupTimeline
+from psomi.utils.timing import summarize
+
+
+class LoadHarness:
+    """
+    Drives PSOMI's message handling end-to-end against a `FakeDiscord` API, entirely offline.
+
+    A real `PsomiBot` is logged into the fake API, with synthetic `discord.Message` events being dispatched to its
+    `on_message` handler, exactly like the gateway would.
+    """
+    def __init__(
+            self,
+            workdir: str,
+            users: int = 50,
+            characters_per_user: int = 20,
+            guilds: int = 2,
+            channels_per_guild: int = 5,
+            api_latency: float = 0.0,
+            seed: int = 0
+    ):
+        """
+        Initializes the harness. Use it as an async context manager to start (and stop) everything.
+
+        :param workdir: Where to generate the databases.
+        :param users: How many registered Users to generate.
+        :param characters_per_user: How many Characters each User has.
+        :param guilds: How many (fake) guilds to spread messages over.
+        :param channels_per_guild: How many channels each guild has.
+        :param api_latency: How long (in seconds) the fake API should take to answer each request.
+        :param seed: The seed used for generation and message synthesis.
+        """
+        self.workdir = workdir
+        self.users = users
+        self.characters_per_user = characters_per_user
+        self.guild_count = guilds
+        self.channels_per_guild = channels_per_guild
+        self.rng = random.Random(seed)
+        self.seed = seed
+
+        self.fake = FakeDiscord(latency=api_latency)
+        self.bot: PsomiBot | None = None
+        self.channels: list[discord.TextChannel] = []
+        self.rosters: list[User] = []
+
+        self.__original_base = Route.API_BASE_URL
+        self.__message_ids = iter(range(1_200_000_000_000_000_000, 1_300_000_000_000_000_000))
+        self.__injected: dict[int, float] = {}
+        self.__completed: dict[int, float] = {}
+        self.__errors = 0
+
+    async def __aenter__(self):
+        await self.fake.start()
+        Route.API_BASE_URL = self.fake.api_base
+
+        data_path = os.path.join(self.workdir, "database.db")
+        wc_path = os.path.join(self.workdir, "wccache.db")
+        generated = generate_databases(data_path, wc_path, self.users, 3, self.characters_per_user, 0, self.seed)
+
+        intents = discord.Intents.default()
+        intents.message_content = True
+        # the report is written to stdout, so keep the startup timeline quiet.
+        self.bot = PsomiBot(
+            command_prefix="p!", db_path=data_path, wc_path=wc_path, intents=intents,
+            startup=StartupTimeline(log=False)
+        )
+        await self.bot.login("fake.token")
+
+        harness = self
+
+        async def on_message(message: discord.Message):
+            try:
+                await handle_message(harness.bot, message)
+            except Exception:
+                harness.__errors += 1
+                raise
+            finally:
+                harness.__completed[message.id] = time.perf_counter()
+        self.bot.event(on_message)
+
+        state = self.bot._connection
+        for g in range(self.guild_count):
+            guild_id = 1_000_000_000_000_000_100 + g
+            guild = discord.Guild(data={"id": str(guild_id), "name": f"Guild {g}"}, state=state)
+            state._add_guild(guild)
+            for c in range(self.channels_per_guild):
+                channel_id = guild_id * 100 + c
+                channel = discord.TextChannel(
+                    state=state,
+                    guild=guild,
+                    data={"id": str(channel_id), "type": 0, "name": f"channel-{c}", "position": c}
+                )
+                guild._add_channel(channel)
+                self.fake.register_channel(channel_id, guild_id)
+                self.channels.append(channel)
+
+        self.rosters = [self.bot.database.get_user(_) for _ in generated["user_ids"]]
+        # don't count logging in.
+        self.fake.reset_calls()
+        return self
+
+    async def __aexit__(self, *exc):
+        try:
+            await self.bot.close()
+        finally:
+            Route.API_BASE_URL = self.__original_base
+            await self.fake.stop()
+
+    def make_message(self, author_id: int, channel: discord.TextChannel, content: str) -> discord.Message:
+        """
+        Synthesize a message, as if it was received over the gateway.
+        """
+        message_id = next(self.__message_ids)
+        return discord.Message(
+            state=self.bot._connection,
+            channel=channel,
+            data={
+                "id": str(message_id),
+                "type": 0,
+                "channel_id": str(channel.id),
+                "guild_id": str(channel.guild.id),
+                "author": {"id": str(author_id), "username": f"user{author_id}", "discriminator": "0000",
+                           "avatar": None},
+                "content": content,
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "edited_timestamp": None,
+                "tts": False,
+                "mention_everyone": False,
+                "mentions": [],
+                "mention_roles": [],
+                "attachments": [],
+                "embeds": [],
+                "pinned": False,
+            }
+        )
+
+    def synthesize(self, proxy_ratio: float, unregistered_ratio: float) -> discord.Message:
+        """
+        Synthesize a random message, from either an unregistered author, or a registered one (who may or may not
+        be proxying).
+        """
+        channel = self.rng.choice(self.channels)
+        if self.rng.random() < unregistered_ratio:
+            return self.make_message(self.rng.randint(10**17, 10**18), channel, "just chatting, nothing to see here")
+
+        roster = self.rng.choice(self.rosters)
+        characters = roster.characters_flattened
+        if characters and self.rng.random() < proxy_ratio:
+            prefix, suffix = self.rng.choice(characters).prefix.split("text")
+            content = f"{prefix}a synthetic proxied message{suffix}"
+        else:
+            content = "a plain message from a registered user"
+        return self.make_message(int(roster.uid), channel, content)
+
+    async def run(
+            self,
+            count: int = 500,
+            rate: float = 100.0,
+            proxy_ratio: float = 0.5,
+            unregistered_ratio: float = 0.5,
+            drain_timeout: float = 30.0
+    ) -> dict:
+        """
+        Inject messages at a fixed rate, wait for all of them to be handled, then report on how it went.
+
+        :param count: How many messages to inject.
+        :param rate: How many messages to inject per second.
+        :param proxy_ratio: How likely a registered author's message is to use one of their Character's brackets.
+        :param unregistered_ratio: How likely a message is to come from an author who isn't registered.
+        :param drain_timeout: How long to wait for outstanding messages once everything was injected.
+        :return: Throughput, latency percentiles (in milliseconds) and REST call counts.
+        :rtype: dict
+        """
+        self.__injected.clear()
+        self.__completed.clear()
+        self.__errors = 0
+        self.fake.reset_calls()
+        deleted_before = set(self.fake.deleted_messages)
+
+        interval = 1 / rate
+        start = time.perf_counter()
+        for i in range(count):
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            message = self.synthesize(proxy_ratio, unregistered_ratio)
+            self.__injected[message.id] = time.perf_counter()
+            self.bot.dispatch("message", message)
+
+        deadline = time.perf_counter() + drain_timeout
+        while len(self.__completed) < count and time.perf_counter() < deadline:
+            await asyncio.sleep(0.005)
+        elapsed = max(self.__completed.values(), default=time.perf_counter()) - start
+
+        proxied = (self.fake.deleted_messages - deleted_before) & self.__injected.keys()
+        latencies = {"all": [], "proxied": [], "unproxied": []}
+        for message_id, injected_at in self.__injected.items():
+            if message_id not in self.__completed:
+                continue
+            latency = (self.__completed[message_id] - injected_at) * 1000
+            latencies["all"].append(latency)
+            latencies["proxied" if message_id in proxied else "unproxied"].append(latency)
+
+        return {
+            "params": {
+                "count": count,
+                "rate": rate,
+                "proxy_ratio": proxy_ratio,
+                "unregistered_ratio": unregistered_ratio,
+                "users": self.users,
+                "characters_per_user": self.characters_per_user,
+                "channels": len(self.channels),
+                "api_latency": self.fake.latency,
+                "seed": self.seed
+            },
+            "injected": count,
+            "completed": len(self.__completed),
+            "errors": self.__errors,
+            "proxied": len(proxied),
+            "elapsed": round(elapsed, 5),
+            "messages_per_second": round(len(self.__completed) / elapsed, 2) if elapsed > 0 else 0.0,
+            "proxied_per_second": round(len(proxied) / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {key: summarize(value, 3) for key, value in latencies.items()},
+            "rest_calls": {
+                "total": self.fake.total_calls,
+                "per_proxied_message": round(self.fake.total_calls / len(proxied), 3) if proxied else None,
+                "by_route": dict(self.fake.calls.most_common())
+            }
+        }
+
+
+async def run_load_test(args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory(prefix="psomi-load-") as tmp:
+        async with LoadHarness(
+                args.workdir or tmp,
+                users=args.users,
+                characters_per_user=args.characters,
+                guilds=args.guilds,
+                channels_per_guild=args.channels,
+                api_latency=args.api_latency / 1000,
+                seed=args.seed
+        ) as harness:
+            return await harness.run(
+                count=args.messages,
+                rate=args.rate,
+                proxy_ratio=args.proxy_ratio,
+                unregistered_ratio=args.unregistered_ratio
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m psomi.bench.loadtest",
+        description="Load test PSOMI's proxying end-to-end against a local, fake Discord API."
+    )
+    parser.add_argument("--messages", type=int, default=500, help="How many messages to inject.")
+    parser.add_argument("--rate", type=float, default=100.0, help="Messages injected per second.")
+    parser.add_argument("--proxy-ratio", type=float, default=0.5,
+                        help="Chance a registered user's message uses one of their brackets.")
+    parser.add_argument("--unregistered-ratio", type=float, default=0.5,
+                        help="Chance a message comes from an unregistered author.")
+    parser.add_argument("--users", type=int, default=50, help="How many registered Users to generate.")
+    parser.add_argument("--characters", type=int, default=20, help="How many Characters each User has.")
+    parser.add_argument("--guilds", type=int, default=2, help="How many guilds to spread messages over.")
+    parser.add_argument("--channels", type=int, default=5, help="How many channels each guild has.")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Fake API latency per request (ms).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed used for generation and message synthesis.")
+    parser.add_argument("--workdir", help="Generate the databases here (and keep them) instead of a temp dir.")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file instead of stdout.")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    return 1 if report["errors"] or report["completed"] < report["injected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+from psomi.bench.generator import generate_databases
+from psomi.utils.data import Data, WebhookCache, User
+from psomi.utils.parsing import parse_message
+from psomi.utils.timing import summarize
+
+BENCHMARKS: dict[str, Callable[["BenchEnv"], Callable[[int], object]]] = {}
+
+
+def benchmark(name: str):
+    """
+    Register a benchmark under a name.
+
+    Benchmarks take a `BenchEnv`, do any (untimed) setup they need, then return a function that runs a single timed
+    iteration. The function receives the iteration number, which can be used to pick unique names and so on.
+
+    :param name: The name of the benchmark, in a `<area>.<operation>` format.
+    :type name: str
+    """
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+@dataclass
+class BenchEnv:
+    """
+    Everything a benchmark needs to run, shared between every benchmark in a run.
+    """
+    data: Data
+    webhook_cache: WebhookCache
+    user_ids: list[str]
+    iterations: int
+    rng: random.Random
+    users: list[User] = field(default_factory=list)
+
+    def random_user(self) -> User:
+        return self.rng.choice(self.users)
+
+    def scratch_user(self, name: str) -> User:
+        """
+        Create a fresh User for benchmarks that modify rosters, so that they don't skew the generated ones.
+        """
+        return self.data.add_user(f"bench-{name}")
+
+
+# ---- Data ----
+
+@benchmark("data.get_all_user_ids")
+def _(env: BenchEnv):
+    return lambda i: env.data.get_all_user_ids()
+
+@benchmark("data.get_user")
+def _(env: BenchEnv):
+    return lambda i: env.data.get_user(env.rng.choice(env.user_ids))
+
+@benchmark("data.add_user")
+def _(env: BenchEnv):
+    return lambda i: env.data.add_user(f"bench-add-{i}")
+
+@benchmark("data.get_roster_version")
+def _(env: BenchEnv):
+    return lambda i: env.data.get_roster_version(env.rng.choice(env.user_ids))
+
+@benchmark("data.get_character_page")
+def _(env: BenchEnv):
+    return lambda i: env.data.get_character_page(env.rng.choice(env.user_ids), env.rng.randint(1, 4), 20)
+
+@benchmark("data.get_proxygroup_page")
+def _(env: BenchEnv):
+    return lambda i: env.data.get_proxygroup_page(env.rng.choice(env.user_ids), 1, 20)
+
+@benchmark("data.get_proxygroup")
+def _(env: BenchEnv):
+    def run(i):
+        user = env.random_user()
+        if len(user.proxy_groups) > 1:
+            env.data.get_proxygroup(user, env.rng.choice(user.proxy_groups[:-1]).title)
+    return run
+
+@benchmark("data.get_uncategorized")
+def _(env: BenchEnv):
+    return lambda i: env.data.get_uncategorized(env.random_user())
+
+@benchmark("data.get_character")
+def _(env: BenchEnv):
+    def run(i):
+        user = env.random_user()
+        if user.characters_flattened:
+            env.data.get_character(user, env.rng.choice(user.characters_flattened).name)
+    return run
+
+@benchmark("data.create_proxygroup")
+def _(env: BenchEnv):
+    user = env.scratch_user("create-proxygroup")
+    return lambda i: env.data.create_proxygroup(user, f"Group {i}")
+
+@benchmark("data.retitle_proxygroup")
+def _(env: BenchEnv):
+    user = env.scratch_user("retitle-proxygroup")
+    groups = [env.data.create_proxygroup(user, f"Group {i}") for i in range(env.iterations)]
+    return lambda i: env.data.retitle_proxygroup(user, groups[i], f"Retitled {i}")
+
+@benchmark("data.delete_proxygroup")
+def _(env: BenchEnv):
+    user = env.scratch_user("delete-proxygroup")
+    groups = [env.data.create_proxygroup(user, f"Group {i}") for i in range(env.iterations)]
+    return lambda i: env.data.delete_proxygroup(user, groups[i])
+
+@benchmark("data.create_character")
+def _(env: BenchEnv):
+    user = env.scratch_user("create-character")
+    return lambda i: env.data.create_character(user, f"Character {i}", f"{i}:text", None)
+
+@benchmark("data.delete_character")
+def _(env: BenchEnv):
+    user = env.scratch_user("delete-character")
+    characters = [env.data.create_character(user, f"Character {i}", f"{i}:text", None)
+                  for i in range(env.iterations)]
+    return lambda i: env.data.delete_character(user, characters[i])
+
+@benchmark("data.group_character")
+def _(env: BenchEnv):
+    user = env.scratch_user("group-character")
+    group = env.data.create_proxygroup(user, "Group")
+    characters = [env.data.create_character(user, f"Character {i}", f"{i}:text", None)
+                  for i in range(env.iterations)]
+    return lambda i: env.data.group_character(user, characters[i], group)
+
+@benchmark("data.ungroup_character")
+def _(env: BenchEnv):
+    user = env.scratch_user("ungroup-character")
+    group = env.data.create_proxygroup(user, "Group")
+    characters = [
+        env.data.group_character(user, env.data.create_character(user, f"Character {i}", f"{i}:text", None), group)
+        for i in range(env.iterations)
+    ]
+    return lambda i: env.data.ungroup_character(user, characters[i])
+
+@benchmark("data.update_character")
+def _(env: BenchEnv):
+    def run(i):
+        user = env.random_user()
+        if user.characters_flattened:
+            character = env.rng.choice(user.characters_flattened)
+            env.data.update_character(user, character, "proxy_count", character.proxy_count + 1)
+    return run
+
+# ---- WebhookCache ----
+
+@benchmark("webhook_cache.get_user_webhooks")
+def _(env: BenchEnv):
+    return lambda i: env.webhook_cache.get_user_webhooks(env.random_user())
+
+@benchmark("webhook_cache.add_user_webhook")
+def _(env: BenchEnv):
+    return lambda i: env.webhook_cache.add_user_webhook(
+        env.random_user(), str(900000000000000000 + i), "https://discord.com/api/webhooks/0/token"
+    )
+
+@benchmark("webhook_cache.purge_old_records")
+def _(env: BenchEnv):
+    return lambda i: env.webhook_cache.purge_old_records(env.users[i % len(env.users)], 50)
+
+# ---- Parsing ----
+
+def _proxy_lines(user: User, rng: random.Random, count: int) -> list[str]:
+    lines = []
+    for character in rng.sample(user.characters_flattened, min(count, len(user.characters_flattened))):
+        prefix, suffix = character.prefix.split("text")
+        lines.append(f"{prefix}hello there, this is a benchmark{suffix}")
+    return lines
+
+@benchmark("parsing.parse_message.miss")
+def _(env: BenchEnv):
+    return lambda i: parse_message(env.random_user(), "just some ordinary chat, nothing to proxy here")
+
+@benchmark("parsing.parse_message.single")
+def _(env: BenchEnv):
+    messages = [(user, "\n".join(_proxy_lines(user, env.rng, 1))) for user in env.users]
+    return lambda i: parse_message(*messages[i % len(messages)])
+
+@benchmark("parsing.parse_message.multi")
+def _(env: BenchEnv):
+    messages = [(user, "\n".join(_proxy_lines(user, env.rng, 3) + ["trailing line"])) for user in env.users]
+    return lambda i: parse_message(*messages[i % len(messages)])
+
+@benchmark("parsing.bracket_filter.miss")
+def _(env: BenchEnv):
+    return lambda i: env.data.get_bracket_filter(env.random_user().uid).may_match(
+        "just some ordinary chat, nothing to proxy here"
+    )
+
+# ---- Searching ----
+
+@benchmark("search.get_character_by_search")
+def _(env: BenchEnv):
+    def run(i):
+        user = env.random_user()
+        if user.characters_flattened:
+            user.get_character_by_search(env.rng.choice(user.characters_flattened).name[:4])
+    return run
+
+@benchmark("search.get_proxygroup_by_search")
+def _(env: BenchEnv):
+    return lambda i: env.random_user().get_proxygroup_by_search("Group")
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5, cwd=os.path.dirname(__file__)
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmarks(
+        users: int = 200,
+        groups_per_user: int = 5,
+        characters_per_user: int = 50,
+        messages_per_user: int = 100,
+        iterations: int = 200,
+        seed: int = 0,
+        only: list[str] | None = None,
+        workdir: str | None = None,
+        progress: Callable[[str], None] | None = None,
+        engine: str = "sqlite"
+) -> dict:
+    """
+    Generate a synthetic database, then run every registered benchmark against it.
+
+    Everything runs offline, against databases inside a temporary directory (or `workdir`, if supplied).
+
+    :param users: How many Users to generate.
+    :param groups_per_user: How many ProxyGroups each User should have.
+    :param characters_per_user: How many Characters each User should have.
+    :param messages_per_user: How many message cache rows each User should have.
+    :param iterations: How many timed iterations to run per benchmark.
+    :param seed: The seed used for generation and for picking random Users/Characters.
+    :param only: If supplied, only benchmarks whose name contains one of these strings are ran.
+    :param workdir: Where to generate the databases (replacing any from a previous run), created if need be. They
+        are kept after the run if supplied.
+    :param progress: Called with each benchmark's name before it runs.
+    :param engine: Which storage engine `Data` should use. The memory engine imports the generated database.
+    :return: The results, alongside metadata on the run. All timings are in microseconds.
+    :rtype: dict
+    """
+    with tempfile.TemporaryDirectory(prefix="psomi-bench-") as tmp:
+        directory = workdir or tmp
+        os.makedirs(directory, exist_ok=True)
+        data_path = os.path.join(directory, "database.db")
+        wc_path = os.path.join(directory, "wccache.db")
+        # the benchmarks modify the databases as they go, so a previous run's are regenerated rather than reused.
+        for path in [data_path, wc_path]:
+            for suffix in ["", "-wal", "-shm", ".journal", ".snapshot"]:
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+        generate_start = time.perf_counter()
+        generated = generate_databases(
+            data_path, wc_path, users, groups_per_user, characters_per_user, messages_per_user, seed
+        )
+        generate_time = time.perf_counter() - generate_start
+
+        env = BenchEnv(
+            data=Data(data_path, engine=engine),
+            webhook_cache=WebhookCache(wc_path),
+            user_ids=generated["user_ids"],
+            iterations=iterations,
+            rng=random.Random(seed)
+        )
+        env.users = [env.data.get_user(_) for _ in env.rng.sample(env.user_ids, min(len(env.user_ids), 50))]
+
+        results = {}
+        for name, setup in BENCHMARKS.items():
+            if only and not any(_ in name for _ in only):
+                continue
+            if progress:
+                progress(name)
+
+            run = setup(env)
+            samples = []
+            for i in range(iterations):
+                start = time.perf_counter_ns()
+                run(i)
+                samples.append((time.perf_counter_ns() - start) / 1000)
+            results[name] = summarize(samples, 2)
+
+        env.data.close()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version,
+            "timestamp": time.time(),
+            "generate_time": round(generate_time, 5),
+            "engine": engine,
+            "unit": "us",
+            "params": {
+                "users": users,
+                "groups_per_user": groups_per_user,
+                "characters_per_user": characters_per_user,
+                "messages_per_user": messages_per_user,
+                "iterations": iterations,
+                "seed": seed
+            }
+        },
+        "results": results
+    }
+
+
+def compare_results(baseline: dict, current: dict, metric: str = "p50", threshold: float = 1.25) -> list[dict]:
+    """
+    Compare two benchmark runs.
+
+    :param baseline: The results of the run to compare against.
+    :param current: The results of the current run.
+    :param metric: Which statistic to compare.
+    :param threshold: How many times slower a benchmark must get before it is considered a regression.
+    :return: One entry per benchmark present in both runs.
+    :rtype: list[dict]
+    """
+    comparison = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name][metric]
+        after = result[metric]
+        ratio = after / before if before else float("inf") if after else 1.0
+
+        comparison.append({
+            "name": name,
+            "before": before,
+            "after": after,
+            "ratio": round(ratio, 3),
+            "regression": ratio > threshold
+        })
+
+    return comparison
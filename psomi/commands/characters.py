@@ -1,14 +1,24 @@
+import io
 import re
+import tempfile
+import time
+import aiohttp
 import discord
 from discord import Option
 from discord.ext import commands
 from psomi.utils.bot import PsomiBot
-from psomi.utils.data import sort_by_page, User
-from psomi.errors import NotFoundError, DuplicateError, OutOfBoundsError
+from psomi.errors import NotFoundError, DuplicateError, ImportAbortedError
+from psomi.utils.parsing import parse_name_list
+from psomi.utils.porting import read_roster, write_roster
 from psomi.utils.views import CharacterListView
 from psomi.utils.autocomplete import chr_name_autocomplete, bracket_autocomplete
 
 class Characters(commands.Cog):
+    # the largest export (in bytes) that will be imported.
+    MAX_IMPORT_SIZE = 25 * 1024 * 1024
+    # how many skipped entries an import lists.
+    MAX_SKIPPED_SHOWN = 15
+
     def __init__(self, bot):
         self.bot: PsomiBot = bot
         self.description = "Commands related to modifying or viewing Characters."
@@ -57,19 +67,17 @@ class Characters(commands.Cog):
                 await ctx.respond("Malformed avatar url! Please ensure your arguments are supplied correctly.")
                 return
 
-        try:
-            user = self.bot.database.get_user(str(ctx.author.id))
-        except NotFoundError: # we should add the user if they are not present
-            user = self.bot.database.add_user(str(ctx.author.id))
-        try:
-            self.bot.database.create_character(user, name, brackets, avatar)
-        except DuplicateError:
-            await ctx.respond("Unable to register Character, as one or more values are already present.\n"
-                            "Make sure both the name and brackets of your Character is unique!")
-            return
+        # we should add the user if they are not present
+        with self.bot.database.session(str(ctx.author.id), create=True) as session:
+            try:
+                session.create_character(name, brackets, avatar)
+                message = (f"Successfully registered '{name}'!"
+                           f" To use them, type in `{brackets.replace("text", "<your message>")}`!")
+            except DuplicateError:
+                message = ("Unable to register Character, as one or more values are already present.\n"
+                           "Make sure both the name and brackets of your Character is unique!")
 
-        await ctx.respond(f"Successfully registered '{name}'!"
-                        f" To use them, type in `{brackets.replace("text", "<your message>")}`!")
+        await ctx.respond(message)
 
     @characters.command(name="unregister", description="Unregister (or delete) a Character.")
     async def unregister_command(
@@ -78,19 +86,38 @@ class Characters(commands.Cog):
             name: Option(str, "The name of the Character to unregister.", required=True, autocomplete=chr_name_autocomplete)
     ):
         try:
-            user = self.bot.database.get_user(str(ctx.author.id))
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    session.delete_character(name)
+                    message = f"Successfully deleted '{name}'!"
+                except NotFoundError:
+                    message = f"You don't have a Character under the name '{name}'!"
         except NotFoundError:
-            await ctx.respond("You don't have any registered Characters! Try again after registering some!")
+            message = "You don't have any registered Characters! Try again after registering some!"
+
+        await ctx.respond(message)
+
+    @characters.command(name="unregister-many", description="Unregister (or delete) several Characters at once.")
+    async def unregister_many_command(
+            self,
+            ctx: discord.ApplicationContext,
+            names: Option(str, "The names of every Character to unregister, separated by commas.", required=True)
+    ):
+        names = parse_name_list(names)
+        if not names:
+            await ctx.respond("Please supply at least one Character name!")
             return
         try:
-            character = self.bot.database.get_character(user, name)
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    session.delete_characters(names)
+                    message = f"Successfully deleted {len(names)} Character(s)!"
+                except NotFoundError as e:
+                    message = f"Nothing was deleted, as some Characters couldn't be found! ({e})"
         except NotFoundError:
-            await ctx.respond(f"You don't have a Character under the name '{name}'!")
-            return
-
-        self.bot.database.delete_character(user, character)
+            message = "You don't have any registered Characters! Try again after registering some!"
 
-        await ctx.respond(f"Successfully deleted '{character.name}'!")
+        await ctx.respond(message)
 
     @characters.command(name="avatar", description="View or update a Character's avatar.")
     async def avatar_command(
@@ -105,40 +132,40 @@ class Characters(commands.Cog):
             avatar_file: Option(discord.Attachment, "Upload a file as the new avatar.", required=False),
             avatar_url: Option(str, "Use a URL as the new avatar.", required=False)
     ):
-        try:
-            user = self.bot.database.get_user(str(ctx.author.id))
-        except NotFoundError:
-            await ctx.respond("You don't have any registered Characters! Try again after registering some!")
-            return
-        try:
-            character = self.bot.database.get_character(user, name)
-        except NotFoundError:
-            await ctx.respond(f"You don't have a Character under the name '{name}'!")
-            return
-
         if avatar_file:
             url = avatar_file.url
         elif avatar_url:
             url = avatar_url
         else:
             url = None
-        if url:
-            if re.match(self.url_check_regex, url) is None: # validate url
-                await ctx.respond("Malformed avatar url!")
-                return
+        if url and re.match(self.url_check_regex, url) is None: # validate url
+            await ctx.respond("Malformed avatar url!")
+            return
 
-            self.bot.database.update_character(user, character, "avatar", url)
+        try:
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    character = session.get_character(name)
+                except NotFoundError:
+                    character = None
+                if character and url:
+                    session.update_character(name, "avatar", url)
+        except NotFoundError:
+            await ctx.respond("You don't have any registered Characters! Try again after registering some!")
+            return
 
+        if character is None:
+            await ctx.respond(f"You don't have a Character under the name '{name}'!")
+        elif url:
             await ctx.respond(
                 f"Successfully updated the avatar of '{name}'!\n"
                 "(Note, avatars are subject to [Link Rot](https://en.wikipedia.org/wiki/Link_rot), as Discord routinely"
                 " gets rid of unused images! Always keep a copy on one or more devices in case your avatar breaks!)"
             )
+        elif character.avatar:
+            await ctx.respond(f"[avatar linkie]({character.avatar})")
         else:
-            if character.avatar:
-                await ctx.respond(f"[avatar linkie]({character.avatar})")
-            else:
-                await ctx.respond(f"'{name}' does not currently have an avatar!")
+            await ctx.respond(f"'{name}' does not currently have an avatar!")
 
     @characters.command(name="brackets", description="Update a Character's Prefix/Suffix.")
     async def brackets_command(
@@ -163,28 +190,23 @@ class Characters(commands.Cog):
             return
         
         try:
-            user = self.bot.database.get_user(str(ctx.author.id))
-        except NotFoundError:
-            await ctx.respond("You don't have any registered Characters! Try again after registering some!")
-            return
-        try:
-            character = self.bot.database.get_character(user, name)
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    session.update_character(name, "prefix", brackets)
+                    message = f"Successfully updated the brackets of '{name}' to '{brackets}'!"
+                except NotFoundError:
+                    message = f"You don't have a Character under the name '{name}'!"
+                except DuplicateError:
+                    in_use_by = [
+                        character for character in session.get_user().characters_flattened
+                        if character.prefix == brackets
+                    ][0]
+                    message = (f"The brackets you supplied ('{brackets}') are already in use by another character"
+                               f" ('{in_use_by.name}')!")
         except NotFoundError:
-            await ctx.respond(f"You don't have a Character under the name '{name}'!")
-            return
-
-        try:
-            self.bot.database.update_character(user, character, "prefix", brackets)
-        except DuplicateError:
-            in_use_by = [
-                character for group in user.proxy_groups
-                for character in group.characters if character.prefix == brackets
-            ][0]
-            await ctx.respond(f"The brackets you supplied ('{brackets}') are already in use by another character"
-                              f" ('{in_use_by.name}')!")
-            return
+            message = "You don't have any registered Characters! Try again after registering some!"
 
-        await ctx.respond(f"Successfully updated the brackets of '{name}' to '{brackets}'!")
+        await ctx.respond(message)
 
     @characters.command(name="rename", description="Rename a Character.")
     async def rename_command(
@@ -199,23 +221,18 @@ class Characters(commands.Cog):
             new_name: Option(str, "The Character's new name (what you want to change it to)", required=True)
     ):
         try:
-            user = self.bot.database.get_user(str(ctx.author.id))
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    session.update_character(old_name, "name", new_name)
+                    message = f"Successfully updated the name of '{old_name}' to '{new_name}'!"
+                except NotFoundError:
+                    message = f"You don't have a Character under the name '{old_name}'!"
+                except DuplicateError:
+                    message = f"The name you supplied ('{new_name}') is already in use!"
         except NotFoundError:
-            await ctx.respond("You don't have any registered Characters! Try again after registering some!")
-            return
-        try:
-            character = self.bot.database.get_character(user, old_name)
-        except NotFoundError:
-            await ctx.respond(f"You don't have a Character under the name '{old_name}'!")
-            return
+            message = "You don't have any registered Characters! Try again after registering some!"
 
-        try:
-            self.bot.database.update_character(user, character, "name", new_name)
-        except DuplicateError:
-            await ctx.respond(f"The name you supplied ('{new_name}') is already in use!")
-            return
-        
-        await ctx.respond(f"Successfully updated the name of '{old_name}' to '{new_name}'!")
+        await ctx.respond(message)
 
     @characters.command(name="list", description="List all of your registered Characters.")
     async def list_command(
@@ -224,44 +241,24 @@ class Characters(commands.Cog):
             page: Option(int, description="What page to show.", default=1)
     ):
         try:
-            user = self.bot.database.get_user(str(ctx.author.id))
+            characters = self.bot.database.get_character_page(str(ctx.author.id), page, CharacterListView.PAGE_SIZE)
         except NotFoundError:
             await ctx.respond("You don't have any registered Characters! Try again after registering some!")
             return
 
-        # create the embed
-        characters = sort_by_page([_.characters for _ in user.proxy_groups], page, 20)
         if characters["group_num"] == 0:
             await ctx.respond(f"That's out of bounds! Please choose a number between 0 and {characters["page_total"]}!")
             return
 
-        embed = discord.Embed(
-            title=f"Registered Characters [{page}/{characters["page_total"]}]"
-                  f"({user.proxy_groups[characters["group_num"]-1].title}):"
-        )
-
-        for i, character in enumerate(characters["page"]):
-            embed.add_field(
-                name=character.name,
-                value=f"Brackets: `{character.prefix}`\n"
-                      f"Message Count: {character.proxy_count}\n"
-                      + (f"Avatar: [linkie]({character.avatar})" if character.avatar else "Avatar: None")
-            )
-
-        if not characters["page"]:
-            embed.set_footer(text="Nothing here...")
-        elif page < characters["page_total"]:
-            embed.set_footer(text="More on next page...")
-
-        await ctx.respond(
-            embed=embed,
-            view=CharacterListView(
-                page=page,
-                user=user,
-                author=ctx.author,
-                timeout=120
-            )
+        view = CharacterListView(
+            page=page,
+            uid=str(ctx.author.id),
+            author_id=ctx.author.id,
+            version=characters["version"],
+            max_page=characters["page_total"],
+            timeout=120
         )
+        await ctx.respond(embed=view.render(characters), view=view)
 
     @characters.command(name="find", description="Find a Character via Fuzzy Searching.")
     async def find_command(
@@ -275,7 +272,8 @@ class Characters(commands.Cog):
             )
     ):
         try:
-            user = self.bot.database.get_user(str(ctx.author.id))
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                user = session.get_user()
         except NotFoundError:
             await ctx.respond("You don't have any registered Characters! Try again after registering some!")
             return
@@ -296,5 +294,150 @@ class Characters(commands.Cog):
 
         await ctx.respond(embed=embed)
 
+    @characters.command(name="stats", description="See how often your Characters were proxied recently.")
+    async def stats_command(
+            self,
+            ctx: discord.ApplicationContext,
+            days: Option(int, "How many days back to look.", default=30, min_value=1, max_value=365)
+    ):
+        try:
+            stats = await self.bot.run_db(self.bot.database.get_proxy_stats, str(ctx.author.id), days)
+        except NotFoundError:
+            await ctx.respond("You don't have any registered Characters! Try again after registering some!")
+            return
+        if not stats["total"]:
+            await ctx.respond(f"None of your Characters were proxied within the last {days} day(s)!")
+            return
+
+        embed = discord.Embed(
+            title="Proxy Stats", description=f"{stats["total"]} messages proxied within the last {days} day(s)."
+        )
+        embed.add_field(
+            name="Characters",
+            value="\n".join(f"{name}: {count}" for name, count in list(stats["character"].items())[:10]),
+            inline=False
+        )
+        guilds = [(_, count) for _, count in stats["guild"].items() if _]
+        if guilds:
+            embed.add_field(
+                name="Servers",
+                value="\n".join(
+                    f"{guild.name if (guild := self.bot.get_guild(int(guild_id))) else guild_id}: {count}"
+                    for guild_id, count in guilds[:5]
+                ),
+                inline=False
+            )
+        embed.add_field(
+            name="Busiest Days",
+            value="\n".join(f"{day}: {count}" for day, count in list(stats["day"].items())[:5]),
+            inline=False
+        )
+        embed.set_footer(text="Days are in UTC, and stats are updated every 30 seconds. "
+                              "Older days are only kept per month.")
+
+        await ctx.respond(embed=embed)
+
+    def _import(self, uid: str, fp) -> dict:
+        def records():
+            for record in read_roster(fp):
+                # avatars that can't be validated are dropped, rather than the whole Character.
+                if record.get("avatar") and re.match(self.url_check_regex, record["avatar"]) is None:
+                    record["avatar"] = None
+                yield record
+
+        fp.seek(0)
+        return self.bot.database.import_roster(uid, records())
+
+    @staticmethod
+    def _shorten(text: str, length: int) -> str:
+        return text if len(text) <= length else text[:length - 3] + "..."
+
+    def _skipped_field(self, lines: list[str]) -> str:
+        # each line is already shortened, which (at 15 lines) keeps the field within Discord's 1024 characters.
+        value = "\n".join(lines[:self.MAX_SKIPPED_SHOWN]) + ("\n..." if len(lines) > self.MAX_SKIPPED_SHOWN else "")
+        return value[:1024]
+
+    @characters.command(name="import", description="Import Characters and ProxyGroups from a PSOMI, PluralKit or Tupperbox export.")
+    async def import_command(
+            self,
+            ctx: discord.ApplicationContext,
+            file: Option(discord.Attachment, "The exported JSON file.", required=True)
+    ):
+        if file.size > self.MAX_IMPORT_SIZE:
+            await ctx.respond(f"That file is too large! Exports can be at most {self.MAX_IMPORT_SIZE // 1024 // 1024}MB.")
+            return
+
+        await ctx.defer()
+        # stream the file to disk (instead of into memory), then parse it from there a chunk at a time.
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as fp:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(file.url) as resp:
+                        if resp.status != 200:
+                            await ctx.respond("Failed to download that file! Please try again.")
+                            return
+                        async for chunk in resp.content.iter_chunked(64 * 1024):
+                            fp.write(chunk)
+            except aiohttp.ClientError:
+                await ctx.respond("Failed to download that file! Please try again.")
+                return
+
+            aborted = None
+            try:
+                result = await self.bot.run_db(self._import, str(ctx.author.id), fp)
+            except ImportAbortedError as e:
+                # everything before the problem was still imported, which the user should know about.
+                result, aborted = e.result, e
+                if not (result["characters"] or result["groups"] or result["grouped"]):
+                    await ctx.respond(f"That doesn't look like a valid export! ({e})")
+                    return
+
+        summary = (f"Registered {result["characters"]} Character(s) and created {result["groups"]} ProxyGroup(s)."
+                   + (f" {result["grouped"]} Character(s) were added to a ProxyGroup." if result["grouped"] else ""))
+        if aborted is None:
+            embed = discord.Embed(title="Import Complete!", description=summary)
+        else:
+            embed = discord.Embed(
+                title="Import Incomplete!",
+                description=f"The rest of that file doesn't look like a valid export ({self._shorten(str(aborted), 200)}), "
+                            f"so only what came before it was imported.\n{summary}"
+            )
+        if result["duplicates"]:
+            embed.add_field(
+                name=f"Skipped {len(result["duplicates"])} duplicate(s):",
+                value=self._skipped_field([
+                    f"{self._shorten(str(_["name"]), 40)} (`{self._shorten(_["prefix"], 16)}`)" for _ in result["duplicates"]
+                ]),
+                inline=False
+            )
+        if result["invalid"]:
+            embed.add_field(
+                name=f"Skipped {len(result["invalid"])} invalid entries:",
+                value=self._skipped_field([
+                    f"{self._shorten(str(_["name"] or "<unnamed>"), 40)}: {_["reason"]}" for _ in result["invalid"]
+                ]),
+                inline=False
+            )
+        embed.set_footer(text="Names and brackets must be unique, so duplicates were left as they were.")
+
+        await ctx.respond(embed=embed)
+
+    @characters.command(name="export", description="Export all of your Characters and ProxyGroups as a JSON file.")
+    async def export_command(self, ctx: discord.ApplicationContext):
+        try:
+            user = await self.bot.run_db(self.bot.database.get_user, str(ctx.author.id))
+        except NotFoundError:
+            await ctx.respond("You don't have any registered Characters! Try again after registering some!")
+            return
+
+        fp = io.StringIO()
+        write_roster(user, fp)
+        await ctx.respond(
+            f"Exported {len(user.characters_flattened)} Character(s)!"
+            " (Use `/characters import` to import them again.)",
+            file=discord.File(io.BytesIO(fp.getvalue().encode()), filename=f"psomi-export-{int(time.time())}.json"),
+            ephemeral=True
+        )
+
 def setup(bot):
     bot.add_cog(Characters(bot))
@@ -1,12 +1,21 @@
+import asyncio
+import io
+import threading
 import time
 import discord
+from discord import Option
 from discord.ext import commands
+from psomi.utils.admission import Priority
 from psomi.utils.bot import PsomiBot
+from psomi.utils.profiling import SamplingProfiler
+from psomi.utils.sharding import read_statuses, shard_status
+from psomi.utils.views import get_view_stats
 
 class Debug(commands.Cog):
     def __init__(self, bot):
         self.bot: PsomiBot = bot
         self.description = "Debugging/status commands."
+        self.profiling = False
 
     debug = discord.SlashCommandGroup(
         name="debug", description="Debugging/status commands."
@@ -14,16 +23,214 @@ class Debug(commands.Cog):
 
     @debug.command(name="ping", description="Get this instance's current response metrics.")
     async def ping_command(self, ctx: discord.ApplicationContext):
-        await ctx.defer()
-        result = self.bot.preform_stress_test()
+        # never wait on the probe here, a fresh one is started in the background when this one is stale.
+        result = self.bot.health_probe
         embed = discord.Embed(title="Pong!", description="PSOMI.v2 Latency Tests!")
         embed.add_field(name="Discord API", value=f"{round(self.bot.latency, 5)} seconds")
+        if result is None:
+            embed.add_field(name="Internal Database", value="Health probe still running, try again shortly!")
+        else:
+            embed.add_field(
+                name=f"Internal Database (last tested: {round(time.time()-result["last_test"], 2)} seconds ago)",
+                value=f"Sampled {result["user_count"]} users ({result["character_count"]} characters) "
+                      f"in {result["probe_time"]} seconds\n"
+                      f"get_user p50/p95/p99: {result["get_user"]["p50"]}/{result["get_user"]["p95"]}/"
+                      f"{result["get_user"]["p99"]} seconds\n"
+                      f"get_character p50/p95/p99: {result["get_character"]["p50"]}/"
+                      f"{result["get_character"]["p95"]}/{result["get_character"]["p99"]} seconds"
+            )
+
+        await ctx.respond(embed=embed)
+
+    @debug.command(name="metrics", description="Get this instance's proxy pipeline and command latencies.")
+    async def metrics_command(self, ctx: discord.ApplicationContext):
+        def describe(entry: dict) -> str:
+            return (f"p50/p95/p99: {round(entry["p50"]*1000, 3)}/{round(entry["p95"]*1000, 3)}/"
+                    f"{round(entry["p99"]*1000, 3)} ms ({entry["count"]} samples)")
+
+        embed = discord.Embed(title="Metrics", description="Latencies over the last minute.")
+
+        stages = self.bot.metrics.summary("proxy_stage")
+        for stage, entry in stages.items():
+            embed.add_field(name=f"Proxy Stage: {stage}", value=describe(entry), inline=False)
+        if not stages:
+            embed.add_field(name="Proxy Stages", value="Nothing proxied yet!", inline=False)
+
+        commands_summary = sorted(
+            self.bot.metrics.summary("command").items(), key=lambda x: x[1]["count"], reverse=True
+        )
+        counters = self.bot.metrics.counters
+        embed.add_field(
+            name="Messages",
+            value=f"Seen: {counters.get("messages_seen", 0)}\n"
+                  f"Short-circuited (unregistered author): {counters.get("unregistered_short_circuit", 0)}\n"
+                  f"Short-circuited (no brackets used): {counters.get("prefilter_short_circuit", 0)}\n"
+                  f"Registered users (in memory): {self.bot.database.registered_count}\n"
+                  f"Autoproxied (fronting): {counters.get("autoproxied", 0)} "
+                  f"({self.bot.database.pending_fronts} front changes pending)\n"
+                  f"Proxy stats pending write-back: {self.bot.database.pending_proxy_stats}\n"
+                  f"Pending conversations: {self.bot.conversations.pending}\n"
+                  f"Reply quotes: {self.bot.references.hits} hits, {self.bot.references.misses} misses, "
+                  f"{self.bot.references.fetches} fetched "
+                  f"({len(self.bot.references)} stored, ~{self.bot.references.bytes // 1024} KB)\n"
+                  f"Channel webhooks: {len(self.bot.channel_webhooks)} known "
+                  f"({self.bot.channel_webhooks.prefetched_guilds} guilds prefetched), "
+                  f"{self.bot.channel_webhooks.hits} hits, {self.bot.channel_webhooks.misses} misses, "
+                  f"{self.bot.channel_webhooks.created} created",
+            inline=False
+        )
+        workers = self.bot.proxy_workers
+        queue_wait = self.bot.metrics.summary("proxy_queue").get("wait")
         embed.add_field(
-            name=f"Internal Database (last tested: {round(time.time()-result["last_test"], 2)} seconds ago)",
-            value=f"User bulk-test: {result["user_time"]} seconds ({result["user_count"]} constructed)\n"
-                  f"Mass bulk-test: {result["mass_time"]} seconds ({result["mass_count"]} constructed)"
+            name="Proxy Queue",
+            value=f"Queued: {workers.depth} across {workers.active_channels} channels "
+                  f"(deepest: {workers.max_depth})\n"
+                  f"Proxying: {workers.running}, done: {workers.processed}, rejected (queue full): {workers.rejected}\n"
+                  f"Wait {describe(queue_wait) if queue_wait else "- nothing queued yet!"}",
+            inline=False
+        )
+        admission = self.bot.admission
+        embed.add_field(
+            name=f"Admission ({"**overloaded**" if admission.overloaded else "ok"}, "
+                 f"loop lag: {round(admission.lag*1000, 1)} ms)",
+            value="\n".join(
+                f"{priority.name.lower()}: {admission.running[priority]}/{admission.limits[priority] or "∞"} running, "
+                f"{admission.admitted[priority]} admitted, {admission.shed[priority]} shed, "
+                f"{admission.deferred[priority]} deferred"
+                for priority in Priority
+            ),
+            inline=False
+        )
+        embed.add_field(
+            name="Commands",
+            value="\n".join(f"`/{command}` {describe(entry)}" for command, entry in commands_summary[:10])[:1024]
+                  or "No commands ran yet!",
+            inline=False
+        )
+
+        await ctx.respond(embed=embed)
+
+    @debug.command(name="startup", description="Get how long each stage of starting this instance took.")
+    async def startup_command(self, ctx: discord.ApplicationContext):
+        stages = self.bot.startup.as_dict()
+        embed = discord.Embed(title="Startup", description="Seconds since the process started.")
+        previous = 0.0
+        for stage, elapsed in stages.items():
+            embed.add_field(name=stage, value=f"{round(elapsed, 3)} s (+{round(elapsed-previous, 3)} s)")
+            previous = elapsed
+        for stage in ["ready", "warmup", "first_proxy"]:
+            if stage not in stages:
+                embed.add_field(name=stage, value="Not reached yet!")
+
+        snapshot = self.bot.snapshot_stats
+        if snapshot is not None:
+            embed.add_field(
+                name="Cache snapshot",
+                value=f"Restored {snapshot["users"]} users, {snapshot["bracket_filters"]} bracket filters, "
+                      f"{snapshot["webhooks"]} webhooks and {snapshot["references"]} messages "
+                      f"({snapshot["stale"]} stale) in {round(snapshot["load_time"]*1000, 3)} ms",
+                inline=False
+            )
+
+        await ctx.respond(embed=embed)
+
+    @debug.command(name="queries", description="Get the most expensive database queries this instance has ran.")
+    async def queries_command(
+            self,
+            ctx: discord.ApplicationContext,
+            limit: Option(int, "How many queries to show.", default=10, min_value=1, max_value=25)
+    ):
+        tracer = self.bot.query_tracer
+        if tracer is None:
+            await ctx.respond("Query tracing is disabled on this instance! "
+                              "Enable it via `\"tracing\": {\"enabled\": true}` in the config.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="Queries", description=f"Top {limit} statements by total time.")
+        for stats in tracer.top(limit):
+            embed.add_field(
+                name=stats.sql[:256],
+                value=f"Total: {round(stats.total_time*1000, 3)} ms ({stats.count} runs, "
+                      f"max {round(stats.max_time*1000, 3)} ms)\n"
+                      f"Rows: {stats.rows}\n"
+                      f"Called by: {", ".join(f"`{method}`" for method, _ in stats.methods.most_common(3))}",
+                inline=False
+            )
+        if not tracer.stats:
+            embed.set_footer(text="Nothing here...")
+
+        await ctx.respond(embed=embed)
+
+    @debug.command(name="profile", description="Profile this instance for a while. (owner only)")
+    async def profile_command(
+            self,
+            ctx: discord.ApplicationContext,
+            seconds: Option(int, "How long to profile for.", default=10, min_value=1, max_value=60)
+    ):
+        if not await self.bot.is_owner(ctx.author):
+            await ctx.respond("Only the instance owner can profile it!", ephemeral=True)
+            return
+        if self.profiling:
+            await ctx.respond("A profile is already being captured! Try again once it's done.", ephemeral=True)
+            return
+
+        await ctx.defer(ephemeral=True)
+        self.profiling = True
+        try:
+            # sample the event loop (that's us) and the database executor, from a thread of the profiler's own.
+            profiler = SamplingProfiler([threading.get_ident()], [PsomiBot.DB_THREAD_PREFIX])
+            collapsed = await asyncio.to_thread(profiler.run, seconds)
+        finally:
+            self.profiling = False
+
+        await ctx.respond(
+            f"Captured {profiler.samples} samples over {seconds} seconds!"
+            " (collapsed stacks, feed them to `flamegraph.pl` or speedscope)",
+            file=discord.File(io.BytesIO(collapsed.encode()), filename=f"psomi-profile-{int(time.time())}.folded"),
+            ephemeral=True
         )
 
+    @debug.command(name="views", description="Get metrics on this instance's currently open paginators.")
+    async def views_command(self, ctx: discord.ApplicationContext):
+        stats = get_view_stats()
+        embed = discord.Embed(title="Open Views", description="Paginators that are still awaiting interaction.")
+        embed.add_field(name="Live Views", value=f"{stats["live_views"]}")
+        embed.add_field(name="Retained Memory", value=f"~{round(stats["retained_bytes"] / 1024, 2)} KiB")
+
+        await ctx.respond(embed=embed)
+
+    @debug.command(name="shards", description="Get the status of every shard (and worker) of this instance.")
+    async def shards_command(self, ctx: discord.ApplicationContext):
+        def describe(shards: list[dict]) -> str:
+            return "\n".join(
+                f"Shard {shard["id"]}: {"connected" if shard["connected"] else "**disconnected**"}, "
+                f"{f"{round(shard["latency"]*1000, 1)} ms" if shard["latency"] is not None else "? ms"}, "
+                f"{shard["guilds"]} guilds"
+                for shard in shards
+            )[:1024] or "No shards."
+
+        embed = discord.Embed(title="Shards", description="Gateway shards and the workers running them.")
+
+        if self.bot.status_dir is None:
+            # not ran by the launcher, so we're the only process there is.
+            embed.add_field(name="Single Process", value=describe(shard_status(self.bot)), inline=False)
+            await ctx.respond(embed=embed)
+            return
+
+        statuses = await asyncio.to_thread(read_statuses, self.bot.status_dir)
+        launcher = statuses.pop("launcher", {})
+        restarts = {_["worker_id"]: _["restarts"] for _ in launcher.get("workers", [])}
+        for name, status in statuses.items():
+            title = f"Worker {status["worker_id"]} (pid {status["pid"]}, {restarts.get(status["worker_id"], 0)} restarts)"
+            if status["worker_id"] == self.bot.worker_id:
+                title += " - that's us!"
+            if status["stale"]:
+                title += f" - unresponsive for {round(time.time()-status["updated"])} seconds!"
+            embed.add_field(name=title, value=describe(status["shards"]), inline=False)
+        if not statuses:
+            embed.add_field(name="No Workers", value="No worker has reported its status yet!", inline=False)
+        embed.set_footer(text=f"{launcher.get("shard_count", "?")} shards total.")
+
         await ctx.respond(embed=embed)
 
 def setup(bot):
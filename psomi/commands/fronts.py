@@ -0,0 +1,97 @@
+import discord
+from discord import Option
+from discord.ext import commands
+from psomi.errors import NotFoundError
+from psomi.utils.autocomplete import chr_name_autocomplete
+from psomi.utils.bot import PsomiBot
+
+class Fronts(commands.Cog):
+    def __init__(self, bot):
+        self.bot: PsomiBot = bot
+        self.description = "Commands related to autoproxying (fronting) as a Character."
+
+    front = discord.SlashCommandGroup(
+        name="front",
+        description="Commands related to autoproxying (fronting) as a Character."
+    )
+
+    def __scope_id(self, ctx: discord.ApplicationContext, scope: str) -> str | None:
+        if scope == "guild":
+            return str(ctx.guild.id) if ctx.guild is not None else None
+        return str(ctx.channel.id)
+
+    @front.command(name="set", description="Proxy every message you send as a Character, no brackets needed.")
+    async def set_command(
+            self,
+            ctx: discord.ApplicationContext,
+            name: Option(
+                str,
+                "The name of the Character to front as.",
+                required=True,
+                autocomplete=chr_name_autocomplete
+            ),
+            scope: Option(
+                str,
+                "Whether to front within this whole server, or only this channel.",
+                choices=["guild", "channel"],
+                default="guild"
+            )
+    ):
+        scope_id = self.__scope_id(ctx, scope)
+        if scope_id is None:
+            await ctx.respond("You can only front within a channel here!")
+            return
+
+        try:
+            user = self.bot.database.get_user(str(ctx.author.id))
+        except NotFoundError:
+            await ctx.respond("You don't have any registered Characters! Try again after registering some!")
+            return
+        try:
+            character = user.get_character_by_name(name)
+        except ValueError:
+            await ctx.respond(f"You don't have a Character under the name '{name}'!")
+            return
+
+        self.bot.database.set_front(user, scope, scope_id, character)
+        await ctx.respond(
+            f"Now fronting as '{character.name}' in this {"server" if scope == "guild" else "channel"}! "
+            f"Your messages will be proxied as them, unless they use another Character's brackets. "
+            f"(Start a message with `\\` to send it as yourself.)"
+        )
+
+    @front.command(name="clear", description="Stop fronting as a Character.")
+    async def clear_command(
+            self,
+            ctx: discord.ApplicationContext,
+            scope: Option(
+                str,
+                "Whether to stop fronting within this whole server, or only this channel.",
+                choices=["guild", "channel"],
+                default="guild"
+            )
+    ):
+        scope_id = self.__scope_id(ctx, scope)
+        fronts = self.bot.database.get_fronts(str(ctx.author.id))
+        if scope_id is None or scope_id not in fronts:
+            await ctx.respond(f"You aren't fronting in this {"server" if scope == "guild" else "channel"}!")
+            return
+
+        user = self.bot.database.get_user(str(ctx.author.id))
+        self.bot.database.set_front(user, scope, scope_id, None)
+        await ctx.respond(f"No longer fronting as '{fronts[scope_id][1]}'!")
+
+    @front.command(name="show", description="See who you're fronting as here.")
+    async def show_command(self, ctx: discord.ApplicationContext):
+        guild_id = str(ctx.guild.id) if ctx.guild is not None else None
+        name = self.bot.database.get_front(str(ctx.author.id), str(ctx.channel.id), guild_id)
+        if name is None:
+            await ctx.respond("You aren't fronting here! Use `/front set` to start.")
+            return
+
+        fronts = self.bot.database.get_fronts(str(ctx.author.id))
+        where = "this channel" if str(ctx.channel.id) in fronts else "this server"
+        await ctx.respond(f"You're fronting as '{name}' in {where}!")
+
+def setup(bot):
+    bot.add_cog(Fronts(bot))
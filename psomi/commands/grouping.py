@@ -4,10 +4,10 @@ import discord
 from discord import Option
 from discord.ext import commands
 from psomi.utils.bot import PsomiBot
-from psomi.utils.data import sort_by_page
 from psomi.utils.views import ProxyGroupListView
 from psomi.errors import NotFoundError, DuplicateError
 from psomi.utils.autocomplete import pgp_name_autocomplete, chr_name_autocomplete
+from psomi.utils.parsing import parse_name_list
 
 
 class Grouping(commands.Cog):
@@ -25,18 +25,15 @@ class Grouping(commands.Cog):
             ctx: discord.ApplicationContext,
             title: Option(str, description="The ProxyGroup's title.", required=True)
     ):
-        try:
-            user = self.bot.database.get_user(str(ctx.author.id))
-        except NotFoundError: # we should add the user if they are not present
-            user = self.bot.database.add_user(str(ctx.author.id))
-        
-        try:
-            self.bot.database.create_proxygroup(user, title)
-        except DuplicateError:
-            await ctx.respond("Unable to create ProxyGroup, as one with that name already exists.")
-            return
-        
-        await ctx.respond(f"Successfully created the '{title}' ProxyGroup!")
+        # we should add the user if they are not present
+        with self.bot.database.session(str(ctx.author.id), create=True) as session:
+            try:
+                session.create_proxygroup(title)
+                message = f"Successfully created the '{title}' ProxyGroup!"
+            except DuplicateError:
+                message = "Unable to create ProxyGroup, as one with that name already exists."
+
+        await ctx.respond(message)
 
     @grouping.command(name="delete", description="Delete an existing ProxyGroup.")
     async def delete_command(
@@ -50,15 +47,16 @@ class Grouping(commands.Cog):
             )
     ):
         try:
-            user = self.bot.database.get_user(str(ctx.author.id))
-        except NotFoundError:
-            await ctx.respond("You do not currently have any created ProxyGroups! Try creating one first!")
-            return
-
-        try:
-            group = self.bot.database.get_proxygroup(user, title)
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    session.get_proxygroup(title)
+                    message = None
+                except NotFoundError:
+                    message = f"You do not have a ProxyGroup with the title '{title}'!"
         except NotFoundError:
-            await ctx.respond(f"You do not have a ProxyGroup with the title '{title}'!")
+            message = "You do not currently have any created ProxyGroups! Try creating one first!"
+        if message:
+            await ctx.respond(message)
             return
 
         await ctx.respond(f"Are you sure you'd like to delete this ProxyGroup? ('{title}')\n"
@@ -67,11 +65,10 @@ class Grouping(commands.Cog):
 
         try:
             # destructive action, we should wait for confirmation first.
-            result: discord.Message = await self.bot.wait_for(
-                "message",
-                check=lambda x: x.channel.id == ctx.channel.id
-                and x.author.id == ctx.author.id
-                and x.content.lower() in ["i am sure!", "cancel"],
+            result: discord.Message = await self.bot.conversations.wait(
+                ctx.author.id,
+                ctx.channel.id,
+                check=lambda x: x.content.lower() in ["i am sure!", "cancel"],
                 timeout=20.0
             )
         except TimeoutError:
@@ -79,7 +76,13 @@ class Grouping(commands.Cog):
             return
 
         if result.content.lower() == "i am sure!":
-            self.bot.database.delete_proxygroup(user, group)
+            # a fresh session, as the transaction must never stay open while waiting on the user.
+            try:
+                with self.bot.database.session(str(ctx.author.id)) as session:
+                    session.delete_proxygroup(title)
+            except NotFoundError: # deleted in the meantime
+                await result.reply(f"You do not have a ProxyGroup with the title '{title}'!")
+                return
 
             await result.reply(f"Successfully deleted the '{title}' ProxyGroup!")
         else:
@@ -98,24 +101,18 @@ class Grouping(commands.Cog):
             new_title: Option(str, "The title you wish to update it to.", required=True)
     ):
         try:
-            user = self.bot.database.get_user(str(ctx.author.id))
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    session.retitle_proxygroup(old_title, new_title)
+                    message = f"Successfully renamed the '{old_title}' ProxyGroup to '{new_title}'!"
+                except NotFoundError:
+                    message = f"You do not have a ProxyGroup with the title '{old_title}'!"
+                except DuplicateError:
+                    message = f"The title you supplied ('{new_title}') is already in use!"
         except NotFoundError:
-            await ctx.respond("You do not currently have any created ProxyGroups! Try creating one first!")
-            return
+            message = "You do not currently have any created ProxyGroups! Try creating one first!"
 
-        try:
-            group = self.bot.database.get_proxygroup(user, old_title)
-        except NotFoundError:
-            await ctx.respond(f"You do not have a ProxyGroup with the title '{old_title}'!")
-            return
-
-        try:
-            self.bot.database.retitle_proxygroup(user, group, new_title)
-        except DuplicateError:
-            await ctx.respond(f"The title you supplied ('{new_title}') is already in use!")
-            return
-
-        await ctx.respond(f"Successfully renamed the '{old_title}' ProxyGroup to '{new_title}'!")
+        await ctx.respond(message)
 
     @grouping.command(name="add", description="Add a Character to a ProxyGroup.")
     async def add_command(
@@ -135,28 +132,26 @@ class Grouping(commands.Cog):
             )
     ):
         try:
-            user = self.bot.database.get_user(str(ctx.author.id))
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    session.get_proxygroup(group_name)
+                except NotFoundError:
+                    message = f"You do not have a ProxyGroup with the title '{group_name}'!"
+                else:
+                    try:
+                        character = session.get_character(character_name)
+                    except NotFoundError:
+                        message = f"You don't have a Character under the name '{character_name}'!"
+                    else:
+                        if character.proxygroup_name == group_name:
+                            message = f"'{character_name}' is already present in this group!"
+                        else:
+                            session.group_characters([character_name], group_name)
+                            message = f"Successfully placed '{character_name}' into the '{group_name}' ProxyGroup!"
         except NotFoundError:
-            await ctx.respond("You need to have Characters first!")
-            return
-        try:
-            group = self.bot.database.get_proxygroup(user, group_name)
-        except NotFoundError:
-            await ctx.respond(f"You do not have a ProxyGroup with the title '{group_name}'!")
-            return
-        try:
-            character = self.bot.database.get_character(user, character_name)
-        except NotFoundError:
-            await ctx.respond(f"You don't have a Character under the name '{character_name}'!")
-            return
-
-        if character.proxygroup_name == group_name:
-            await ctx.respond(f"'{character_name}' is already present in this group!")
-            return
-
-        self.bot.database.group_character(user, character, group)
+            message = "You need to have Characters first!"
 
-        await ctx.respond(f"Successfully placed '{character_name}' into the '{group_name}' ProxyGroup!")
+        await ctx.respond(message)
 
     @grouping.command(name="remove", description="Remove a Character from their current ProxyGroup.")
     async def remove_command(
@@ -170,24 +165,85 @@ class Grouping(commands.Cog):
             )
     ):
         try:
-            user = self.bot.database.get_user(str(ctx.author.id))
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    character = session.get_character(character_name)
+                except NotFoundError:
+                    message = f"You don't have a Character under the name '{character_name}'!"
+                else:
+                    if character.proxygroup_name is None:
+                        message = f"'{character_name}' isn't in any ProxyGroups!"
+                    else:
+                        session.group_characters([character_name], None)
+                        message = (f"Successfully removed '{character_name}' from their current ProxyGroup "
+                                   f"('{character.proxygroup_name}')!")
         except NotFoundError:
-            await ctx.respond("You need to have Characters first!")
+            message = "You need to have Characters first!"
+
+        await ctx.respond(message)
+
+    @grouping.command(name="add-many", description="Add several Characters to a ProxyGroup at once.")
+    async def add_many_command(
+            self,
+            ctx: discord.ApplicationContext,
+            group_name: Option(
+                str,
+                "The name of the ProxyGroup you wish to add to.",
+                required=True,
+                autocomplete=pgp_name_autocomplete
+            ),
+            character_names: Option(
+                str,
+                "The names of every Character you wish to add, separated by commas.",
+                required=True
+            )
+    ):
+        names = parse_name_list(character_names)
+        if not names:
+            await ctx.respond("Please supply at least one Character name!")
             return
         try:
-            character = self.bot.database.get_character(user, character_name)
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    session.get_proxygroup(group_name)
+                except NotFoundError:
+                    message = f"You do not have a ProxyGroup with the title '{group_name}'!"
+                else:
+                    try:
+                        session.group_characters(names, group_name)
+                        message = f"Successfully placed {len(names)} Character(s) into the '{group_name}' ProxyGroup!"
+                    except NotFoundError as e:
+                        message = f"Nothing was changed, as some Characters couldn't be found! ({e})"
         except NotFoundError:
-            await ctx.respond(f"You don't have a Character under the name '{character_name}'!")
-            return
+            message = "You need to have Characters first!"
 
-        if character.proxygroup_name is None:
-            await ctx.respond(f"'{character_name}' isn't in any ProxyGroups!")
-            return
+        await ctx.respond(message)
 
-        self.bot.database.ungroup_character(user, character)
+    @grouping.command(name="remove-many", description="Remove several Characters from their ProxyGroups at once.")
+    async def remove_many_command(
+            self,
+            ctx: discord.ApplicationContext,
+            character_names: Option(
+                str,
+                "The names of every Character you wish to remove, separated by commas.",
+                required=True
+            )
+    ):
+        names = parse_name_list(character_names)
+        if not names:
+            await ctx.respond("Please supply at least one Character name!")
+            return
+        try:
+            with self.bot.database.session(str(ctx.author.id)) as session:
+                try:
+                    session.group_characters(names, None)
+                    message = f"Successfully removed {len(names)} Character(s) from their ProxyGroups!"
+                except NotFoundError as e:
+                    message = f"Nothing was changed, as some Characters couldn't be found! ({e})"
+        except NotFoundError:
+            message = "You need to have Characters first!"
 
-        await ctx.respond(f"Successfully removed '{character_name}' from their current ProxyGroup "
-                          f"('{character.proxygroup_name}')!")
+        await ctx.respond(message)
 
     @grouping.command(name="list", description="List all of your created ProxyGroups.")
     async def list_command(
@@ -196,41 +252,24 @@ class Grouping(commands.Cog):
             page: Option(int, description="What page to show.", default=1)
     ):
         try:
-            user = self.bot.database.get_user(str(ctx.author.id))
+            groups = self.bot.database.get_proxygroup_page(str(ctx.author.id), page, ProxyGroupListView.PAGE_SIZE)
         except NotFoundError:
             await ctx.respond("You don't have any created ProxyGroups! Try again after creating some!")
             return
 
-        # create the embed
-        groups = sort_by_page([user.proxy_groups], page, 20)
         if groups["group_num"] == 0:
             await ctx.respond(f"That's out of bounds! Please choose a number between 0 and {groups["page_total"]}!")
             return
 
-        embed = discord.Embed(
-            title=f"Created ProxyGroups [{page}/{groups["page_total"]}]"
-        )
-
-        for i, proxygroup in enumerate(groups["page"]):
-            embed.add_field(
-                name=proxygroup.title,
-                value=f"Character Count: {len(proxygroup.characters)}"
-            )
-
-        if not groups["page"]:
-            embed.set_footer(text="Nothing here...")
-        elif page < groups["page_total"]:
-            embed.set_footer(text="More on next page...")
-
-        await ctx.respond(
-            embed=embed,
-            view=ProxyGroupListView(
-                page=page,
-                user=user,
-                author=ctx.author,
-                timeout=120
-            )
+        view = ProxyGroupListView(
+            page=page,
+            uid=str(ctx.author.id),
+            author_id=ctx.author.id,
+            version=groups["version"],
+            max_page=groups["page_total"],
+            timeout=120
         )
+        await ctx.respond(embed=view.render(groups), view=view)
 
 def setup(bot):
     bot.add_cog(Grouping(bot))
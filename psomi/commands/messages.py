@@ -28,18 +28,10 @@ class Messages(commands.Cog):
             await ctx.respond("You don't have any registered Characters! Try again after registering some!")
             return
         try:
-            channel_webhooks = await self.bot.http.channel_webhooks(ctx.channel.id)
+            psomi_webhook = await self.bot.channel_webhooks.resolve(self.bot, ctx.channel.id)
         except discord.errors.NotFound:
             return
 
-        psomi_webhook = None
-        for hook in channel_webhooks:
-            if hook.get("name", None) == self.bot.webhook_name:
-                psomi_webhook = hook
-                break
-        if not psomi_webhook:
-            psomi_webhook = await self.bot.http.create_webhook(ctx.channel.id, name=self.bot.webhook_name)
-
         psomi_webhook_id = psomi_webhook.get("id")
         psomi_webhook_token = psomi_webhook.get("token")
         psomi_webhook_url = f"https://discord.com/api/webhooks/{psomi_webhook_id}/{psomi_webhook_token}"
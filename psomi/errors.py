@@ -15,3 +15,17 @@ class OutOfBoundsError(BaseException):
     The requested resource was out of bounds.
     """
     pass
+
+class OverloadedError(BaseException):
+    """
+    The instance is too busy to do this right now.
+    """
+    pass
+
+class ImportAbortedError(BaseException):
+    """
+    An import failed partway through, after everything before that point was already imported.
+    """
+    def __init__(self, message: str, result: dict):
+        super().__init__(message)
+        self.result = result
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from psomi.utils.sharding import split_shards, write_status
+
+# what workers exit with when restarting them couldn't possibly help, such as when they're misconfigured.
+EXIT_FATAL = 78
+
+
+@dataclass
+class Worker:
+    """
+    A single worker process, and everything needed to (re)start it.
+    """
+    worker_id: int
+    shard_ids: list[int]
+    process: subprocess.Popen | None = None
+    started_at: float = 0.0
+    restarts: int = 0
+    backoff: float = 1.0
+    restart_at: float = 0.0
+    finished: bool = False
+
+
+class Launcher:
+    """
+    Runs PSOMI.v2 as several worker processes, each owning a contiguous range of gateway shards.
+
+    Every worker is supervised, being restarted (with an exponential backoff) whenever it exits unexpectedly.
+    """
+    # how long (in seconds) a worker has to stay up for its backoff to be reset.
+    HEALTHY_AFTER = 60
+    MAX_BACKOFF = 60
+
+    def __init__(self, workers: int, shard_count: int, status_dir: str = "shard-status"):
+        """
+        Initializes the Launcher. Nothing is started until `run` is called.
+
+        :param workers: How many worker processes to run.
+        :type workers: int
+        :param shard_count: The total amount of shards, split between every worker.
+        :type shard_count: int
+        :param status_dir: Where the launcher and every worker write their status.
+        :type status_dir: str
+        """
+        self.shard_count = shard_count
+        self.status_dir = status_dir
+        self.workers = [Worker(i, shard_ids) for i, shard_ids in enumerate(split_shards(shard_count, workers))]
+        self.__stopping = False
+
+    def command(self, worker: Worker) -> list[str]:
+        return [
+            sys.executable, "-m", "psomi",
+            "--worker", str(worker.worker_id),
+            "--shard-ids", ",".join(str(_) for _ in worker.shard_ids),
+            "--shard-count", str(self.shard_count),
+            "--status-dir", self.status_dir
+        ]
+
+    def start_worker(self, worker: Worker):
+        first, last = worker.shard_ids[0], worker.shard_ids[-1]
+        print(f"Starting worker {worker.worker_id} ({f"shards {first}-{last}" if first != last else f"shard {first}"})...")
+        worker.process = subprocess.Popen(self.command(worker))
+        worker.started_at = time.time()
+
+    def check_worker(self, worker: Worker):
+        """
+        Start a worker if it's due to be, or schedule a restart if it has exited.
+        """
+        if worker.finished:
+            return
+        if worker.process is None:
+            if time.time() >= worker.restart_at:
+                self.start_worker(worker)
+            return
+
+        code = worker.process.poll()
+        if code is None:
+            return
+
+        worker.process = None
+        if code == 0:
+            # closed on purpose, so there's nothing to restart.
+            print(f"Worker {worker.worker_id} exited cleanly.")
+            worker.finished = True
+            return
+        if code == EXIT_FATAL:
+            print(f"Worker {worker.worker_id} can't run as configured! Not restarting it.")
+            worker.finished = True
+            return
+
+        if time.time() - worker.started_at > self.HEALTHY_AFTER:
+            worker.backoff = 1.0
+        print(f"Worker {worker.worker_id} exited with code {code}! Restarting in {worker.backoff} seconds...")
+        worker.restart_at = time.time() + worker.backoff
+        worker.backoff = min(worker.backoff * 2, self.MAX_BACKOFF)
+        worker.restarts += 1
+
+    def write_status(self):
+        try:
+            write_status(self.status_dir, "launcher", {
+                "pid": os.getpid(),
+                "shard_count": self.shard_count,
+                "workers": [
+                    {
+                        "worker_id": worker.worker_id,
+                        "pid": worker.process.pid if worker.process else None,
+                        "shard_ids": worker.shard_ids,
+                        "running": worker.process is not None,
+                        "started_at": worker.started_at,
+                        "restarts": worker.restarts
+                    }
+                    for worker in self.workers
+                ]
+            })
+        except OSError as e:
+            print(f"Failed to write launcher status to '{self.status_dir}'! ({e!r})")
+
+    def run(self, poll_interval: float = 1.0):
+        """
+        Start and supervise every worker, until either all of them exit cleanly or `stop` is called.
+        """
+        last_status = 0.0
+        while not self.__stopping and not all(worker.finished for worker in self.workers):
+            for worker in self.workers:
+                self.check_worker(worker)
+
+            if time.time() - last_status > 5:
+                self.write_status()
+                last_status = time.time()
+            time.sleep(poll_interval)
+
+    def stop(self, timeout: float = 15.0):
+        """
+        Ask every worker to shut down, killing any that don't within `timeout` seconds.
+        """
+        self.__stopping = True
+        running = [worker.process for worker in self.workers if worker.process and worker.process.poll() is None]
+        for process in running:
+            process.terminate()
+
+        deadline = time.time() + timeout
+        for process in running:
+            try:
+                process.wait(max(0.0, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+        for worker in self.workers:
+            worker.process = None
+        self.write_status()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m psomi.launcher",
+        description="Run PSOMI.v2 as several supervised worker processes, each owning a range of shards."
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="How many worker processes to run.")
+    parser.add_argument("--shards", type=int, help="The total amount of shards. Defaults to one per worker.")
+    parser.add_argument("--status-dir", default="shard-status", help="Where every worker writes its status.")
+    args = parser.parse_args()
+
+    try:
+        with open("config.json", "r") as f:
+            storage_engine = json.load(f).get("storage", {}).get("engine", "sqlite")
+    except (OSError, ValueError): # the workers will complain about it themselves
+        storage_engine = "sqlite"
+    if storage_engine == "memory":
+        # the memory engine's journal can only ever have a single writer.
+        print("The memory storage engine can't be shared between workers! Use the SQLite engine instead.")
+        return 1
+
+    launcher = Launcher(args.workers, args.shards or args.workers, args.status_dir)
+
+    # SIGTERM should shut the workers down just as cleanly as Ctrl+C does.
+    def request_stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, request_stop)
+
+    try:
+        launcher.run()
+    except KeyboardInterrupt:
+        print("Stopping every worker...")
+    finally:
+        launcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import asyncio
+import enum
+import time
+from contextlib import asynccontextmanager
+from typing import Callable
+from psomi.errors import OverloadedError
+from psomi.utils.metrics import Metrics
+
+
+class Priority(enum.IntEnum):
+    """
+    Classes of work, most important first.
+    """
+    AUTOCOMPLETE = 0 # Discord gives up on these after three seconds
+    INTERACTION = 1 # slash commands (which have to be responded to within three seconds as well)
+    PROXY = 2
+    REACTION = 3 # 📝 edit reactions
+    BACKGROUND = 4 # maintenance, such as purges, health probes and webhook prefetching
+
+
+class Overload(enum.Enum):
+    """
+    What happens to a class of work while the instance is overloaded.
+    """
+    RUN = "run" # admitted as usual (up to its class' limit)
+    SHED = "shed" # dropped
+    DEFER = "defer" # held back until the overload passes (or `max_defer` runs out)
+
+
+DEFAULT_LIMITS = {
+    Priority.AUTOCOMPLETE: 20,
+    Priority.INTERACTION: 50,
+    Priority.PROXY: None,
+    Priority.REACTION: None,
+    Priority.BACKGROUND: 1
+}
+DEFAULT_POLICIES = {
+    Priority.AUTOCOMPLETE: Overload.RUN,
+    Priority.INTERACTION: Overload.RUN,
+    Priority.PROXY: Overload.RUN,
+    Priority.REACTION: Overload.SHED,
+    Priority.BACKGROUND: Overload.DEFER
+}
+
+
+class AdmissionController:
+    """
+    Decides what work gets to run (and how much of it at once), so that the instance stays responsive to what matters
+    most while it's saturated.
+
+    Every class of work is limited to a number of concurrent slots. While the event loop lags (or too much is queued)
+    less important work is shed or deferred, rather than competing with autocompletes and commands for the loop.
+    """
+    def __init__(
+            self,
+            metrics: Metrics | None = None,
+            limits: dict[Priority, int | None] | None = None,
+            policies: dict[Priority, Overload] | None = None,
+            lag_threshold: float = 0.25,
+            depth_threshold: int | None = 200,
+            depth: Callable[[], int] | None = None,
+            slot_timeout: float = 2.5,
+            max_defer: float = 60.0,
+            lag_interval: float = 0.1
+    ):
+        """
+        :param metrics: Where to count shed and deferred work (and report the loop's lag), if anywhere.
+        :type metrics: Metrics | None
+        :param limits: How many of each class may run at once, None meaning no limit.
+        :type limits: dict[Priority, int | None] | None
+        :param policies: What happens to each class while overloaded.
+        :type policies: dict[Priority, Overload] | None
+        :param lag_threshold: How late (in seconds) the event loop may run before it's considered overloaded.
+        :type lag_threshold: float
+        :param depth_threshold: How much queued work there may be before it's considered overloaded, if limited.
+        :type depth_threshold: int | None
+        :param depth: Returns how much work is currently queued.
+        :type depth: Callable[[], int] | None
+        :param slot_timeout: How long (in seconds) autocompletes and interactions wait for a slot before being shed,
+            as responding any later would fail anyway.
+        :type slot_timeout: float
+        :param max_defer: How long (in seconds) deferred work is held back before it's ran regardless.
+        :type max_defer: float
+        :param lag_interval: How often (in seconds) the event loop's lag is sampled.
+        :type lag_interval: float
+        """
+        self.metrics = metrics
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.lag_threshold = lag_threshold
+        self.depth_threshold = depth_threshold
+        self.__depth = depth
+        self.slot_timeout = slot_timeout
+        self.max_defer = max_defer
+        self.lag_interval = lag_interval
+
+        self.__slots = {
+            priority: asyncio.Semaphore(limit) for priority, limit in self.limits.items() if limit is not None
+        }
+        self.__monitor: asyncio.Task | None = None
+        self.lag = 0.0
+        self.running = {_: 0 for _ in Priority}
+        self.admitted = {_: 0 for _ in Priority}
+        self.shed = {_: 0 for _ in Priority}
+        self.deferred = {_: 0 for _ in Priority}
+
+    @property
+    def depth(self) -> int:
+        return self.__depth() if self.__depth is not None else 0
+
+    @property
+    def overloaded(self) -> bool:
+        """
+        :return: Whether the event loop is lagging, or too much work is queued.
+        :rtype: bool
+        """
+        if self.lag > self.lag_threshold:
+            return True
+        return self.depth_threshold is not None and self.depth > self.depth_threshold
+
+    def start(self) -> None:
+        """
+        Start sampling the event loop's lag. Must be called from within the loop.
+        """
+        if self.__monitor is None or self.__monitor.done():
+            self.__monitor = asyncio.create_task(self.__sample_lag())
+
+    async def stop(self) -> None:
+        if self.__monitor is not None:
+            self.__monitor.cancel()
+            await asyncio.gather(self.__monitor, return_exceptions=True)
+            self.__monitor = None
+
+    async def __sample_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            sample = max(loop.time() - expected, 0.0)
+            # rise immediately, but fall off gradually, so a single quiet sample doesn't end an overload.
+            self.lag = max(sample, self.lag * 0.5)
+
+    def __shed(self, priority: Priority):
+        self.shed[priority] += 1
+        if self.metrics is not None:
+            self.metrics.increment(f"admission_shed_{priority.name.lower()}")
+        raise OverloadedError(f"Shed {priority.name.lower()} work, the instance is overloaded!")
+
+    @asynccontextmanager
+    async def admit(self, priority: Priority):
+        """
+        Wait for (and hold) a slot for the wrapped work, unless it's shed:
+
+            async with bot.admission.admit(Priority.REACTION):
+                ...
+
+        :param priority: The class of work being admitted.
+        :type priority: Priority
+
+        :raises OverloadedError: If the work was shed, in which case it shouldn't be done at all.
+        """
+        if self.overloaded:
+            policy = self.policies[priority]
+            if policy is Overload.SHED:
+                self.__shed(priority)
+            elif policy is Overload.DEFER:
+                self.deferred[priority] += 1
+                if self.metrics is not None:
+                    self.metrics.increment(f"admission_deferred_{priority.name.lower()}")
+                deadline = time.monotonic() + self.max_defer
+                while self.overloaded and time.monotonic() < deadline:
+                    await asyncio.sleep(self.lag_interval * 5)
+
+        slots = self.__slots.get(priority)
+        if slots is not None:
+            if priority <= Priority.INTERACTION:
+                try:
+                    await asyncio.wait_for(slots.acquire(), self.slot_timeout)
+                except TimeoutError:
+                    self.__shed(priority)
+            else:
+                await slots.acquire()
+
+        self.admitted[priority] += 1
+        self.running[priority] += 1
+        try:
+            yield
+        finally:
+            self.running[priority] -= 1
+            if slots is not None:
+                slots.release()
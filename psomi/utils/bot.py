@@ -1,67 +1,361 @@
-from cachetools import TTLCache
-import random
+import asyncio
+import functools
 import time
-from discord.ext.commands import Bot
-from psomi.utils.data import Data, WebhookCache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+import discord
+from discord.ext.commands import AutoShardedBot, Bot
+from psomi.errors import OverloadedError
+from psomi.utils.admission import AdmissionController, Priority
+from psomi.utils.conversations import ConversationRegistry
+from psomi.utils.data import Data, User, WebhookCache
+from psomi.utils.metrics import Metrics
+from psomi.utils.probe import probe_database
+from psomi.utils.references import ReferenceStore
+from psomi.utils.snapshot import load_snapshot, write_snapshot
+from psomi.utils.startup import StartupTimeline
+from psomi.utils.tracing import QueryTracer
+from psomi.utils.webhooks import ChannelWebhooks
+from psomi.utils.workers import ChannelWorkers
 
 
 class PsomiBot(Bot):
-    def __init__(self, db_path: str, wc_path: str, *args, **kwargs):
-        self.__database: Data = Data(db_path)
-        self.__webhook_cache: WebhookCache = WebhookCache(wc_path)
+    DB_THREAD_PREFIX = "psomi-db"
+    # how long Discord waits for an interaction to be responded to (or deferred), before considering it failed.
+    RESPONSE_DEADLINE = 3.0
+
+    def __init__(
+            self,
+            db_path: str,
+            wc_path: str,
+            *args,
+            query_tracer: QueryTracer | None = None,
+            storage_engine: str = "sqlite",
+            worker_id: int | None = None,
+            status_dir: str | None = None,
+            reference_store_bytes: int = 4 * 1024 * 1024,
+            fetch_references: bool = True,
+            startup: StartupTimeline | None = None,
+            prefetch_webhooks: bool = True,
+            precreate_webhooks: bool = False,
+            snapshot_path: str | None = None,
+            snapshot_references: bool = False,
+            snapshot_max_age: float | None = None,
+            proxy_queue_size: int = 100,
+            proxy_concurrency: int | None = None,
+            admission_limits: dict[Priority, int | None] | None = None,
+            lag_threshold: float = 0.25,
+            depth_threshold: int | None = 200,
+            per_guild_stats: bool = True,
+            change_retention: int = 60 * 60,
+            **kwargs
+    ):
+        self.__query_tracer = query_tracer
+        # pass one in as early as possible (before importing anything heavy), so the timeline covers the imports too.
+        self.startup = startup or StartupTimeline()
+        # only set when ran as one of the launcher's workers.
+        self.worker_id = worker_id
+        self.status_dir = status_dir
+        self.__database: Data = Data(
+            db_path,
+            tracer=query_tracer,
+            engine=storage_engine,
+            per_guild_stats=per_guild_stats,
+            change_retention=change_retention
+        )
+        self.__webhook_cache: WebhookCache = WebhookCache(wc_path, tracer=query_tracer)
+        # blocking database work that shouldn't hold up the event loop runs here instead.
+        self.__db_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix=self.DB_THREAD_PREFIX)
 
         self.webhook_name = "omihook"
-        self.user_cache = TTLCache(100, 60)
+        # every channel's webhook, so proxying only asks Discord about channels it has never seen.
+        self.channel_webhooks = ChannelWebhooks(self.webhook_name)
+        self.prefetch_webhooks_enabled = prefetch_webhooks
+        self.precreate_webhooks = precreate_webhooks
+        self.__user_cache = None
+        # Users restored from a snapshot (by UUID, alongside the TID and roster version they were written at), which
+        # only go into the user cache once it's first used, rather than having their TTL run out before then.
+        self.__restored_users: dict[str, tuple[User, str, int]] = {}
+        self.metrics = Metrics()
+        # messages that might be proxied, queued per channel so they're proxied in the order they were sent.
+        self.proxy_workers = ChannelWorkers(self.metrics, proxy_queue_size)
+        self.metrics.gauge("proxy_queue_depth", lambda: self.proxy_workers.depth)
+        self.metrics.gauge("proxy_queue_channels", lambda: self.proxy_workers.active_channels)
+        # keeps autocompletes and commands responsive while saturated, by holding back (or dropping) everything else.
+        self.admission = AdmissionController(
+            self.metrics,
+            {Priority.PROXY: proxy_concurrency, **(admission_limits or {})},
+            lag_threshold=lag_threshold,
+            depth_threshold=depth_threshold,
+            depth=lambda: self.proxy_workers.depth
+        )
+        self.metrics.gauge("event_loop_lag_seconds", lambda: self.admission.lag)
+        # replies being waited on (such as confirmations), routed by author and channel.
+        self.conversations = ConversationRegistry()
+        # recently seen messages, so proxied replies can quote them without relying on py-cord's message cache.
+        self.references = ReferenceStore(reference_store_bytes)
+        self.fetch_references = fetch_references
+        self.__command_starts: dict[int, int] = {}
+        # interactions that were responded to while still running, and so no longer hold an admission slot.
+        self.__interactions: set[asyncio.Task] = set()
 
         self.__WEBHOOK_CACHE_COUNT = 60
 
-        self.__STRESS_TEST_INTERVAL = 60
-        self.__last_stress_test = 0
-        self.__last_stress_test_result = None
+        self.__PROBE_INTERVAL = 60
+        self.__PROBE_SAMPLE_SIZE = 25
+        self.__probe_task: asyncio.Task | None = None
+        self.__last_probe_result = None
 
         super().__init__(*args, **kwargs)
 
-    def preform_stress_test(self) -> dict[str, float | int]:
+        # restore whatever was hot when we last shut down, rather than rebuilding it all over the first few minutes.
+        self.snapshot_path = snapshot_path
+        self.snapshot_references = snapshot_references
+        self.snapshot_stats: dict | None = None
+        if snapshot_path:
+            self.snapshot_stats = load_snapshot(self, snapshot_path, snapshot_max_age)
+            self.startup.mark("snapshot")
+
+        # time every (slash and prefix) command, from invocation until it either completes or fails.
+        for event in ["on_application_command", "on_command"]:
+            self.add_listener(self.__command_started, event)
+        for event in ["on_application_command_completion", "on_command_completion"]:
+            self.add_listener(self.__command_finished, event)
+        for event in ["on_application_command_error", "on_command_error"]:
+            self.add_listener(self.__command_failed, event)
+        self.add_listener(self.__dispatch_conversation, "on_message")
+        # quotes come from the reference store, so keep it in line with edits and deletions.
+        self.add_listener(self.__reference_edited, "on_raw_message_edit")
+        self.add_listener(self.__reference_deleted, "on_raw_message_delete")
+        self.add_listener(self.__references_deleted, "on_raw_bulk_message_delete")
+        self.add_listener(self.__prefetch_on_ready, "on_ready")
+        self.add_listener(self.__prefetch_on_join, "on_guild_join")
+
+    async def login(self, token: str) -> None:
+        await super().login(token)
+        self.admission.start()
+        self.startup.mark("login")
+
+    async def on_interaction(self, interaction: discord.Interaction):
+        if interaction.type == discord.InteractionType.auto_complete:
+            priority = Priority.AUTOCOMPLETE
+        else:
+            priority = Priority.INTERACTION
+        try:
+            async with self.admission.admit(priority):
+                task = asyncio.create_task(super().on_interaction(interaction))
+                # only hold the slot until it was responded to (or deferred), rather than through whatever it waits
+                # on afterwards (such as confirmations or imports). past the deadline it has failed anyway.
+                deadline = time.monotonic() + self.RESPONSE_DEADLINE
+                while not task.done() and not interaction.response.is_done() and time.monotonic() < deadline:
+                    await asyncio.wait({task}, timeout=0.05)
+        except OverloadedError: # it'd have missed its deadline anyway
+            return
+
+        if task.done():
+            await task
+            return
+        self.__interactions.add(task)
+        task.add_done_callback(self.__interaction_finished)
+
+    def __interaction_finished(self, task: asyncio.Task):
+        self.__interactions.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Unhandled error while processing an interaction! ({task.exception()!r})")
+
+    async def warm_up(self) -> dict | None:
         """
-        Perform a stress-test on the database.
+        Warm up everything that was left to load lazily (and probe the database), without holding up `on_ready`.
 
-        Returns the last result if the last test was preformed less than `__STRESS_TEST_INTERVAL` seconds ago.
-        :return: A dict containing the test results.
-        :rtype: dict[str, float | int]
+        Should be ran as a background task once ready.
+        :return: The health probe's results, or None if it failed.
+        :rtype: dict | None
         """
-        if time.time()-self.__last_stress_test > self.__STRESS_TEST_INTERVAL:
-            db = Data("database.db")
-            users = db.get_all_user_ids()
+        # the first search (such as an autocomplete) would otherwise pay for importing rapidfuzz.
+        await asyncio.get_running_loop().run_in_executor(self.__db_executor, __import__, "rapidfuzz")
+        result = await self.probe_health()
+        self.startup.mark("warmup")
+        return result
+
+    async def prefetch_webhooks(self, guilds: list[discord.Guild] | None = None) -> int:
+        """
+        Learn every channel's webhook (one request per guild), so the first message proxied to each is as fast as
+        any other.
+
+        :param guilds: Which guilds to prefetch. Defaults to every guild we're in.
+        :type guilds: list[discord.Guild] | None
+        :return: How many channels' webhooks were learned.
+        :rtype: int
+        """
+        try:
+            async with self.admission.admit(Priority.BACKGROUND):
+                learned = await self.channel_webhooks.prefetch(
+                    self, self.guilds if guilds is None else guilds, self.precreate_webhooks
+                )
+        except OverloadedError:
+            return 0
+        self.startup.mark("webhooks")
+        return learned
+
+    async def __prefetch_on_ready(self):
+        if self.prefetch_webhooks_enabled:
+            # on_ready fires again after reconnecting, but anything we already know won't be fetched twice.
+            self.loop.create_task(self.prefetch_webhooks(
+                [_ for _ in self.guilds if not self.channel_webhooks.knows_guild(_.id)]
+            ))
+
+    async def __prefetch_on_join(self, guild: discord.Guild):
+        if self.prefetch_webhooks_enabled:
+            await self.prefetch_webhooks([guild])
 
-            # Single user test.
-            user_start = time.time()
-            user = db.get_user(random.choice(users))
-            for character in user.characters_flattened:
-                db.get_character(user, character.name) # manually fetch each character again
-            user_end = time.time()
-            user_total = len(user.characters_flattened)
+    async def __dispatch_conversation(self, message: discord.Message):
+        if not message.author.bot:
+            self.conversations.dispatch(message)
 
-            # Database-wide test.
-            mass_start = time.time()
-            mass_total = 0
+    async def __reference_edited(self, payload: discord.RawMessageUpdateEvent):
+        # edits that don't touch the content (such as embeds resolving) leave it out.
+        if "content" in payload.data:
+            self.references.edit(payload.message_id, payload.data["content"])
 
-            for user in users:
-                user = db.get_user(user)
-                mass_total += len(user.characters_flattened)
-                for character in user.characters_flattened:
-                    db.get_character(user, character.name)
-            mass_end = time.time()
+    async def __reference_deleted(self, payload: discord.RawMessageDeleteEvent):
+        self.references.forget(payload.message_id)
 
-            self.__last_stress_test = time.time()
-            self.__last_stress_test_result = {
-                "mass_time": round(mass_end-mass_start, 5),
-                "mass_count": mass_total,
-                "user_time": round(user_end-user_start, 5),
-                "user_count": user_total,
-                "last_test": self.__last_stress_test
-            }
+    async def __references_deleted(self, payload: discord.RawBulkMessageDeleteEvent):
+        for message_id in payload.message_ids:
+            self.references.forget(message_id)
 
-        return self.__last_stress_test_result
+    async def __command_started(self, ctx):
+        self.__command_starts[id(ctx)] = time.perf_counter_ns()
+
+    async def __command_finished(self, ctx):
+        start = self.__command_starts.pop(id(ctx), None)
+        if start is not None and ctx.command is not None:
+            self.metrics.observe("command", ctx.command.qualified_name, start)
+
+    async def __command_failed(self, ctx, error):
+        await self.__command_finished(ctx)
+        self.metrics.increment("command_errors")
+
+    async def run_db(self, func, *args, **kwargs):
+        """
+        Run a blocking (database) function inside the bot's database executor, without blocking the event loop.
+
+        :param func: The function to run.
+        :return: Whatever the function returned.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.__db_executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def probe_health(self) -> dict | None:
+        """
+        Probe the database's health, then cache the result.
+
+        Only one probe is ever ran at a time, with concurrent calls awaiting the already running probe.
+        :return: The probe's results, or the last successful ones if it failed.
+        :rtype: dict | None
+        """
+        if self.__probe_task is None or self.__probe_task.done():
+            self.__probe_task = asyncio.create_task(self.__probe())
+        return await asyncio.shield(self.__probe_task)
+
+    async def __probe(self) -> dict | None:
+        try:
+            async with self.admission.admit(Priority.BACKGROUND):
+                self.__last_probe_result = await self.run_db(
+                    probe_database, self.__database, self.__PROBE_SAMPLE_SIZE
+                )
+        except OverloadedError:
+            pass
+        except Exception as e: # a failed probe shouldn't take anything else down with it
+            print(f"Database health probe failed! ({e!r})")
+        return self.__last_probe_result
+
+    @property
+    def health_probe(self) -> dict | None:
+        """
+        Get the last health probe's result without waiting.
+
+        Starts a new probe in the background if the last one is older than `__PROBE_INTERVAL` seconds.
+        :return: The last probe's result, or None if no probe has finished yet.
+        :rtype: dict | None
+        """
+        result = self.__last_probe_result
+        if result is None or time.time()-result["last_test"] > self.__PROBE_INTERVAL:
+            if self.__probe_task is None or self.__probe_task.done():
+                self.__probe_task = asyncio.create_task(self.__probe())
+        return result
+
+    async def close(self):
+        # let anything already queued finish proxying while we can still reach Discord.
+        await self.proxy_workers.close()
+        await self.admission.stop()
+        await super().close()
+        # written back before snapshotting, so the snapshot is taken of what the next start will find.
+        self.__database.write_back()
+        if self.snapshot_path:
+            try:
+                written = write_snapshot(self, self.snapshot_path, self.snapshot_references)
+                print(f"Wrote cache snapshot to '{self.snapshot_path}'! ({written})")
+            except Exception as e: # failing to write it only means starting cold next time
+                print(f"Failed to write cache snapshot to '{self.snapshot_path}'! ({e!r})")
+        self.__db_executor.shutdown(wait=False, cancel_futures=True)
+        self.__database.close()
+
+    @property
+    def user_cache(self):
+        # only autocompletes use this, so cachetools isn't imported until the first one.
+        if self.__user_cache is None:
+            from cachetools import TTLCache
+            self.__user_cache = TTLCache(100, 60)
+            self.__prime_user_cache()
+        return self.__user_cache
+
+    def __prime_user_cache(self):
+        restored, self.__restored_users = self.__restored_users, {}
+        if not restored:
+            return
+        # they may have changed since they were restored, so check their versions (all at once) again.
+        versions = self.__database.get_roster_versions(restored.keys())
+        for uid, (user, tid, version) in restored.items():
+            if versions.get(uid) == (tid, version):
+                self.__user_cache[uid] = user
+
+    def restore_users(self, users: dict[str, tuple[User, str, int]]) -> None:
+        """
+        Hand over Users restored from a snapshot, which are put into `user_cache` once it's first used.
+
+        :param users: The Users, alongside the TID and roster version they were written at, by their UUID.
+        :type users: dict[str, tuple[User, str, int]]
+        """
+        if self.__user_cache is None:
+            self.__restored_users.update(users)
+            return
+        for uid, (user, _, _) in users.items():
+            self.__user_cache[uid] = user
+
+    @property
+    def cached_user_ids(self) -> set[str]:
+        """
+        :return: The UUIDs of every cached (or restored, but not yet cached) User, without creating the user cache.
+        :rtype: set[str]
+        """
+        if self.__user_cache is None:
+            return set(self.__restored_users)
+        return set(self.__user_cache.keys())
+
+    def forget_users(self, uids: Iterable[str]) -> int:
+        """
+        Drop cached Users (such as ones changed by another process), so that they're fetched again when next needed.
+
+        :param uids: The users' Discord UUIDs.
+        :type uids: Iterable[str]
+        :return: How many cached Users were dropped.
+        :rtype: int
+        """
+        if self.__user_cache is None:
+            return sum(self.__restored_users.pop(uid, None) is not None for uid in uids)
+        return sum(self.__user_cache.pop(uid, None) is not None for uid in uids)
 
     @property
     def database(self):
@@ -71,6 +365,16 @@ class PsomiBot(Bot):
     def webhook_cache(self):
         return self.__webhook_cache
 
+    @property
+    def query_tracer(self) -> QueryTracer | None:
+        return self.__query_tracer
+
     @property
     def webhook_cache_count(self):
         return self.__WEBHOOK_CACHE_COUNT
+
+
+class ShardedPsomiBot(PsomiBot, AutoShardedBot):
+    """
+    PsomiBot owning several gateway shards (via `shard_ids` and `shard_count`), as ran by each launcher worker.
+    """
@@ -0,0 +1,101 @@
+import asyncio
+from typing import Callable
+import discord
+
+
+class Conversation:
+    """
+    A single pending wait for a user's reply within a channel.
+    """
+    __slots__ = ("future", "check")
+
+    def __init__(self, future: asyncio.Future, check: Callable[[discord.Message], bool] | None):
+        self.future = future
+        self.check = check
+
+
+class ConversationRegistry:
+    """
+    Routes incoming messages to whoever is waiting on a reply from that author in that channel.
+
+    Unlike `bot.wait_for("message", ...)`, which runs every pending check against every message, messages are looked
+    up by their (author ID, channel ID), so pending conversations cost nothing for anyone else's messages.
+    """
+    def __init__(self):
+        self.__pending: dict[tuple[int, int], list[Conversation]] = {}
+
+    @property
+    def pending(self) -> int:
+        """
+        :return: How many conversations are currently waiting on a reply.
+        :rtype: int
+        """
+        return sum(len(_) for _ in self.__pending.values())
+
+    async def wait(
+            self,
+            user_id: int,
+            channel_id: int,
+            check: Callable[[discord.Message], bool] | None = None,
+            timeout: float | None = None
+    ) -> discord.Message:
+        """
+        Wait for a user to reply within a channel.
+
+        If the same user is already being waited on in that channel, replies are handed out in the order the waits
+        started.
+
+        :param user_id: The ID of the user whose reply to wait for.
+        :type user_id: int
+        :param channel_id: The ID of the channel (or DM) the reply should be sent in.
+        :type channel_id: int
+        :param check: If supplied, only replies it accepts are returned. Rejected replies are simply ignored.
+        :type check: Callable[[discord.Message], bool] | None
+        :param timeout: How long to wait for, in seconds. Waits forever if None.
+        :type timeout: float | None
+        :return: The reply.
+        :rtype: discord.Message
+
+        :raises TimeoutError: If no (accepted) reply was sent in time.
+        """
+        key = (user_id, channel_id)
+        conversation = Conversation(asyncio.get_running_loop().create_future(), check)
+        self.__pending.setdefault(key, []).append(conversation)
+        try:
+            return await asyncio.wait_for(conversation.future, timeout)
+        finally:
+            # whether answered, expired or cancelled, it shouldn't be routed to anymore.
+            waiting = self.__pending.get(key)
+            if waiting is not None:
+                try:
+                    waiting.remove(conversation)
+                except ValueError:
+                    pass
+                if not waiting:
+                    del self.__pending[key]
+
+    def dispatch(self, message: discord.Message) -> bool:
+        """
+        Hand a message to the first conversation waiting on it, if any.
+
+        :param message: The received message.
+        :type message: discord.Message
+        :return: Whether a conversation accepted the message.
+        :rtype: bool
+        """
+        waiting = self.__pending.get((message.author.id, message.channel.id))
+        if not waiting:
+            return False
+
+        for conversation in waiting:
+            if conversation.future.done():
+                continue
+            try:
+                accepted = conversation.check is None or conversation.check(message)
+            except Exception as e:
+                conversation.future.set_exception(e)
+                continue
+            if accepted:
+                conversation.future.set_result(message)
+                return True
+        return False
@@ -1,19 +1,34 @@
+import datetime
 import sqlite3
 import os.path
+import sys
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 from dataclasses import dataclass
-from rapidfuzz import process, fuzz
-from psomi.errors import NotFoundError, DuplicateError
+from typing import Iterable, Iterator
+from psomi.errors import DuplicateError, ImportAbortedError, NotFoundError
 from psomi.utils.checking import enforce_annotations
+from psomi.utils.memory_storage import MemoryBackend
+from psomi.utils.prefilter import BracketFilter
+from psomi.utils.storage import StorageBackend, SQLiteBackend
+from psomi.utils.tracing import QueryTracer
 
 #TODO: Possibly find a better solution than tossing objects around?
 
-@dataclass
+_intern = sys.intern
+_set = object.__setattr__
+
+@dataclass(frozen=True, slots=True, init=False)
 class Character:
     """
     Character Dataclass.
 
     Stores various information on a specific Proxy/Character.
+
+    Characters are immutable (changes should be made via `Data` instead), and their name, prefix and ProxyGroup name
+    are interned, so identical strings across cached rosters share memory.
     """
     name: str
     prefix: str
@@ -22,6 +37,21 @@ class Character:
     avatar: str | None = None
     proxy_count: int = 0
 
+    # written by hand, as the generated (frozen) __init__ and a __post_init__ together take almost twice as long.
+    def __init__(
+            self,
+            name: str,
+            prefix: str,
+            proxygroup_name: str | None = None,
+            avatar: str | None = None,
+            proxy_count: int = 0
+    ):
+        _set(self, "name", _intern(name))
+        _set(self, "prefix", _intern(prefix))
+        _set(self, "proxygroup_name", None if proxygroup_name is None else _intern(proxygroup_name))
+        _set(self, "avatar", avatar)
+        _set(self, "proxy_count", proxy_count)
+
 
 class ProxyGroup:
     """
@@ -31,19 +61,22 @@ class ProxyGroup:
 
     Note, that all ProxyGroup objects should be treated as read-only, with changes being made directly to the DB.
     """
-    @enforce_annotations
-    def __init__(self, title: str, tid: str | None, characters: list[Character]):
+    __slots__ = ("__title", "__tid", "__characters", "__by_name")
+
+    # not type checked, as every User reconstruction creates several of these.
+    def __init__(self, title: str, tid: str | None, characters: Iterable[Character]):
         """
         Initializes the ProxyGroup.
 
         :param title: The title (name) of the group.
         :type title: str
         :param characters: Any Character objects it should store.
-        :type characters: list[Character]
+        :type characters: Iterable[Character]
         """
-        self.__characters = characters
+        self.__characters = tuple(characters)
         self.__title = title
         self.__tid = tid
+        self.__by_name: dict[str, Character] | None = None # built on first lookup
 
     @property
     def title(self):
@@ -65,11 +98,10 @@ class ProxyGroup:
     def characters(self):
         """
         :return: All Characters in this ProxyGroup.
-        :rtype: list[Character]
+        :rtype: tuple[Character, ...]
         """
         return self.__characters
 
-    @enforce_annotations
     def get_character_by_name(self, name: str) -> Character:
         """
         Get a character by their name.
@@ -80,16 +112,17 @@ class ProxyGroup:
         :rtype: Character
         :raises ValueError: If no such character exists.
         """
-        for character in self.__characters:
-            if character.name == name:
-                return character
-
-        raise ValueError(f"No such character '{name}'.")
+        if self.__by_name is None:
+            self.__by_name = {_.name: _ for _ in self.__characters}
+        try:
+            return self.__by_name[name]
+        except KeyError:
+            raise ValueError(f"No such character '{name}'.") from None
 
     def __repr__(self):
         return (f"ProxyGroup(\"{self.__title}\", " +
                 ("None" if self.__tid is None else f"\"{self.__tid}\"")
-                + f", {self.__characters})")
+                + f", {list(self.__characters)})")
 
     def __iter__(self):
         """
@@ -97,15 +130,21 @@ class ProxyGroup:
 
         :returns: All characters under this group.
         """
-        for _ in self.__characters:
-            yield _
+        return iter(self.__characters)
 
 class User:
-    @enforce_annotations
+    __slots__ = ("__uid", "__tid", "__proxy_groups", "__flattened", "__by_name", "__by_prefix", "__brackets")
+
+    # not type checked, as this is reconstructed for nearly every proxied message.
     def __init__(self, uid: str, tid: str, proxy_groups: list[ProxyGroup]):
         self.__uid = uid
         self.__tid = tid
         self.__proxy_groups = proxy_groups
+        # every derived view is built on first access, then kept, since Users are read-only.
+        self.__flattened: tuple[Character, ...] | None = None
+        self.__by_name: dict[str, Character] | None = None
+        self.__by_prefix: dict[str, Character] | None = None
+        self.__brackets: tuple[tuple[Character, str | None, str | None], ...] | None = None
 
     @property
     def uid(self):
@@ -123,11 +162,57 @@ class User:
     def characters_flattened(self):
         """
         Get a flattened list of this User's Characters.
-        :return:
+        :return: Every Character, in ProxyGroup order.
+        :rtype: tuple[Character, ...]
+        """
+        if self.__flattened is None:
+            self.__flattened = tuple(i for si in self.__proxy_groups for i in si)
+        return self.__flattened
+
+    @property
+    def brackets(self) -> tuple[tuple[Character, str | None, str | None], ...]:
         """
-        return [i for si in self.__proxy_groups for i in si]
+        :return: Every Character alongside their prefix and suffix (None if empty), split from their brackets.
+        :rtype: tuple[tuple[Character, str | None, str | None], ...]
+        """
+        if self.__brackets is None:
+            brackets = []
+            for character in self.characters_flattened:
+                prefix, suffix = character.prefix.split("text")
+                brackets.append((character, prefix or None, suffix or None))
+            self.__brackets = tuple(brackets)
+        return self.__brackets
+
+    def get_character_by_name(self, name: str) -> Character:
+        """
+        Get one of this User's Characters by their name.
+
+        :raises ValueError: If no such character exists.
+        """
+        if self.__by_name is None:
+            self.__by_name = {_.name: _ for _ in self.characters_flattened}
+        try:
+            return self.__by_name[name]
+        except KeyError:
+            raise ValueError(f"No such character '{name}'.") from None
+
+    def get_character_by_prefix(self, prefix: str) -> Character:
+        """
+        Get one of this User's Characters by their (full) brackets.
+
+        :raises ValueError: If no such character exists.
+        """
+        if self.__by_prefix is None:
+            self.__by_prefix = {_.prefix: _ for _ in self.characters_flattened}
+        try:
+            return self.__by_prefix[prefix]
+        except KeyError:
+            raise ValueError(f"No character with the brackets '{prefix}'.") from None
 
     def get_character_by_search(self, query: str, limit: int = 10) -> list[tuple[Character, int]]:
+        # rapidfuzz is only ever needed here, so it isn't imported until someone searches (or the bot warms it up).
+        from rapidfuzz import process, fuzz
+
         characters = self.characters_flattened
         # noinspection PyTypeChecker
         matches = process.extract( # rank by character name
@@ -143,6 +228,8 @@ class User:
         ][:limit]
 
     def get_proxygroup_by_search(self, query: str, limit: int = 10) -> list[tuple[ProxyGroup, int]]:
+        from rapidfuzz import process, fuzz
+
         groups = self.proxy_groups
 
         # noinspection PyTypeChecker
@@ -156,79 +243,35 @@ class User:
             for i, match in enumerate(matches) if match[1] >= 60
         ][:limit]
 
-def db_get_user_row(cursor: sqlite3.Cursor, did: str) -> sqlite3.Row:
+def locate_page(group_sizes: list[int], page_num: int, page_size: int) -> dict:
     """
-    Get an SQLite Row containing user data.
-
-    Assumes row_factory has been set to sqlite3.Row!
+    Locate a page within a list of group sizes, without needing the groups themselves.
 
-    :param cursor: The current SQL Database Cursor.
-    :type cursor: sqlite3.Cursor
-    :param did: The UUID of the Discord user to fetch.
-    :type did: str
-    :return: The SQLite Row fetched.
-    :rtype: sqlite3.Row
+    Follows the same rules as `sort_by_page`, where every group takes up at least one page.
 
-    :raises NotFoundError: If the Database does not contain a user entry with that UUID.
-    """
-    try:
-        return cursor.execute(
-            "SELECT * FROM users WHERE did=?",
-            (did,)
-        ).fetchall()[0]
-    except IndexError as e:
-        raise NotFoundError(f"No such user of UUID '{did}'.") from e
-
-
-def db_get_group_row(cursor: sqlite3.Cursor, user_tid: str, group_title: str) -> sqlite3.Row:
-    """
-    Get an SQLite Row containing ProxyGroup data.
-
-    Assumes row_factory has been set to sqlite3.Row!
-
-    :param cursor: The current SQL Database Cursor.
-    :type cursor: sqlite3.Cursor
-    :param user_tid: The Table ID of the User to fetch.
-    :type user_tid: str
-    :param group_title: The title of the ProxyGroup to search for.
-    :type group_title: str
-    :return: The SQLite Row fetched.
-    :rtype: sqlite3.Row
-
-    :raises NotFoundError: If the Database does not contain a ProxyGroup under that name.
-    """
-    try:
-        return cursor.execute(
-            "SELECT * FROM proxy_groups WHERE user_tid=? AND title=?",
-            (user_tid, group_title)
-        ).fetchall()[0]
-    except IndexError as e:
-        raise NotFoundError(f"No such ProxyGroup of name '{group_title}'.") from e
-
-def db_get_character(cursor: sqlite3.Cursor, user_tid: str, character_name: str) -> sqlite3.Row:
+    :param group_sizes: The size of each group, in order.
+    :type group_sizes: list[int]
+    :param page_num: What page to locate.
+    :type page_num: int
+    :param page_size: How large the page should be.
+    :type page_size: int
+    :return: The group number (starting at 1, or 0 if out of bounds), the offset into that group and the page total.
+    :rtype: dict
     """
-    Get an SQLite Row containing Character data.
+    page_total = [max(1, -(-size // page_size)) for size in group_sizes]
 
-    Assumes row_factory has been set to sqlite3.Row!
+    for i, num_pages_in_group in enumerate(page_total):
+        if page_num <= num_pages_in_group:
+            return {
+                "group_num": i+1,
+                "page_total": sum(page_total),
+                "offset": (page_num - 1) * page_size,
+            }
 
-    :param cursor: The current SQL Database Cursor.
-    :type cursor: sqlite3.Cursor
-    :param user_tid: The Table ID of the User to fetch.
-    :type user_tid: str
-    :param character_name: The name of the Character to search for.
-    :type character_name: str
-    :return: The SQLite Row fetched.
-    :rtype: sqlite3.Row
+        page_num -= num_pages_in_group
 
-    :raises NotFoundError: If the Database does not contain a Character under that name.
-    """
-    try:
-        return cursor.execute(
-            "SELECT * FROM characters WHERE user_tid=? AND name=?",
-            (user_tid, character_name)
-        ).fetchall()[0]
-    except IndexError as e:
-        raise NotFoundError(f"No such character with name '{character_name}'.") from e
+    # Out of bounds.
+    return {"group_num": 0, "page_total": sum(page_total), "offset": 0}
 
 
 def sort_by_page(groups: list[list], page_num: int, page_size: int) -> dict:
@@ -244,87 +287,107 @@ def sort_by_page(groups: list[list], page_num: int, page_size: int) -> dict:
     :return: The sorted page.
     :rtype: dict
     """
-    page_total = [max(1, -(-len(group) // page_size)) for group in groups]
+    location = locate_page([len(group) for group in groups], page_num, page_size)
 
-    for i, group in enumerate(groups):
-        num_pages_in_group = page_total[i]
+    if location["group_num"] == 0:
+        # Out of bounds.
+        return {"group_num": 0, "page_total": location["page_total"], "page": []}
 
-        if page_num <= num_pages_in_group:
-            start_idx = (page_num - 1) * page_size
-            end_idx = start_idx + page_size
-            
-            return {
-                "group_num": i+1,
-                "page_total": sum(page_total),
-                "page": group[start_idx:end_idx],
-            }
-
-        page_num -= num_pages_in_group
-
-    # Out of bounds.
-    return {"group_num": 0, "page_total": sum(page_total), "page": []}
+    start_idx = location["offset"]
+    return {
+        "group_num": location["group_num"],
+        "page_total": location["page_total"],
+        "page": groups[location["group_num"]-1][start_idx:start_idx+page_size],
+    }
 
 class Data:
     """
     Main Database class.
 
     Allows for the storage and modification of various Proxies and ProxyGroups.
+
+    Where (and how) everything is stored is up to its StorageBackend, with SQLite being the default.
     """
     @enforce_annotations
-    def __init__(self, data_path: str):
+    def __init__(
+            self,
+            data_path: str,
+            tracer: QueryTracer | None = None,
+            engine: str = "sqlite",
+            snapshot_interval: int = 10_000,
+            per_guild_stats: bool = True,
+            change_retention: int = 60 * 60
+    ):
         """
         Initializes the Database.
 
-        If the database does not exist, it will be created via `_prep`, with all required tables
+        If the database does not exist, it will be created by its backend, with all required tables
         automatically being created.
         :param data_path: The location of the database.
         :type data_path: str
+        :param tracer: If supplied, every statement ran will be traced by it. (SQLite only)
+        :type tracer: QueryTracer | None
+        :param engine: Which storage engine to use, either "sqlite" or "memory".
+        :type engine: str
+        :param snapshot_interval: How many journal entries the memory engine writes before snapshotting.
+        :type snapshot_interval: int
+        :param per_guild_stats: Whether to keep proxy stats per guild, rather than only per Character.
+        :type per_guild_stats: bool
+        :param change_retention: How long (in seconds) changes are recorded for other processes to `sync`.
+        :type change_retention: int
+
+        :raises ValueError: If there is no such engine.
         """
-        self.__data_path = data_path
-        self._prep()
+        match engine:
+            case "sqlite":
+                self.__backend: StorageBackend = SQLiteBackend(data_path, tracer)
+            case "memory":
+                self.__backend: StorageBackend = MemoryBackend(data_path, snapshot_interval)
+            case _:
+                raise ValueError(f"Unknown storage engine '{engine}'.")
+        self.engine = engine
+
+        # where `sync` picks up from. read before anything is loaded, so that nothing changed in between is missed.
+        self.change_retention = change_retention
+        self.__data_version = self.__backend.data_version()
+        with self.__backend.transaction() as tx:
+            self.__change_seq = tx.get_change_seq()
+        self.__synced_at = time.monotonic()
+
+        # every registered user's UUID, so that non-users can be told apart without touching the DB.
+        self.__registered: set[str] = set(self.get_all_user_ids())
+        # built lazily for each user that sends a message, and dropped whenever their brackets change.
+        self.__bracket_filters: dict[str, BracketFilter] = {}
+
+        # every User's fronts (user uuid -> scope id -> (scope, character name)), so that autoproxying never has to
+        # touch the DB. changes are only written back every so often, by `flush_fronts`.
+        self.__fronts: dict[str, dict[str, tuple[str, str]]] = {}
+        self.__dirty_fronts: dict[tuple[str, str], tuple[str, str] | None] = {}
+        self.__fronts_lock = threading.Lock() # flushes run in another thread
+        self.__load_fronts()
+        # the rosters of Users with fronts, so that autoproxying doesn't have to load them for every message. dropped
+        # whenever a roster changes, with the generation telling loads that raced a change apart.
+        self.__front_users: dict[str, User] = {}
+        self.__roster_generation = 0
+
+        # proxies counted since the last `flush_proxy_stats`, by (user uuid, character name, guild id, day).
+        self.per_guild_stats = per_guild_stats
+        self.__proxy_stats: dict[tuple[str, str, str, str], int] = {}
+        self.__stats_lock = threading.Lock()
+
+    def write_back(self) -> None:
+        """
+        Write back every pending front and proxy stat change right away, such as while shutting down.
+        """
+        for flush in [self.flush_fronts, self.flush_proxy_stats]:
+            try:
+                flush()
+            except Exception as e: # whatever comes next (such as closing the backend) still has to happen
+                print(f"Failed to write back pending changes! ({e!r})")
 
-    def _prep(self):
-        if not os.path.exists(self.__data_path):
-            with sqlite3.connect(self.__data_path) as conn:
-                cursor = conn.cursor()
-
-                # Create DB User Table
-                #
-                # tid: Table ID. Used to make table values unique.
-                # did: Discord ID. Refers to the UUID of the User.
-                #
-                cursor.execute("""
-                CREATE TABLE users (
-                    tid TEXT UNIQUE NOT NULL PRIMARY KEY,
-                    did TEXT UNIQUE NOT NULL
-                )
-                """)
-                # Store ProxyGroups in their own table.
-                cursor.execute("""
-                CREATE TABLE proxy_groups (
-                    tid TEXT UNIQUE NOT NULL PRIMARY KEY,
-                    user_tid TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    FOREIGN KEY (user_tid) REFERENCES users(tid)
-                    UNIQUE (user_tid, title)
-                )
-                """)
-                # As well as Characters, cross-referencing all of them together.
-                cursor.execute("""
-                CREATE TABLE characters (
-                    tid TEXT UNIQUE NOT NULL PRIMARY KEY,
-                    proxygroup_tid TEXT DEFAULT NULL,
-                    user_tid TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    prefix TEXT NOT NULL,
-                    avatar TEXT,
-                    proxy_count INT NOT NULL DEFAULT 0,
-                    FOREIGN KEY (proxygroup_tid) REFERENCES proxy_groups(tid) ON DELETE SET NULL,
-                    FOREIGN KEY (user_tid) REFERENCES users(tid),
-                    UNIQUE (user_tid, name),
-                    UNIQUE (user_tid, prefix)
-                )
-                """)
+    def close(self):
+        self.write_back()
+        self.__backend.close()
 
     def get_all_user_ids(self) -> list[str]:
         """
@@ -334,14 +397,114 @@ class Data:
         :return: A list of every registered user.
         :rtype: list[str]
         """
-        with sqlite3.connect(self.__data_path) as conn:
-            cursor = conn.cursor()
+        with self.__backend.transaction() as tx:
+            return tx.get_all_user_ids()
+
+    def sync(self) -> set[str]:
+        """
+        Pick up changes made by other processes sharing the same database, such as other shard workers or admin tools.
 
-            users = cursor.execute(
-                "SELECT did FROM users"
-            ).fetchall()
+        Only checks the backend's data version when nothing was committed since the last sync. Otherwise, only the
+        Users changed by other processes have their BracketFilter dropped and fronts reloaded, unless the last sync
+        was so long ago that their changes may have been pruned since, in which case everything is reloaded.
 
-            return [_[0] for _ in users]
+        :return: The UUIDs of every User whose cached state went stale, so that any other caches of them can be
+            dropped as well.
+        :rtype: set[str]
+        """
+        now = time.monotonic()
+        version = self.__backend.data_version()
+        if version is not None and version == self.__data_version:
+            self.__synced_at = now
+            return set()
+
+        if now - self.__synced_at > self.change_retention:
+            with self.__backend.transaction() as tx:
+                seq = tx.get_change_seq()
+                registered = set(tx.get_all_user_ids())
+            stale = self.__registered | registered
+            self.__registered = registered
+            self.__bracket_filters.clear()
+            self.__reload_fronts(None)
+        else:
+            with self.__backend.transaction() as tx:
+                seq, changed = tx.get_user_changes(self.__change_seq)
+            stale = set(changed)
+            self.__registered.update(stale) # users are never deleted
+            for uid in stale:
+                self.__bracket_filters.pop(uid, None)
+            if stale:
+                self.__reload_fronts(stale)
+
+        self.__data_version = version
+        self.__change_seq = seq
+        self.__synced_at = now
+        return stale
+
+    def prune_changes(self) -> int:
+        """
+        Forget every change recorded more than `change_retention` seconds ago.
+
+        :return: How many changes were forgotten.
+        :rtype: int
+        """
+        with self.__backend.transaction() as tx:
+            return tx.prune_user_changes(time.time() - self.change_retention)
+
+    def is_registered(self, uid: str) -> bool:
+        """
+        Check whether a user is registered, without querying the database.
+
+        Answered from an in-memory set loaded when the Database is initialized, and kept up to date by `add_user`.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :return: Whether the user is registered.
+        :rtype: bool
+        """
+        return uid in self.__registered
+
+    @property
+    def registered_count(self) -> int:
+        """
+        :return: How many users are registered.
+        :rtype: int
+        """
+        return len(self.__registered)
+
+    def get_bracket_filter(self, uid: str) -> BracketFilter:
+        """
+        Get a User's BracketFilter, which cheaply rejects messages none of their Characters could proxy.
+
+        Only queries the database the first time it is requested, or after one of the User's brackets changed.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :return: The User's BracketFilter (empty if they don't exist).
+        :rtype: BracketFilter
+        """
+        bracket_filter = self.__bracket_filters.get(uid)
+        if bracket_filter is not None:
+            return bracket_filter
+
+        with self.__backend.transaction() as tx:
+            brackets = tx.get_brackets(uid)
+
+        bracket_filter = self.__bracket_filters[uid] = BracketFilter(brackets)
+        return bracket_filter
+
+    @enforce_annotations
+    def get_random_user_ids(self, limit: int) -> list[str]:
+        """
+        Get the (Discord) UUIDs of a random sample of registered users.
+
+        :param limit: The maximum amount of UUIDs to return.
+        :type limit: int
+        :return: Up to `limit` randomly chosen UUIDs.
+        :rtype: list[str]
+        """
+        with self.__backend.transaction() as tx:
+            return tx.get_random_user_ids(limit)
 
     @enforce_annotations
     def get_user(self, uid: str) -> User:
@@ -350,48 +513,35 @@ class Data:
 
         Includes all Characters and ProxyGroups registered under the UID.
 
-        :param uid: The user's Discord UUID.
+        :param uid: The UUID of the Discord user to fetch.
         :type uid: str
         :returns: The fully reconstructed User class.
         :rtype: User
 
         :raises NotFoundError: if the UUID is not valid or no such user exists.
         """
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
+        with self.__backend.transaction() as tx:
             # find the user by their Discord UUID, then locate all characters and ProxyGroups that are
             # linked to the user via its TID.
             final = []
-            db_user = db_get_user_row(cursor, uid)
-            db_proxygroups = cursor.execute(
-                "SELECT * FROM proxy_groups WHERE user_tid=?",
-                (db_user["tid"],)
-            ).fetchall()
-            for group in db_proxygroups:
+            db_user = tx.get_user_row(uid)
+            for group in tx.get_group_rows(db_user["tid"]):
                 # all characters have a link to their proxygroups, so we can filter them by the TID
-                db_characters = cursor.execute("SELECT * FROM characters WHERE proxygroup_tid=?",
-                                            (group["tid"],)).fetchall()
                 db_characters = [
                     Character(
                         _["name"], _["prefix"], group["title"], _["avatar"], _["proxy_count"]
-                    ) for _ in db_characters
+                    ) for _ in tx.get_character_rows(db_user["tid"], group["tid"])
                 ]  # reconstruction
 
                 final.append(ProxyGroup(group["title"], group["tid"], db_characters))
 
             # add all characters without a group into a new "Uncategorized" ProxyGroup
-            db_ungrouped = cursor.execute(
-                "SELECT * FROM characters WHERE user_tid=? AND proxygroup_tid IS NULL",
-                (db_user["tid"],)
-            ).fetchall()
-
             final.append(
                 ProxyGroup(
                     "Uncategorized",
                     None,
-                    [Character(_["name"], _["prefix"], None, _["avatar"], _["proxy_count"]) for _ in db_ungrouped]
+                    [Character(_["name"], _["prefix"], None, _["avatar"], _["proxy_count"])
+                     for _ in tx.get_character_rows(db_user["tid"], None)]
                 )
             )
 
@@ -409,20 +559,536 @@ class Data:
 
         :raises DuplicateError: If a user with that UUID already exists.
         """
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        with self.__backend.transaction() as tx:
+            user_tid = str(uuid.uuid4())  # Generate a new UUID for the user
+            tx.insert_user(user_tid, uid)
+
+        self.__registered.add(uid)
+        return User(uid, user_tid, [])
+
+    @contextmanager
+    def session(self, uid: str, create: bool = False) -> Iterator["Session"]:
+        """
+        Open a Session (unit of work) on a User's roster, resolving them only once.
+
+        Everything done through the Session is committed together once the `with` block exits, bumping the
+        roster version once if anything changed. If the block raises, nothing is committed.
 
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :param create: Whether to register the User if they don't exist yet.
+        :type create: bool
+        :return: The Session.
+        :rtype: Session
+
+        :raises NotFoundError: If that User does not exist (and `create` is False).
+        """
+        created = False
+        with self.__changing(uid), self.__backend.transaction() as tx:
             try:
-                user_tid = str(uuid.uuid4())  # Generate a new UUID for the user
-                cursor.execute(
-                    "INSERT INTO users (tid, did) VALUES (?, ?)",
-                    (user_tid, uid)
+                db_user = tx.get_user_row(uid)
+            except NotFoundError:
+                if not create:
+                    raise
+                tx.insert_user(str(uuid.uuid4()), uid)
+                db_user = tx.get_user_row(uid)
+                created = True
+
+            session = Session(tx, db_user)
+            yield session
+            if session.changed:
+                tx.bump_user_version(db_user["tid"])
+
+        if created:
+            self.__registered.add(uid)
+        if session.brackets_changed:
+            self.__bracket_filters.pop(uid, None)
+        # a fronted Character may have been renamed or deleted.
+        if session.changed and self.__fronts.get(uid):
+            self.refresh_fronts(uid)
+
+    @enforce_annotations
+    def get_roster_version(self, uid: str) -> int:
+        """
+        Get the current roster version of a User.
+
+        The version is incremented every time one of the User's Characters or ProxyGroups change, making it a cheap
+        way to tell whether something built from an earlier read is stale.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :return: The User's roster version.
+        :rtype: int
+
+        :raises NotFoundError: If that User does not exist.
+        """
+        with self.__backend.transaction() as tx:
+            return tx.get_user_row(uid)["version"]
+
+    def get_roster_versions(self, uids: Iterable[str]) -> dict[str, tuple[str, int]]:
+        """
+        Get the TID and current roster version of several Users at once, within a single transaction.
+
+        :param uids: The users' Discord UUIDs.
+        :type uids: Iterable[str]
+        :return: Every User's (TID, roster version), by their UUID. Users that don't exist are left out.
+        :rtype: dict[str, tuple[str, int]]
+        """
+        versions = {}
+        with self.__backend.transaction() as tx:
+            for uid in uids:
+                try:
+                    db_user = tx.get_user_row(uid)
+                except NotFoundError:
+                    continue
+                versions[uid] = (db_user["tid"], db_user["version"])
+        return versions
+
+    @property
+    def bracket_filters(self) -> dict[str, BracketFilter]:
+        """
+        :return: A copy of every BracketFilter built so far, by their User's UUID.
+        :rtype: dict[str, BracketFilter]
+        """
+        return dict(self.__bracket_filters)
+
+    def prime_bracket_filters(self, filters: dict[str, BracketFilter]) -> int:
+        """
+        Hand over already built BracketFilters (such as ones restored after a restart), so that they don't have to
+        be built from the database again.
+
+        The caller is responsible for making sure they are still up to date. Filters of Users that aren't registered
+        (or that were already built) are ignored.
+
+        :param filters: The filters, by their User's UUID.
+        :type filters: dict[str, BracketFilter]
+        :return: How many filters were taken.
+        :rtype: int
+        """
+        primed = 0
+        for uid, bracket_filter in filters.items():
+            if uid in self.__registered and uid not in self.__bracket_filters:
+                self.__bracket_filters[uid] = bracket_filter
+                primed += 1
+        return primed
+
+    def __load_fronts(self, user_tid: str | None = None):
+        with self.__backend.transaction() as tx:
+            rows = tx.get_front_rows(user_tid)
+        for row in rows:
+            self.__fronts.setdefault(row["did"], {})[row["scope_id"]] = (row["scope"], row["name"])
+
+    def __reload_fronts(self, uids: set[str] | None):
+        # our own pending changes would otherwise be overwritten by what's in the DB.
+        self.flush_fronts()
+        fronts: dict[str, dict[str, tuple[str, str]]] = {}
+        with self.__backend.transaction() as tx:
+            if uids is None:
+                rows = tx.get_front_rows()
+            else:
+                rows = []
+                for uid in uids:
+                    try:
+                        rows.extend(tx.get_front_rows(tx.get_user_row(uid)["tid"]))
+                    except NotFoundError:
+                        continue
+        for row in rows:
+            fronts.setdefault(row["did"], {})[row["scope_id"]] = (row["scope"], row["name"])
+
+        with self.__fronts_lock:
+            # anything set since the flush above is newer than what was just read.
+            dirty = {_[0] for _ in self.__dirty_fronts}
+            for uid in (self.__fronts.keys() | fronts.keys()) if uids is None else uids:
+                if uid in dirty:
+                    continue
+                if uid in fronts:
+                    self.__fronts[uid] = fronts[uid]
+                else:
+                    self.__fronts.pop(uid, None)
+        # their rosters changed too, most likely.
+        self.__roster_generation += 1
+        if uids is None:
+            self.__front_users.clear()
+        else:
+            for uid in uids:
+                self.__front_users.pop(uid, None)
+
+    @contextmanager
+    def __changing(self, uid: str) -> Iterator[None]:
+        # wraps a transaction that changes a User's roster, dropping anything cached of it only once committed. if
+        # it were dropped any earlier, it could be cached again from what's about to change.
+        try:
+            yield
+        finally:
+            self.__roster_generation += 1
+            self.__front_users.pop(uid, None)
+
+    @enforce_annotations
+    def get_front_user(self, uid: str) -> User:
+        """
+        Get the roster of a User with fronts (see `get_front`), which is kept in memory until it changes.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :return: The User.
+        :rtype: User
+
+        :raises NotFoundError: If that User does not exist.
+        """
+        user = self.__front_users.get(uid)
+        if user is not None:
+            return user
+
+        generation = self.__roster_generation
+        user = self.get_user(uid)
+        if generation == self.__roster_generation and self.__fronts.get(uid):
+            self.__front_users[uid] = user
+        return user
+
+    def get_front(self, uid: str, channel_id: str, guild_id: str | None) -> str | None:
+        """
+        Get the Character a User autoproxies as within a channel, preferring one set for the channel itself over the
+        guild's.
+
+        Answered from memory. Not type checked, as this is called for nearly every message.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :param channel_id: The ID of the channel.
+        :type channel_id: str
+        :param guild_id: The ID of the channel's guild, if it's in one.
+        :type guild_id: str | None
+        :return: The Character's name, or None if they don't have a front there.
+        :rtype: str | None
+        """
+        fronts = self.__fronts.get(uid)
+        if not fronts:
+            return None
+        front = fronts.get(channel_id)
+        if front is None and guild_id is not None:
+            front = fronts.get(guild_id)
+        return front[1] if front is not None else None
+
+    @enforce_annotations
+    def get_fronts(self, uid: str) -> dict[str, tuple[str, str]]:
+        """
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :return: Every front a User has set, as the scope ("guild" or "channel") and Character name, by scope ID.
+        :rtype: dict[str, tuple[str, str]]
+        """
+        return dict(self.__fronts.get(uid, {}))
+
+    @enforce_annotations
+    def set_front(self, user: User, scope: str, scope_id: str, character: Character | None) -> None:
+        """
+        Set (or clear) the Character a User autoproxies as within a guild or channel.
+
+        Takes effect immediately, but is only written to the DB by the next `flush_fronts`.
+
+        :param user: The User whose front to set.
+        :type user: User
+        :param scope: Whether `scope_id` refers to a "guild" or a "channel".
+        :type scope: str
+        :param scope_id: The ID of the guild or channel.
+        :type scope_id: str
+        :param character: The Character to front as, or None to clear the front.
+        :type character: Character | None
+
+        :raises ValueError: If the scope isn't valid.
+        """
+        if scope not in ("guild", "channel"):
+            raise ValueError(f"Invalid front scope '{scope}'.")
+
+        with self.__fronts_lock:
+            if character is None:
+                self.__fronts.get(user.uid, {}).pop(scope_id, None)
+                self.__dirty_fronts[(user.uid, scope_id)] = None
+                if not self.__fronts.get(user.uid):
+                    self.__front_users.pop(user.uid, None)
+            else:
+                self.__fronts.setdefault(user.uid, {})[scope_id] = (scope, character.name)
+                self.__dirty_fronts[(user.uid, scope_id)] = (scope, character.name)
+
+    @property
+    def pending_fronts(self) -> int:
+        """
+        :return: How many front changes have yet to be written to the DB.
+        :rtype: int
+        """
+        return len(self.__dirty_fronts)
+
+    def flush_fronts(self) -> int:
+        """
+        Write every front changed since the last flush to the DB, within a single transaction.
+
+        Fronts whose Character was deleted in the meantime are dropped.
+
+        :return: How many fronts were written (or cleared).
+        :rtype: int
+        """
+        with self.__fronts_lock:
+            dirty, self.__dirty_fronts = self.__dirty_fronts, {}
+        if not dirty:
+            return 0
+
+        try:
+            with self.__backend.transaction() as tx:
+                for (uid, scope_id), front in dirty.items():
+                    try:
+                        db_user = tx.get_user_row(uid)
+                    except NotFoundError:
+                        continue
+                    if front is None:
+                        tx.delete_front(db_user["tid"], scope_id)
+                        continue
+                    try:
+                        db_character = tx.get_character_row(db_user["tid"], front[1])
+                    except NotFoundError:
+                        tx.delete_front(db_user["tid"], scope_id)
+                        continue
+                    tx.upsert_front(db_user["tid"], scope_id, front[0], db_character["tid"])
+        except BaseException:
+            # try again next time, without overwriting anything changed since.
+            with self.__fronts_lock:
+                self.__dirty_fronts = {**dirty, **self.__dirty_fronts}
+            raise
+        return len(dirty)
+
+    @enforce_annotations
+    def refresh_fronts(self, uid: str) -> None:
+        """
+        Reload a User's fronts from the DB (after writing back any pending changes), such as after one of their
+        Characters was renamed or deleted.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        """
+        self.__reload_fronts({uid})
+
+    def record_proxy(self, uid: str, character: str, guild_id: str | None) -> None:
+        """
+        Count a message proxied by a Character, in memory until the next `flush_proxy_stats`.
+
+        Not type checked, as this is called for every proxied message.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :param character: The Character's name.
+        :type character: str
+        :param guild_id: The ID of the guild it was proxied in, if any.
+        :type guild_id: str | None
+        """
+        day = time.strftime("%Y-%m-%d", time.gmtime())
+        key = (uid, character, (guild_id or "") if self.per_guild_stats else "", day)
+        with self.__stats_lock:
+            self.__proxy_stats[key] = self.__proxy_stats.get(key, 0) + 1
+
+    @property
+    def pending_proxy_stats(self) -> int:
+        """
+        :return: How many proxies have been counted, but not yet written to the DB.
+        :rtype: int
+        """
+        return sum(self.__proxy_stats.values())
+
+    def flush_proxy_stats(self) -> int:
+        """
+        Write every proxy counted since the last flush to the DB, within a single transaction.
+
+        Each Character's daily bucket (and total `proxy_count`) is incremented once. Roster versions are left alone,
+        as counts changing every few seconds would otherwise make every cache of the busiest Users go stale along with
+        them. Counts of Characters renamed or deleted in the meantime are dropped.
+
+        :return: How many proxies were written.
+        :rtype: int
+        """
+        with self.__stats_lock:
+            pending, self.__proxy_stats = self.__proxy_stats, {}
+        if not pending:
+            return 0
+
+        try:
+            with self.__backend.transaction() as tx:
+                user_tids: dict[str, str | None] = {}
+                character_tids: dict[tuple[str, str], str | None] = {}
+                totals: dict[str, int] = {}
+                for (uid, name, guild_id, day), count in pending.items():
+                    if uid not in user_tids:
+                        try:
+                            user_tids[uid] = tx.get_user_row(uid)["tid"]
+                        except NotFoundError:
+                            user_tids[uid] = None
+                    user_tid = user_tids[uid]
+                    if user_tid is None:
+                        continue
+                    if (uid, name) not in character_tids:
+                        try:
+                            character_tids[(uid, name)] = tx.get_character_row(user_tid, name)["tid"]
+                        except NotFoundError:
+                            character_tids[(uid, name)] = None
+                    character_tid = character_tids[(uid, name)]
+                    if character_tid is None:
+                        continue
+
+                    tx.add_proxy_count(user_tid, character_tid, guild_id, "day", day, count)
+                    totals[character_tid] = totals.get(character_tid, 0) + count
+
+                for character_tid, count in totals.items():
+                    db_character = tx.get_character_row_by_tid(character_tid)
+                    tx.update_character_column(character_tid, "proxy_count", db_character["proxy_count"] + count)
+        except BaseException:
+            # try again next time, on top of anything counted since.
+            with self.__stats_lock:
+                for key, count in pending.items():
+                    self.__proxy_stats[key] = self.__proxy_stats.get(key, 0) + count
+            raise
+        return sum(pending.values())
+
+    @enforce_annotations
+    def compact_proxy_stats(self, keep_days: int = 90) -> int:
+        """
+        Fold daily proxy stats older than `keep_days` into monthly ones, so that they don't grow forever.
+
+        :param keep_days: How many days (including today) to keep daily stats for.
+        :type keep_days: int
+        :return: How many daily buckets were folded.
+        :rtype: int
+        """
+        cutoff = datetime.datetime.now(datetime.timezone.utc).date() - datetime.timedelta(days=keep_days - 1)
+        with self.__backend.transaction() as tx:
+            return tx.compact_proxy_stats(cutoff.isoformat())
+
+    @enforce_annotations
+    def get_proxy_stats(self, uid: str, days: int = 30) -> dict:
+        """
+        Summarize how often a User's Characters were proxied recently, reading only the (already bucketed) stats.
+
+        Days that were already compacted count as their whole month.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :param days: How many days (including today) to summarize.
+        :type days: int
+        :return: The "total", and the counts by "character", by "guild" (an empty string if not tracked) and by "day"
+            (compacted days by month instead), most first.
+        :rtype: dict
+
+        :raises NotFoundError: If that User does not exist.
+        """
+        since = datetime.datetime.now(datetime.timezone.utc).date() - datetime.timedelta(days=days - 1)
+        with self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(uid)
+            rows = tx.get_proxy_stat_rows(db_user["tid"], since.isoformat(), since.isoformat()[:7])
+
+        stats = {"total": 0, "character": {}, "guild": {}, "day": {}}
+        for row in rows:
+            stats["total"] += row["count"]
+            for key, value in [("character", row["name"]), ("guild", row["guild_id"]), ("day", row["bucket"])]:
+                stats[key][value] = stats[key].get(value, 0) + row["count"]
+        for key in ["character", "guild", "day"]:
+            stats[key] = dict(sorted(stats[key].items(), key=lambda x: x[1], reverse=True))
+        return stats
+
+    @enforce_annotations
+    def get_character_page(self, uid: str, page_num: int, page_size: int) -> dict:
+        """
+        Fetch a single page of a User's Characters, without reconstructing their entire profile.
+
+        Pages are laid out the same way `sort_by_page` would lay out `User.proxy_groups`, with one ProxyGroup shown
+        at a time and Uncategorized Characters always coming last.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :param page_num: What page to fetch.
+        :type page_num: int
+        :param page_size: How large the page should be.
+        :type page_size: int
+        :return: The page, alongside its group number/title, the page total and the roster version it was read at.
+        :rtype: dict
+
+        :raises NotFoundError: If that User does not exist.
+        """
+        with self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(uid)
+            db_groups = tx.get_group_sizes(db_user["tid"])
+            ungrouped_size = tx.count_characters(db_user["tid"], None)
+
+            sizes = [_["size"] for _ in db_groups] + [ungrouped_size]
+            location = locate_page(sizes, page_num, page_size)
+            result = {
+                "group_num": location["group_num"],
+                "group_title": None,
+                "page_total": location["page_total"],
+                "page": [],
+                "version": db_user["version"]
+            }
+            if location["group_num"] == 0 or page_num < 1:
+                result["group_num"] = 0
+                return result
+
+            # the last group is always Uncategorized
+            if location["group_num"] > len(db_groups):
+                result["group_title"] = "Uncategorized"
+                db_characters = tx.get_character_rows(db_user["tid"], None, page_size, location["offset"])
+                group_name = None
+            else:
+                db_group = db_groups[location["group_num"]-1]
+                result["group_title"] = db_group["title"]
+                db_characters = tx.get_character_rows(
+                    db_user["tid"], db_group["tid"], page_size, location["offset"]
                 )
-            except sqlite3.IntegrityError as e:
-                raise DuplicateError(f"User of UUID '{uid}' already exists in database!") from e
+                group_name = db_group["title"]
 
-            return User(uid, user_tid, [])
+            result["page"] = [
+                Character(_["name"], _["prefix"], group_name, _["avatar"], _["proxy_count"]) for _ in db_characters
+            ]
+            return result
+
+    @enforce_annotations
+    def get_proxygroup_page(self, uid: str, page_num: int, page_size: int) -> dict:
+        """
+        Fetch a single page of a User's ProxyGroup summaries, without reconstructing their entire profile.
+
+        Each entry only contains the ProxyGroup's title and how many Characters it holds.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :param page_num: What page to fetch.
+        :type page_num: int
+        :param page_size: How large the page should be.
+        :type page_size: int
+        :return: The page, alongside the page total and the roster version it was read at.
+        :rtype: dict
+
+        :raises NotFoundError: If that User does not exist.
+        """
+        with self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(uid)
+
+            group_count = tx.count_groups(db_user["tid"])
+            # the Uncategorized pseudo-group is always listed last
+            location = locate_page([group_count + 1], page_num, page_size)
+            result = {
+                "group_num": location["group_num"],
+                "page_total": location["page_total"],
+                "page": [],
+                "version": db_user["version"]
+            }
+            if location["group_num"] == 0 or page_num < 1:
+                result["group_num"] = 0
+                return result
+
+            db_groups = tx.get_group_sizes(db_user["tid"], page_size, location["offset"])
+            result["page"] = [{"title": _["title"], "character_count": _["size"]} for _ in db_groups]
+
+            if location["offset"] + page_size > group_count:
+                result["page"].append({
+                    "title": "Uncategorized",
+                    "character_count": tx.count_characters(db_user["tid"], None)
+                })
+
+            return result
 
     @enforce_annotations
     def get_proxygroup(self, user: User, title: str) -> ProxyGroup:
@@ -442,30 +1108,18 @@ class Data:
 
         :raises NotFoundError: If either that User does not exist or no such ProxyGroup could be found.
         """
-
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            db_user = db_get_user_row(cursor, user.uid)
-            db_group = db_get_group_row(cursor, db_user["tid"], title)
-
-            db_characters = cursor.execute(
-                "SELECT * FROM characters WHERE proxygroup_tid=?",
-                (db_group["tid"],)
-            ).fetchall()
+        with self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            db_group = tx.get_group_row(db_user["tid"], title)
 
             return ProxyGroup(
                 title,
                 db_group["tid"],
                 [Character(
                     _["name"], _["prefix"], db_group["title"], _["avatar"], _["proxy_count"]
-                ) for _ in db_characters]
+                ) for _ in tx.get_character_rows(db_user["tid"], db_group["tid"])]
             )
 
-            # print(user)
-            # print(group)
-            # print(characters)
-
     @enforce_annotations
     def retitle_proxygroup(self, user: User, proxy_group: ProxyGroup, new_title: str) -> ProxyGroup:
         """
@@ -483,22 +1137,19 @@ class Data:
         :raises NotFoundError: If either that User does not exist or no such ProxyGroup could be found.
         :raises DuplicateError: If that User already has a ProxyGroup with that name.
         """
-
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            db_user = db_get_user_row(cursor, user.uid)
-            db_group = db_get_group_row(cursor, db_user["tid"], proxy_group.title)
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            db_group = tx.get_group_row(db_user["tid"], proxy_group.title)
 
             try:
-                cursor.execute(
-                    "UPDATE proxy_groups SET title=? WHERE tid=?",
-                    (new_title,db_group["tid"])
-                )
-            except sqlite3.IntegrityError as e:
+                tx.update_group_title(db_group["tid"], new_title)
+            except DuplicateError as e:
                 raise DuplicateError(f"Duplicate entry '{new_title}' for UUID: '{user.uid}'!") from e
+            tx.bump_user_version(db_user["tid"])
 
-        return ProxyGroup(new_title, db_group["tid"], proxy_group.characters)
+            group_tid = db_group["tid"]
+
+        return ProxyGroup(new_title, group_tid, proxy_group.characters)
 
     @enforce_annotations
     def create_proxygroup(self, user: User, title: str) -> ProxyGroup:
@@ -514,20 +1165,18 @@ class Data:
         :return: The created ProxyGroup (read-only).
         :rtype: ProxyGroup
 
+        :raises NotFoundError: If that User does not exist.
         :raises DuplicateError: If a ProxyGroup under that title already exists for that User.
         """
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
 
             proxygroup_tid = str(uuid.uuid4())  # Generate a UUID for the proxy group
             try:
-                cursor.execute(
-                    "INSERT INTO proxy_groups (tid, user_tid, title) VALUES (?, ?, ?)",
-                    (proxygroup_tid, user.tid, title)
-                )
-            except sqlite3.IntegrityError as e:
+                tx.insert_group(proxygroup_tid, db_user["tid"], title)
+            except DuplicateError as e:
                 raise DuplicateError(f"Duplicate entry ('{title}') for user of UUID '{user.uid}'") from e
+            tx.bump_user_version(db_user["tid"])
 
         return ProxyGroup(title, proxygroup_tid, [])
 
@@ -546,18 +1195,12 @@ class Data:
 
         :raises NotFoundError: If either that User does not exist or no such ProxyGroup could be found.
         """
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            db_group = tx.get_group_row(db_user["tid"], proxy_group.title)
 
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            conn.execute("PRAGMA foreign_keys = ON") # disabled by default, so re-enable it for auto nullification
-            db_user = db_get_user_row(cursor, user.uid)
-            db_group = db_get_group_row(cursor, db_user["tid"], proxy_group.title)
-
-            cursor.execute(
-                "DELETE FROM proxy_groups WHERE tid=?",
-                (db_group["tid"],)
-            )
+            tx.delete_group(db_group["tid"])
+            tx.bump_user_version(db_user["tid"])
 
     @enforce_annotations
     def get_uncategorized(self, user: User) -> ProxyGroup:
@@ -573,21 +1216,14 @@ class Data:
 
         :raises NotFoundError: If that User does not exist.
         """
-
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            db_user = db_get_user_row(cursor, user.uid)
-
-            db_characters = cursor.execute(
-                "SELECT * FROM characters WHERE user_tid=? AND proxygroup_tid IS NULL",
-                (db_user["tid"],)
-            ).fetchall()
+        with self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
 
             return ProxyGroup(
                 "Uncategorized",
                 None,
-                [Character(_["name"], _["prefix"], None, _["avatar"], _["proxy_count"]) for _ in db_characters]
+                [Character(_["name"], _["prefix"], None, _["avatar"], _["proxy_count"])
+                 for _ in tx.get_character_rows(db_user["tid"], None)]
             )
 
     @enforce_annotations
@@ -602,25 +1238,15 @@ class Data:
 
         :raises NotFoundError: If either that User does not exist or no such Character could be found.
         """
-
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            db_user = db_get_user_row(cursor, user.uid)
-
-            try:
-                db_character = db_get_character(cursor, db_user["tid"], name)
-                character_group = cursor.execute(
-                    "SELECT title FROM proxy_groups WHERE tid=?",
-                    (db_character["proxygroup_tid"],)
-                ).fetchone()[0]
-            except TypeError: # fetchone returns None instead of a single item list if it can't find something.
-                character_group = None
+        with self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            db_character = tx.get_character_row(db_user["tid"], name)
+            db_group = tx.get_group_row_by_tid(db_character["proxygroup_tid"])
 
             return Character(
                 db_character["name"],
                 db_character["prefix"],
-                character_group,
+                None if db_group is None else db_group["title"],
                 db_character["avatar"],
                 db_character["proxy_count"]
             )
@@ -646,22 +1272,13 @@ class Data:
         :raises NotFoundError: If that User does not exist.
         :raises DuplicateError: If one or more UNIQUE values are already present (failed integrity checks).
         """
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            db_user = db_get_user_row(cursor, user.uid)
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
             # note: characters are uncategorized by default
-            try:
-                character_tid = str(uuid.uuid4())
-                cursor.execute(
-                    "INSERT INTO characters (tid, proxygroup_tid, user_tid, name, prefix, avatar) VALUES "
-                    "(?, ?, ?, ?, ?, ?)",
-                    (character_tid, None, db_user["tid"], name, prefix, avatar)
-                )
-            except sqlite3.IntegrityError as e:
-                raise DuplicateError(f"One or more values failed database integrity checks!") from e
+            tx.insert_character(str(uuid.uuid4()), db_user["tid"], None, name, prefix, avatar)
+            tx.bump_user_version(db_user["tid"])
 
+        self.__bracket_filters.pop(user.uid, None)
         return Character(name, prefix, None, avatar)
 
     @enforce_annotations
@@ -677,16 +1294,13 @@ class Data:
 
         :raises NotFoundError: If either that User does not exist or no such Character could be found.
         """
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            db_character = tx.get_character_row(db_user["tid"], character.name)
+            tx.delete_character(db_character["tid"])
+            tx.bump_user_version(db_user["tid"])
 
-            db_user = db_get_user_row(cursor, user.uid)
-            db_character = db_get_character(cursor, db_user["tid"], character.name)
-            cursor.execute(
-                "DELETE FROM characters WHERE tid=?",
-                (db_character["tid"],)
-            )
+        self.__bracket_filters.pop(user.uid, None)
 
     @enforce_annotations
     def group_character(self, user: User, character: Character, proxy_group: ProxyGroup) -> Character:
@@ -704,21 +1318,16 @@ class Data:
 
         :raises NotFoundError: If the User, ProxyGroup, or Character could not be found in the Database.
         """
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            db_user = db_get_user_row(cursor, user.uid)
-            db_group = db_get_group_row(cursor, db_user["tid"], proxy_group.title)
-            db_character = db_get_character(cursor, db_user["tid"], character.name)
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            db_group = tx.get_group_row(db_user["tid"], proxy_group.title)
+            db_character = tx.get_character_row(db_user["tid"], character.name)
 
             if db_character["proxygroup_tid"] == db_group["tid"]:
                 raise ValueError(f"Character '{character.name}' is already present in ProxyGroup '{proxy_group.title}'")
 
-            cursor.execute(
-                "UPDATE characters SET proxygroup_tid=? WHERE tid=?",
-                (db_group["tid"], db_character["tid"])
-            )
+            tx.set_character_group(db_character["tid"], db_group["tid"])
+            tx.bump_user_version(db_user["tid"])
 
             return Character(
                 character.name,
@@ -741,20 +1350,15 @@ class Data:
         :raises NotFoundError: If either that User does not exist or no such Character could be found.
         :raises ValueError: If that Character was already not in a group.
         """
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            db_user = db_get_user_row(cursor, user.uid)
-            db_character = db_get_character(cursor, db_user["tid"], character.name)
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            db_character = tx.get_character_row(db_user["tid"], character.name)
 
             if db_character["proxygroup_tid"] is None:
                 raise ValueError(f"Character '{character.name}' does not belong to a ProxyGroup!")
 
-            cursor.execute(
-                "UPDATE characters SET proxygroup_tid=NULL WHERE tid=?",
-                (db_character["tid"],)
-            )
+            tx.set_character_group(db_character["tid"], None)
+            tx.bump_user_version(db_user["tid"])
 
             return Character(
                 character.name,
@@ -795,29 +1399,16 @@ class Data:
         if key in banned:
             raise ValueError(f"Unable to update Character '{character.name}' with banned key '{key}'.")
 
-        with sqlite3.connect(self.__data_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            db_user = db_get_user_row(cursor, user.uid)
-            db_character = db_get_character(cursor, db_user["tid"], character.name)
-            try:
-                cursor.execute(
-                    f"UPDATE characters SET {key}=? WHERE tid=?",
-                    (value, db_character["tid"])
-                )
-            except sqlite3.IntegrityError as e:
-                raise DuplicateError("The requested key failed integrity checks!") from e
-            except sqlite3.OperationalError:
-                raise ValueError("Invalid key name.")
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            db_character = tx.get_character_row(db_user["tid"], character.name)
+            tx.update_character_column(db_character["tid"], key, value)
+            tx.bump_user_version(db_user["tid"])
 
             # we shouldn't trust the supplied objects over the DB, so fetch again.
             # must be done by TID, since there's a chance the name changed.
-            db_character = cursor.execute(
-                "SELECT * FROM characters WHERE tid=?",
-                (db_character["tid"],)
-            ).fetchall()[0]
-            return Character(
+            db_character = tx.get_character_row_by_tid(db_character["tid"])
+            updated = Character(
                 db_character["name"],
                 db_character["prefix"],
                 character.proxygroup_name, # except for the name, since that can't be changed here
@@ -825,12 +1416,435 @@ class Data:
                 db_character["proxy_count"]
             )
 
+        # only drop the filter once the change is committed, so it can't be rebuilt from the old brackets.
+        if key == "prefix":
+            self.__bracket_filters.pop(user.uid, None)
+
+        return updated
+
+    @staticmethod
+    def __get_character_rows(tx, user_tid: str, names: list[str]) -> list:
+        """
+        Resolve several of a User's Characters at once, failing if any of them are missing.
+
+        :raises NotFoundError: If one or more Characters could not be found, naming all of them.
+        """
+        rows = []
+        missing = []
+        for name in names:
+            try:
+                rows.append(tx.get_character_row(user_tid, name))
+            except NotFoundError:
+                missing.append(name)
+
+        if missing:
+            raise NotFoundError(f"No such character(s): {", ".join(f"'{_}'" for _ in missing)}.")
+        return rows
+
+    @enforce_annotations
+    def group_characters(self, user: User, names: list[str], proxy_group: ProxyGroup | None) -> list[Character]:
+        """
+        Move several of a User's Characters into a ProxyGroup (or out of one) at once, then return them.
+
+        All or nothing: if any Character is missing, none of them are moved. Characters already in the ProxyGroup
+        are left as they are.
+
+        :param user: The User to search for.
+        :type user: User
+        :param names: The names of every Character to move.
+        :type names: list[str]
+        :param proxy_group: The ProxyGroup to move them into, or None to make them Uncategorized.
+        :type proxy_group: ProxyGroup | None
+        :return: The updated Characters, in the order their names were given.
+        :rtype: list[Character]
+
+        :raises NotFoundError: If the User, ProxyGroup, or any of the Characters could not be found.
+        """
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            db_group = None if proxy_group is None else tx.get_group_row(db_user["tid"], proxy_group.title)
+            group_tid = None if db_group is None else db_group["tid"]
+            db_characters = self.__get_character_rows(tx, db_user["tid"], names)
+
+            changed = False
+            for db_character in db_characters:
+                if db_character["proxygroup_tid"] != group_tid:
+                    tx.set_character_group(db_character["tid"], group_tid)
+                    changed = True
+            if changed:
+                tx.bump_user_version(db_user["tid"])
+
+            return [
+                Character(
+                    _["name"], _["prefix"], None if db_group is None else db_group["title"], _["avatar"], _["proxy_count"]
+                ) for _ in db_characters
+            ]
+
+    @enforce_annotations
+    def delete_characters(self, user: User, names: list[str]) -> None:
+        """
+        Delete several of a User's Characters at once.
+
+        All or nothing: if any Character is missing, none of them are deleted.
+
+        :param user: The User to search for.
+        :type user: User
+        :param names: The names of every Character to delete.
+        :type names: list[str]
+
+        :raises NotFoundError: If either that User or any of the Characters could not be found.
+        """
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            for db_character in self.__get_character_rows(tx, db_user["tid"], names):
+                tx.delete_character(db_character["tid"])
+            tx.bump_user_version(db_user["tid"])
+
+        self.__bracket_filters.pop(user.uid, None)
+
+    @enforce_annotations
+    def update_characters(self, user: User, names: list[str], key: str, value) -> list[Character]:
+        """
+        Set the same attribute on several of a User's Characters at once, then return them.
+
+        All or nothing: if any Character is missing or the update fails for one of them, none are updated. The same
+        keys `update_character` rejects are rejected here, and since names and prefixes are unique, setting either
+        on more than one Character will always fail.
+
+        :param user: The User to search.
+        :type user: User
+        :param names: The names of every Character to update.
+        :type names: list[str]
+        :param key: The key to update.
+        :type key: str
+        :param value: The value to update it with.
+        :return: The updated Characters, in the order their names were given.
+        :rtype: list[Character]
+
+        :raises NotFoundError: If either that User or any of the Characters could not be found.
+        :raises ValueError: The key supplied could not be updated.
+        :raises DuplicateError: The new value failed integrity checks.
+        """
+        if key in ["tid", "proxygroup_tid", "user_tid"]:
+            raise ValueError(f"Unable to update Characters with banned key '{key}'.")
+
+        with self.__changing(user.uid), self.__backend.transaction() as tx:
+            db_user = tx.get_user_row(user.uid)
+            db_characters = self.__get_character_rows(tx, db_user["tid"], names)
+            for db_character in db_characters:
+                tx.update_character_column(db_character["tid"], key, value)
+            tx.bump_user_version(db_user["tid"])
+
+            updated = []
+            for db_character in db_characters:
+                db_character = tx.get_character_row_by_tid(db_character["tid"])
+                db_group = tx.get_group_row_by_tid(db_character["proxygroup_tid"])
+                updated.append(Character(
+                    db_character["name"],
+                    db_character["prefix"],
+                    None if db_group is None else db_group["title"],
+                    db_character["avatar"],
+                    db_character["proxy_count"]
+                ))
+
+        if key == "prefix":
+            self.__bracket_filters.pop(user.uid, None)
+
+        return updated
+
+    def import_roster(self, uid: str, records: Iterable[dict], batch_size: int = 500) -> dict:
+        """
+        Import a stream of ProxyGroups and Characters into a User's roster, registering them if needed.
+
+        Records are applied in batches of `batch_size`, each within a single transaction. Rather than aborting on the
+        first problem, duplicates and invalid records are skipped and reported back once everything was read.
+
+        Each record is a dict with a "kind" of either:
+         - "group": {"title"}. Groups that already exist are reused.
+         - "character": {"name", "prefix", "avatar", "group", "proxy_count"}. Unknown groups are created.
+         - "membership": {"name", "group"}, moving an (already imported) Character into a group.
+
+        :param uid: The user's Discord UUID.
+        :type uid: str
+        :param records: The records to import, which may be lazily produced (see `porting.read_roster`).
+        :type records: Iterable[dict]
+        :param batch_size: How many records to apply per transaction.
+        :type batch_size: int
+        :return: How many groups/characters were created and characters grouped, alongside every skipped record.
+        :rtype: dict
+
+        :raises ImportAbortedError: If reading `records` raised a ValueError, once every record before it was imported.
+        """
+        result = {"groups": 0, "characters": 0, "grouped": 0, "duplicates": [], "invalid": []}
+        records = iter(records)
+        group_tids = None
+        exhausted = False
+        failure = None
+
+        while not exhausted:
+            changed = False
+            with self.__changing(uid), self.__backend.transaction() as tx:
+                try:
+                    db_user = tx.get_user_row(uid)
+                except NotFoundError:
+                    tx.insert_user(str(uuid.uuid4()), uid)
+                    db_user = tx.get_user_row(uid)
+                if group_tids is None:
+                    group_tids = {_["title"]: _["tid"] for _ in tx.get_group_rows(db_user["tid"])}
+
+                def group_tid(title: str) -> str:
+                    nonlocal changed
+                    if title not in group_tids:
+                        group_tids[title] = str(uuid.uuid4())
+                        tx.insert_group(group_tids[title], db_user["tid"], title)
+                        result["groups"] += 1
+                        changed = True
+                    return group_tids[title]
+
+                for _ in range(batch_size):
+                    try:
+                        record = next(records, None)
+                    except ValueError as e: # such as a json.JSONDecodeError, partway through the file
+                        failure = e
+                        record = None
+                    if record is None:
+                        exhausted = True
+                        break
+
+                    name = record.get("name")
+                    match record.get("kind"):
+                        case "group" if record.get("title"):
+                            group_tid(record["title"])
+                        case "character" if not name:
+                            result["invalid"].append({"name": None, "reason": "missing a name"})
+                        case "character" if not isinstance(record.get("prefix"), str) or "text" not in record["prefix"]:
+                            result["invalid"].append({"name": name, "reason": "missing brackets"})
+                        case "character":
+                            try:
+                                tx.insert_character(
+                                    str(uuid.uuid4()),
+                                    db_user["tid"],
+                                    group_tid(record["group"]) if record.get("group") else None,
+                                    name,
+                                    record["prefix"],
+                                    record.get("avatar"),
+                                    record.get("proxy_count") or 0
+                                )
+                            except DuplicateError:
+                                result["duplicates"].append({"name": name, "prefix": record["prefix"]})
+                                continue
+                            result["characters"] += 1
+                            changed = True
+                        case "membership" if name and record.get("group"):
+                            try:
+                                db_character = tx.get_character_row(db_user["tid"], name)
+                            except NotFoundError: # most likely skipped as a duplicate or invalid
+                                continue
+                            tx.set_character_group(db_character["tid"], group_tid(record["group"]))
+                            result["grouped"] += 1
+                            changed = True
+                        case _:
+                            result["invalid"].append({"name": name, "reason": "unrecognized record"})
+
+                if changed:
+                    tx.bump_user_version(db_user["tid"])
+
+            self.__registered.add(uid)
+            self.__bracket_filters.pop(uid, None)
+
+        if failure is not None:
+            raise ImportAbortedError(str(failure), result) from failure
+        return result
+
+
+class Session:
+    """
+    A unit of work on a single User's roster, opened via `Data.session`.
+
+    The User is resolved once, and everything done through the Session shares one connection and transaction,
+    which is committed when the Session closes (or rolled back, if it closes with an exception).
+
+    Since the transaction stays open for as long as the Session does, never await anything while inside one.
+    """
+    def __init__(self, tx, db_user):
+        self.__tx = tx
+        self.__db_user = db_user
+        self.changed = False
+        self.brackets_changed = False
+
+    @property
+    def uid(self) -> str:
+        return self.__db_user["did"]
+
+    @property
+    def tid(self) -> str:
+        return self.__db_user["tid"]
+
+    def __changed(self, brackets: bool = False):
+        self.changed = True
+        self.brackets_changed = self.brackets_changed or brackets
+
+    def __character(self, db_character, group_title: str | None = None) -> Character:
+        if group_title is None and db_character["proxygroup_tid"] is not None:
+            group_title = self.__tx.get_group_row_by_tid(db_character["proxygroup_tid"])["title"]
+        return Character(
+            db_character["name"], db_character["prefix"], group_title, db_character["avatar"], db_character["proxy_count"]
+        )
+
+    def __get_character_rows(self, names: list[str]) -> list:
+        db_characters = []
+        missing = []
+        for name in names:
+            try:
+                db_characters.append(self.__tx.get_character_row(self.tid, name))
+            except NotFoundError:
+                missing.append(name)
+        if missing:
+            raise NotFoundError(f"No such character(s): {", ".join(f"'{_}'" for _ in missing)}.")
+        return db_characters
+
+    def get_user(self) -> User:
+        """
+        Reconstruct the User's entire profile.
+
+        :return: The fully reconstructed User class.
+        :rtype: User
+        """
+        final = []
+        for group in self.__tx.get_group_rows(self.tid):
+            final.append(ProxyGroup(group["title"], group["tid"], [
+                self.__character(_, group["title"]) for _ in self.__tx.get_character_rows(self.tid, group["tid"])
+            ]))
+        final.append(ProxyGroup("Uncategorized", None, [
+            self.__character(_) for _ in self.__tx.get_character_rows(self.tid, None)
+        ]))
+        return User(self.uid, self.tid, final)
+
+    @enforce_annotations
+    def get_character(self, name: str) -> Character:
+        """
+        :raises NotFoundError: If no such Character could be found.
+        """
+        return self.__character(self.__tx.get_character_row(self.tid, name))
+
+    @enforce_annotations
+    def get_proxygroup(self, title: str) -> ProxyGroup:
+        """
+        :raises NotFoundError: If no such ProxyGroup could be found.
+        """
+        db_group = self.__tx.get_group_row(self.tid, title)
+        return ProxyGroup(db_group["title"], db_group["tid"], [
+            self.__character(_, db_group["title"]) for _ in self.__tx.get_character_rows(self.tid, db_group["tid"])
+        ])
+
+    @enforce_annotations
+    def create_character(self, name: str, prefix: str, avatar: str | None) -> Character:
+        """
+        Create a new (Uncategorized) Character.
+
+        :raises DuplicateError: If one or more UNIQUE values are already present (failed integrity checks).
+        """
+        self.__tx.insert_character(str(uuid.uuid4()), self.tid, None, name, prefix, avatar)
+        self.__changed(brackets=True)
+        return Character(name, prefix, None, avatar)
+
+    @enforce_annotations
+    def delete_character(self, name: str) -> None:
+        """
+        :raises NotFoundError: If no such Character could be found.
+        """
+        self.__tx.delete_character(self.__tx.get_character_row(self.tid, name)["tid"])
+        self.__changed(brackets=True)
+
+    @enforce_annotations
+    def delete_characters(self, names: list[str]) -> None:
+        """
+        Delete several Characters. If any of them are missing, none are deleted.
+
+        :raises NotFoundError: If one or more Characters could not be found, naming all of them.
+        """
+        for db_character in self.__get_character_rows(names):
+            self.__tx.delete_character(db_character["tid"])
+            self.__changed(brackets=True)
+
+    @enforce_annotations
+    def update_character(self, name: str, key: str, value) -> Character:
+        """
+        Update an attribute of a Character, then return it. Rejects the same keys `Data.update_character` does.
+
+        :raises NotFoundError: If no such Character could be found.
+        :raises ValueError: The key supplied could not be updated.
+        :raises DuplicateError: The new value failed integrity checks.
+        """
+        if key in ["tid", "proxygroup_tid", "user_tid"]:
+            raise ValueError(f"Unable to update Character '{name}' with banned key '{key}'.")
+
+        db_character = self.__tx.get_character_row(self.tid, name)
+        self.__tx.update_character_column(db_character["tid"], key, value)
+        self.__changed(brackets=key == "prefix")
+        return self.__character(self.__tx.get_character_row_by_tid(db_character["tid"]))
+
+    @enforce_annotations
+    def group_characters(self, names: list[str], title: str | None) -> list[Character]:
+        """
+        Move one or more Characters into a ProxyGroup, or out of one if `title` is None.
+
+        Characters already there are left as they are.
+
+        :raises NotFoundError: If the ProxyGroup or any of the Characters could not be found.
+        """
+        group_tid = None if title is None else self.__tx.get_group_row(self.tid, title)["tid"]
+
+        db_characters = self.__get_character_rows(names)
+        for db_character in db_characters:
+            if db_character["proxygroup_tid"] != group_tid:
+                self.__tx.set_character_group(db_character["tid"], group_tid)
+                self.__changed()
+        return [self.__character(_, title) for _ in db_characters]
+
+    @enforce_annotations
+    def create_proxygroup(self, title: str) -> ProxyGroup:
+        """
+        :raises DuplicateError: If a ProxyGroup under that title already exists.
+        """
+        proxygroup_tid = str(uuid.uuid4())
+        try:
+            self.__tx.insert_group(proxygroup_tid, self.tid, title)
+        except DuplicateError as e:
+            raise DuplicateError(f"Duplicate entry ('{title}') for user of UUID '{self.uid}'") from e
+        self.__changed()
+        return ProxyGroup(title, proxygroup_tid, [])
+
+    @enforce_annotations
+    def retitle_proxygroup(self, title: str, new_title: str) -> None:
+        """
+        :raises NotFoundError: If no such ProxyGroup could be found.
+        :raises DuplicateError: If a ProxyGroup under the new title already exists.
+        """
+        db_group = self.__tx.get_group_row(self.tid, title)
+        try:
+            self.__tx.update_group_title(db_group["tid"], new_title)
+        except DuplicateError as e:
+            raise DuplicateError(f"Duplicate entry '{new_title}' for UUID: '{self.uid}'!") from e
+        self.__changed()
+
+    @enforce_annotations
+    def delete_proxygroup(self, title: str) -> None:
+        """
+        Delete a ProxyGroup, making all of its Characters Uncategorized.
+
+        :raises NotFoundError: If no such ProxyGroup could be found.
+        """
+        self.__tx.delete_group(self.__tx.get_group_row(self.tid, title)["tid"])
+        self.__changed()
+
+
 class WebhookCache:
     def __init__(self):
         pass
 
     @enforce_annotations
-    def __init__(self, data_path: str):
+    def __init__(self, data_path: str, tracer: QueryTracer | None = None):
         """
         Initializes the Webhook Cache.
 
@@ -838,13 +1852,27 @@ class WebhookCache:
         automatically being created.
         :param data_path: The location of the cache.
         :type data_path: str
+        :param tracer: If supplied, every statement ran will be traced by it.
+        :type tracer: QueryTracer | None
         """
         self.__data_path = data_path
+        self.__tracer = tracer
         self._prep()
 
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a new connection to the cache, traced if a tracer was supplied.
+
+        :return: The opened connection.
+        :rtype: sqlite3.Connection
+        """
+        if self.__tracer is None:
+            return sqlite3.connect(self.__data_path)
+        return self.__tracer.connect(self.__data_path, f"WebhookCache.{sys._getframe(1).f_code.co_name}")
+
     def _prep(self):
         if not os.path.exists(self.__data_path):
-            with sqlite3.connect(self.__data_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                 CREATE TABLE messages (
@@ -856,8 +1884,11 @@ class WebhookCache:
                 )
                 """)
 
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+
     def get_user_webhooks(self, user: User):
-        with sqlite3.connect(self.__data_path) as conn:
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
@@ -879,7 +1910,7 @@ class WebhookCache:
 
     @enforce_annotations
     def add_user_webhook(self, user: User, message_id: str, webhook_url: str):
-        with sqlite3.connect(self.__data_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
 
             message_tid = str(uuid.uuid4())
@@ -891,7 +1922,7 @@ class WebhookCache:
 
     @enforce_annotations
     def purge_old_records(self, user: User, limit: int):
-        with sqlite3.connect(self.__data_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
 
             cursor.execute(
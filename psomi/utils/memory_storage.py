@@ -0,0 +1,632 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+from psomi.errors import NotFoundError, DuplicateError
+from psomi.utils.storage import StorageBackend, StorageTransaction
+
+# columns that `update_character_column` is allowed to touch, mirroring the SQLite schema.
+CHARACTER_COLUMNS = ("tid", "proxygroup_tid", "user_tid", "name", "prefix", "avatar", "proxy_count")
+
+
+def _coerce(key: str, value):
+    """
+    Convert a value the same way SQLite's column affinity would, so both backends hand back the same types.
+    """
+    if value is None:
+        return None
+    if key == "proxy_count":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return value
+    if isinstance(value, (int, float)):
+        return str(value)
+    return value
+
+
+class Roster:
+    """
+    Everything stored on a single User, alongside the indexes needed to answer lookups with a dict access.
+
+    Groups and Characters are kept in creation order, just like SQLite's rowid.
+    """
+    __slots__ = (
+        "user", "groups", "characters", "group_titles", "character_names", "character_prefixes", "fronts", "stats"
+    )
+
+    def __init__(self, user: dict):
+        self.user = user
+        self.groups: dict[str, dict] = {} # tid -> row
+        self.characters: dict[str, dict] = {} # tid -> row
+        self.group_titles: dict[str, str] = {} # title -> tid
+        self.character_names: dict[str, str] = {} # name -> tid
+        self.character_prefixes: dict[str, str] = {} # prefix -> tid
+        self.fronts: dict[str, dict] = {} # scope id -> row
+        self.stats: dict[tuple[str, str, str, str], int] = {} # (character tid, guild id, granularity, bucket) -> count
+
+    def copy(self) -> "Roster":
+        roster = Roster(dict(self.user))
+        roster.groups = {tid: dict(row) for tid, row in self.groups.items()}
+        roster.characters = {tid: dict(row) for tid, row in self.characters.items()}
+        roster.group_titles = dict(self.group_titles)
+        roster.character_names = dict(self.character_names)
+        roster.character_prefixes = dict(self.character_prefixes)
+        roster.fronts = {scope_id: dict(row) for scope_id, row in self.fronts.items()}
+        roster.stats = dict(self.stats)
+        return roster
+
+
+class MemoryTransaction(StorageTransaction):
+    """
+    Transaction against a MemoryBackend.
+
+    Changes are applied straight away (so that later reads within the transaction see them) while the backend's
+    lock is held, with every Roster they touch being copied beforehand so that they can be rolled back.
+    """
+    def __init__(self, backend: "MemoryBackend"):
+        self.backend = backend
+        self.ops: list[list] = []
+        self.originals: dict[str, Roster | None] = {} # user tid -> Roster before this transaction
+
+    def __enter__(self):
+        self.backend.lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.backend.commit(self.ops)
+            else:
+                self.backend.rollback(self.originals)
+        finally:
+            self.backend.lock.release()
+        return False
+
+    def __apply(self, op: str, *args):
+        self.ops.append([op, *args])
+        self.backend.apply(op, *args)
+
+    def __touch(self, user_tid: str):
+        # remember what the Roster looked like before we first changed it.
+        if user_tid not in self.originals:
+            roster = self.backend.rosters_by_tid.get(user_tid)
+            self.originals[user_tid] = roster.copy() if roster is not None else None
+
+    def __roster(self, user_tid: str) -> Roster:
+        return self.backend.rosters_by_tid[user_tid]
+
+    # ---- Users ----
+
+    def get_all_user_ids(self) -> list[str]:
+        return list(self.backend.rosters)
+
+    def get_random_user_ids(self, limit: int) -> list[str]:
+        user_ids = list(self.backend.rosters)
+        return random.sample(user_ids, min(limit, len(user_ids)))
+
+    def get_user_row(self, did: str) -> dict:
+        try:
+            return self.backend.rosters[did].user
+        except KeyError as e:
+            raise NotFoundError(f"No such user of UUID '{did}'.") from e
+
+    def insert_user(self, tid: str, did: str) -> None:
+        if did in self.backend.rosters:
+            raise DuplicateError(f"User of UUID '{did}' already exists in database!")
+        self.__touch(tid)
+        self.__apply("insert_user", tid, did)
+
+    def bump_user_version(self, user_tid: str) -> None:
+        self.__touch(user_tid)
+        self.__apply("bump_user_version", user_tid)
+
+    # only a single process may use a MemoryBackend, so there are never any other processes' changes to record.
+
+    def get_change_seq(self) -> int:
+        return 0
+
+    def get_user_changes(self, after: int) -> tuple[int, list[str]]:
+        return after, []
+
+    def prune_user_changes(self, before: float) -> int:
+        return 0
+
+    # ---- ProxyGroups ----
+
+    def get_group_rows(self, user_tid: str) -> list:
+        return list(self.__roster(user_tid).groups.values())
+
+    def get_group_row(self, user_tid: str, title: str) -> dict:
+        roster = self.__roster(user_tid)
+        try:
+            return roster.groups[roster.group_titles[title]]
+        except KeyError as e:
+            raise NotFoundError(f"No such ProxyGroup of name '{title}'.") from e
+
+    def get_group_row_by_tid(self, tid: str | None) -> dict | None:
+        owner = self.backend.group_owners.get(tid)
+        return None if owner is None else self.__roster(owner).groups[tid]
+
+    def count_groups(self, user_tid: str) -> int:
+        return len(self.__roster(user_tid).groups)
+
+    def get_group_sizes(self, user_tid: str, limit: int = -1, offset: int = 0) -> list:
+        roster = self.__roster(user_tid)
+        sizes = dict.fromkeys(roster.groups, 0)
+        for character in roster.characters.values():
+            if character["proxygroup_tid"] is not None:
+                sizes[character["proxygroup_tid"]] += 1
+
+        groups = list(roster.groups.values()) # already in creation order, same as get_group_rows
+        groups = groups[offset:] if limit < 0 else groups[offset:offset+limit]
+        return [{"tid": _["tid"], "title": _["title"], "size": sizes[_["tid"]]} for _ in groups]
+
+    def insert_group(self, tid: str, user_tid: str, title: str) -> None:
+        if title in self.__roster(user_tid).group_titles:
+            raise DuplicateError(f"Duplicate ProxyGroup entry ('{title}')!")
+        self.__touch(user_tid)
+        self.__apply("insert_group", tid, user_tid, title)
+
+    def update_group_title(self, tid: str, title: str) -> None:
+        owner = self.backend.group_owners[tid]
+        existing = self.__roster(owner).group_titles.get(title)
+        if existing is not None and existing != tid:
+            raise DuplicateError(f"Duplicate ProxyGroup entry ('{title}')!")
+        self.__touch(owner)
+        self.__apply("update_group_title", tid, title)
+
+    def delete_group(self, tid: str) -> None:
+        self.__touch(self.backend.group_owners[tid])
+        self.__apply("delete_group", tid)
+
+    # ---- Characters ----
+
+    def get_character_rows(self, user_tid: str, group_tid: str | None, limit: int = -1, offset: int = 0) -> list:
+        rows = [_ for _ in self.__roster(user_tid).characters.values() if _["proxygroup_tid"] == group_tid]
+        return rows[offset:] if limit < 0 else rows[offset:offset+limit]
+
+    def count_characters(self, user_tid: str, group_tid: str | None) -> int:
+        return sum(1 for _ in self.__roster(user_tid).characters.values() if _["proxygroup_tid"] == group_tid)
+
+    def get_character_row(self, user_tid: str, name: str) -> dict:
+        roster = self.__roster(user_tid)
+        try:
+            return roster.characters[roster.character_names[name]]
+        except KeyError as e:
+            raise NotFoundError(f"No such character with name '{name}'.") from e
+
+    def get_character_row_by_tid(self, tid: str) -> dict | None:
+        owner = self.backend.character_owners.get(tid)
+        return None if owner is None else self.__roster(owner).characters[tid]
+
+    def get_brackets(self, did: str) -> list[str]:
+        roster = self.backend.rosters.get(did)
+        return [] if roster is None else list(roster.character_prefixes)
+
+    def insert_character(
+            self,
+            tid: str,
+            user_tid: str,
+            group_tid: str | None,
+            name: str,
+            prefix: str,
+            avatar: str | None,
+            proxy_count: int = 0
+    ) -> None:
+        roster = self.__roster(user_tid)
+        if name in roster.character_names or prefix in roster.character_prefixes:
+            raise DuplicateError(f"One or more values failed database integrity checks!")
+        self.__touch(user_tid)
+        self.__apply("insert_character", tid, user_tid, group_tid, name, prefix, avatar, proxy_count)
+
+    def update_character_column(self, tid: str, key: str, value) -> None:
+        if key not in CHARACTER_COLUMNS:
+            raise ValueError("Invalid key name.")
+
+        value = _coerce(key, value)
+        owner = self.backend.character_owners[tid]
+        roster = self.__roster(owner)
+        index = {"name": roster.character_names, "prefix": roster.character_prefixes}.get(key)
+        if index is not None and index.get(value, tid) != tid:
+            raise DuplicateError("The requested key failed integrity checks!")
+        self.__touch(owner)
+        self.__apply("update_character_column", tid, key, value)
+
+    def set_character_group(self, tid: str, group_tid: str | None) -> None:
+        self.__touch(self.backend.character_owners[tid])
+        self.__apply("set_character_group", tid, group_tid)
+
+    def delete_character(self, tid: str) -> None:
+        self.__touch(self.backend.character_owners[tid])
+        self.__apply("delete_character", tid)
+
+    # ---- Fronts ----
+
+    def get_front_rows(self, user_tid: str | None = None) -> list:
+        rosters = self.backend.rosters.values() if user_tid is None else [self.__roster(user_tid)]
+        rows = []
+        for roster in rosters:
+            for front in roster.fronts.values():
+                character = roster.characters.get(front["character_tid"])
+                if character is not None:
+                    rows.append({
+                        "did": roster.user["did"], "scope": front["scope"], "scope_id": front["scope_id"],
+                        "name": character["name"]
+                    })
+        return rows
+
+    def upsert_front(self, user_tid: str, scope_id: str, scope: str, character_tid: str) -> None:
+        self.__touch(user_tid)
+        self.__apply("upsert_front", user_tid, scope_id, scope, character_tid)
+
+    def delete_front(self, user_tid: str, scope_id: str) -> None:
+        if scope_id not in self.__roster(user_tid).fronts:
+            return
+        self.__touch(user_tid)
+        self.__apply("delete_front", user_tid, scope_id)
+
+    # ---- Proxy stats ----
+
+    def add_proxy_count(
+            self, user_tid: str, character_tid: str, guild_id: str, granularity: str, bucket: str, count: int
+    ) -> None:
+        self.__touch(user_tid)
+        self.__apply("add_proxy_count", user_tid, character_tid, guild_id, granularity, bucket, count)
+
+    def get_proxy_stat_rows(self, user_tid: str, since_day: str, since_month: str) -> list:
+        roster = self.__roster(user_tid)
+        rows = []
+        for (character_tid, guild_id, granularity, bucket), count in roster.stats.items():
+            if bucket < (since_day if granularity == "day" else since_month):
+                continue
+            character = roster.characters.get(character_tid)
+            if character is not None:
+                rows.append({
+                    "name": character["name"], "guild_id": guild_id, "granularity": granularity, "bucket": bucket,
+                    "count": count
+                })
+        return rows
+
+    def compact_proxy_stats(self, before_day: str) -> int:
+        folded = 0
+        # journaled per User, so that only those with something to fold have to be copied (in case of a rollback).
+        for roster in self.backend.rosters.values():
+            days = sum(1 for _ in roster.stats if _[2] == "day" and _[3] < before_day)
+            if days:
+                self.__touch(roster.user["tid"])
+                self.__apply("compact_proxy_stats", roster.user["tid"], before_day)
+                folded += days
+        return folded
+
+
+class MemoryBackend(StorageBackend):
+    """
+    Keeps every roster in RAM, turning reads into dict lookups.
+
+    Changes are persisted through an append-only journal (one JSON line per committed operation), which is folded
+    into a snapshot every `snapshot_interval` operations. On startup, the snapshot is loaded and the journal replayed
+    on top of it. Only a single process may use a MemoryBackend's files at a time.
+    """
+    def __init__(self, data_path: str, snapshot_interval: int = 10_000, fsync: bool = False):
+        """
+        Initializes the backend, loading any existing snapshot and journal.
+
+        If neither exist but `data_path` is an SQLite database, it is imported (and snapshotted) first.
+
+        :param data_path: The location of the data. The journal and snapshot are kept next to it, as
+            `<data_path>.journal` and `<data_path>.snapshot`.
+        :type data_path: str
+        :param snapshot_interval: How many journal entries to write before taking a new snapshot.
+        :type snapshot_interval: int
+        :param fsync: Whether to fsync the journal on every commit, trading write latency for surviving power loss.
+        :type fsync: bool
+        """
+        self.data_path = data_path
+        self.journal_path = f"{data_path}.journal"
+        self.snapshot_path = f"{data_path}.snapshot"
+        self.snapshot_interval = snapshot_interval
+        self.fsync = fsync
+
+        self.lock = threading.RLock()
+        self.rosters: dict[str, Roster] = {} # did -> Roster
+        self.rosters_by_tid: dict[str, Roster] = {} # user tid -> Roster
+        self.group_owners: dict[str, str] = {} # group tid -> user tid
+        self.character_owners: dict[str, str] = {} # character tid -> user tid
+
+        self.__seq = 0 # sequence number of the last committed operation
+        self.__journaled = 0 # operations written since the last snapshot
+        self.__journal = None
+
+        if not os.path.exists(self.snapshot_path) and not os.path.exists(self.journal_path) \
+                and _is_sqlite(self.data_path):
+            self.import_sqlite(self.data_path)
+        else:
+            self.__load()
+        if self.__journal is None:
+            self.__journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def data_version(self) -> int:
+        return 0 # nothing else can change it
+
+    def transaction(self) -> MemoryTransaction:
+        return MemoryTransaction(self)
+
+    # ---- Applying operations ----
+
+    def apply(self, op: str, *args):
+        """
+        Apply a single operation to the in-memory state, without any validation.
+
+        Used both by transactions (which validate beforehand) and when replaying the journal.
+        """
+        getattr(self, f"_apply_{op}")(*args)
+
+    def _apply_insert_user(self, tid: str, did: str):
+        roster = Roster({"tid": tid, "did": did, "version": 0})
+        self.rosters[did] = roster
+        self.rosters_by_tid[tid] = roster
+
+    def _apply_bump_user_version(self, user_tid: str):
+        self.rosters_by_tid[user_tid].user["version"] += 1
+
+    def _apply_insert_group(self, tid: str, user_tid: str, title: str):
+        roster = self.rosters_by_tid[user_tid]
+        roster.groups[tid] = {"tid": tid, "user_tid": user_tid, "title": title}
+        roster.group_titles[title] = tid
+        self.group_owners[tid] = user_tid
+
+    def _apply_update_group_title(self, tid: str, title: str):
+        roster = self.rosters_by_tid[self.group_owners[tid]]
+        group = roster.groups[tid]
+        del roster.group_titles[group["title"]]
+        group["title"] = title
+        roster.group_titles[title] = tid
+
+    def _apply_delete_group(self, tid: str):
+        roster = self.rosters_by_tid[self.group_owners.pop(tid)]
+        group = roster.groups.pop(tid)
+        del roster.group_titles[group["title"]]
+        for character in roster.characters.values():
+            if character["proxygroup_tid"] == tid:
+                character["proxygroup_tid"] = None
+
+    def _apply_insert_character(self, tid, user_tid, group_tid, name, prefix, avatar, proxy_count):
+        roster = self.rosters_by_tid[user_tid]
+        roster.characters[tid] = {
+            "tid": tid,
+            "proxygroup_tid": group_tid,
+            "user_tid": user_tid,
+            "name": name,
+            "prefix": prefix,
+            "avatar": avatar,
+            "proxy_count": proxy_count
+        }
+        roster.character_names[name] = tid
+        roster.character_prefixes[prefix] = tid
+        self.character_owners[tid] = user_tid
+
+    def _apply_update_character_column(self, tid: str, key: str, value):
+        roster = self.rosters_by_tid[self.character_owners[tid]]
+        character = roster.characters[tid]
+        index = {"name": roster.character_names, "prefix": roster.character_prefixes}.get(key)
+        if index is not None:
+            del index[character[key]]
+            index[value] = tid
+        character[key] = value
+
+    def _apply_set_character_group(self, tid: str, group_tid: str | None):
+        self.rosters_by_tid[self.character_owners[tid]].characters[tid]["proxygroup_tid"] = group_tid
+
+    def _apply_delete_character(self, tid: str):
+        roster = self.rosters_by_tid[self.character_owners.pop(tid)]
+        character = roster.characters.pop(tid)
+        del roster.character_names[character["name"]]
+        del roster.character_prefixes[character["prefix"]]
+        for scope_id in [_ for _, front in roster.fronts.items() if front["character_tid"] == tid]:
+            del roster.fronts[scope_id]
+        for key in [_ for _ in roster.stats if _[0] == tid]:
+            del roster.stats[key]
+
+    def _apply_upsert_front(self, user_tid: str, scope_id: str, scope: str, character_tid: str):
+        self.rosters_by_tid[user_tid].fronts[scope_id] = {
+            "user_tid": user_tid, "scope_id": scope_id, "scope": scope, "character_tid": character_tid
+        }
+
+    def _apply_delete_front(self, user_tid: str, scope_id: str):
+        self.rosters_by_tid[user_tid].fronts.pop(scope_id, None)
+
+    def _apply_add_proxy_count(self, user_tid, character_tid, guild_id, granularity, bucket, count):
+        stats = self.rosters_by_tid[user_tid].stats
+        key = (character_tid, guild_id, granularity, bucket)
+        stats[key] = stats.get(key, 0) + count
+
+    def _apply_compact_proxy_stats(self, user_tid: str, before_day: str):
+        stats = self.rosters_by_tid[user_tid].stats
+        for key in [_ for _ in stats if _[2] == "day" and _[3] < before_day]:
+            month = (key[0], key[1], "month", key[3][:7])
+            stats[month] = stats.get(month, 0) + stats.pop(key)
+
+    # ---- Committing ----
+
+    def commit(self, ops: list[list]):
+        if not ops:
+            return
+
+        lines = []
+        for op in ops:
+            self.__seq += 1
+            lines.append(json.dumps([self.__seq, *op]))
+        self.__journal.write("\n".join(lines) + "\n")
+        self.__journal.flush()
+        if self.fsync:
+            os.fsync(self.__journal.fileno())
+
+        self.__journaled += len(ops)
+        if self.__journaled >= self.snapshot_interval:
+            self.snapshot()
+
+    def rollback(self, originals: dict[str, Roster | None]):
+        for user_tid, original in originals.items():
+            current = self.rosters_by_tid.pop(user_tid, None)
+            if current is not None:
+                del self.rosters[current.user["did"]]
+                for tid in current.groups:
+                    self.group_owners.pop(tid, None)
+                for tid in current.characters:
+                    self.character_owners.pop(tid, None)
+
+            if original is not None:
+                self.__index(original)
+
+    def __index(self, roster: Roster):
+        self.rosters[roster.user["did"]] = roster
+        self.rosters_by_tid[roster.user["tid"]] = roster
+        for tid in roster.groups:
+            self.group_owners[tid] = roster.user["tid"]
+        for tid in roster.characters:
+            self.character_owners[tid] = roster.user["tid"]
+
+    # ---- Persistence ----
+
+    def snapshot(self):
+        """
+        Write every roster to a new snapshot, then start a fresh journal.
+        """
+        with self.lock:
+            state = {
+                "seq": self.__seq,
+                "users": [_.user for _ in self.rosters.values()],
+                "groups": [group for _ in self.rosters.values() for group in _.groups.values()],
+                "characters": [character for _ in self.rosters.values() for character in _.characters.values()],
+                "fronts": [front for _ in self.rosters.values() for front in _.fronts.values()],
+                "proxy_stats": [
+                    [_.user["tid"], *key, count] for _ in self.rosters.values() for key, count in _.stats.items()
+                ]
+            }
+            _write_atomic(self.snapshot_path, json.dumps(state))
+
+            # anything already in the snapshot would be skipped on replay anyway, so a crash here is harmless.
+            if self.__journal is not None:
+                self.__journal.close()
+            self.__journal = open(self.journal_path, "w", encoding="utf-8")
+            self.__journaled = 0
+
+    def __load(self):
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.__seq = state["seq"]
+            for user in state["users"]:
+                roster = Roster(user)
+                self.rosters[user["did"]] = roster
+                self.rosters_by_tid[user["tid"]] = roster
+            for group in state["groups"]:
+                roster = self.rosters_by_tid[group["user_tid"]]
+                roster.groups[group["tid"]] = group
+                roster.group_titles[group["title"]] = group["tid"]
+                self.group_owners[group["tid"]] = group["user_tid"]
+            for character in state["characters"]:
+                roster = self.rosters_by_tid[character["user_tid"]]
+                roster.characters[character["tid"]] = character
+                roster.character_names[character["name"]] = character["tid"]
+                roster.character_prefixes[character["prefix"]] = character["tid"]
+                self.character_owners[character["tid"]] = character["user_tid"]
+            # snapshots taken before fronts existed don't have any.
+            for front in state.get("fronts", []):
+                self.rosters_by_tid[front["user_tid"]].fronts[front["scope_id"]] = front
+            for user_tid, character_tid, guild_id, granularity, bucket, count in state.get("proxy_stats", []):
+                self.rosters_by_tid[user_tid].stats[(character_tid, guild_id, granularity, bucket)] = count
+
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    seq, op, *args = json.loads(line)
+                except ValueError:
+                    # the last line may have been cut short by a crash, and was never committed.
+                    print(f"Ignoring a truncated journal entry in '{self.journal_path}'.")
+                    break
+                if seq <= self.__seq:
+                    continue
+                self.apply(op, *args)
+                self.__seq = seq
+                self.__journaled += 1
+
+    def import_sqlite(self, sqlite_path: str):
+        """
+        Replace every roster with the contents of an SQLite database, then snapshot them.
+
+        :param sqlite_path: The SQLite database to import.
+        :type sqlite_path: str
+        """
+        with self.lock:
+            self.rosters.clear()
+            self.rosters_by_tid.clear()
+            self.group_owners.clear()
+            self.character_owners.clear()
+
+            conn = sqlite3.connect(sqlite_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                user_columns = [_[1] for _ in conn.execute("PRAGMA table_info(users)").fetchall()]
+                # created before roster versions existed, which start at 0 just like SQLiteBackend's migration.
+                version = "version" if "version" in user_columns else "0 AS version"
+                for user in conn.execute(f"SELECT tid, did, {version} FROM users ORDER BY rowid"):
+                    self._apply_insert_user(user["tid"], user["did"])
+                    self.rosters_by_tid[user["tid"]].user["version"] = user["version"]
+                for group in conn.execute("SELECT tid, user_tid, title FROM proxy_groups ORDER BY rowid"):
+                    self._apply_insert_group(group["tid"], group["user_tid"], group["title"])
+                for character in conn.execute("SELECT * FROM characters ORDER BY rowid"):
+                    self._apply_insert_character(
+                        character["tid"], character["user_tid"], character["proxygroup_tid"], character["name"],
+                        character["prefix"], character["avatar"], character["proxy_count"]
+                    )
+                try:
+                    fronts = conn.execute("SELECT user_tid, scope_id, scope, character_tid FROM fronts").fetchall()
+                except sqlite3.OperationalError: # created before fronts existed
+                    fronts = []
+                for front in fronts:
+                    if front["user_tid"] in self.rosters_by_tid:
+                        self._apply_upsert_front(
+                            front["user_tid"], front["scope_id"], front["scope"], front["character_tid"]
+                        )
+                try:
+                    stats = conn.execute("SELECT * FROM proxy_stats").fetchall()
+                except sqlite3.OperationalError: # created before proxy stats existed
+                    stats = []
+                for stat in stats:
+                    if stat["user_tid"] in self.rosters_by_tid:
+                        self._apply_add_proxy_count(
+                            stat["user_tid"], stat["character_tid"], stat["guild_id"], stat["granularity"],
+                            stat["bucket"], stat["count"]
+                        )
+            finally:
+                conn.close()
+
+            self.snapshot()
+
+    def close(self):
+        with self.lock:
+            if self.__journaled:
+                self.snapshot()
+            self.__journal.close()
+
+
+def _is_sqlite(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(16) == b"SQLite format 3\x00"
+    except OSError:
+        return False
+
+
+def _write_atomic(path: str, content: str):
+    # write to a temporary file first, so that a crash never leaves a half-written snapshot behind.
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{path}.tmp", path)
@@ -0,0 +1,293 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable
+
+# upper bounds (in nanoseconds) of every histogram bucket, growing by a factor of ~1.41 from 1us to ~95s.
+DEFAULT_BOUNDS = tuple(round(1000 * 2 ** (_ / 2)) for _ in range(54))
+
+
+class Histogram:
+    """
+    A latency histogram with fixed, logarithmic buckets.
+
+    Keeps both cumulative counts (for exporting) and a rolling window made out of time slices (for percentiles),
+    with observing only costing a bisect and a few integer operations.
+    """
+    __slots__ = ("bounds", "counts", "total", "sum_ns", "__slices", "__slice_ns", "__epoch")
+
+    def __init__(self, bounds: tuple[int, ...] = DEFAULT_BOUNDS, window_slices: int = 6, slice_seconds: int = 10):
+        """
+        Initializes the Histogram.
+
+        :param bounds: The (sorted) upper bound of every bucket, in nanoseconds. Anything larger lands in +Inf.
+        :type bounds: tuple[int, ...]
+        :param window_slices: How many slices the rolling window is made out of.
+        :type window_slices: int
+        :param slice_seconds: How long each slice lasts, in seconds.
+        :type slice_seconds: int
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum_ns = 0
+        self.__slices = [[0] * (len(bounds) + 1) for _ in range(window_slices)]
+        self.__slice_ns = slice_seconds * 1_000_000_000
+        self.__epoch = time.perf_counter_ns() // self.__slice_ns
+
+    def observe(self, value_ns: int, now_ns: int) -> None:
+        """
+        Record a single observation.
+
+        :param value_ns: The observed latency, in nanoseconds.
+        :type value_ns: int
+        :param now_ns: The current `time.perf_counter_ns()`, used to pick the rolling window slice.
+        :type now_ns: int
+        """
+        i = bisect_left(self.bounds, value_ns)
+        self.counts[i] += 1
+        self.total += 1
+        self.sum_ns += value_ns
+
+        epoch = now_ns // self.__slice_ns
+        if epoch != self.__epoch:
+            self.__rotate(epoch)
+        self.__slices[epoch % len(self.__slices)][i] += 1
+
+    def __rotate(self, epoch: int):
+        # clear every slice that has fallen out of the window since the last observation.
+        for stale in range(max(self.__epoch + 1, epoch - len(self.__slices) + 1), epoch + 1):
+            self.__slices[stale % len(self.__slices)] = [0] * (len(self.bounds) + 1)
+        self.__epoch = epoch
+
+    def window(self) -> list[int]:
+        """
+        :return: The bucket counts within the rolling window.
+        :rtype: list[int]
+        """
+        epoch = time.perf_counter_ns() // self.__slice_ns
+        if epoch != self.__epoch:
+            self.__rotate(epoch)
+        return [sum(_) for _ in zip(*self.__slices)]
+
+    def percentile(self, percent: float, counts: list[int] | None = None) -> float:
+        """
+        Estimate a percentile (using the upper bound of the bucket it falls in).
+
+        :param percent: Which percentile to get (0-100).
+        :type percent: float
+        :param counts: The bucket counts to use. Defaults to the rolling window.
+        :type counts: list[int] | None
+        :return: The estimated percentile, in seconds.
+        :rtype: float
+        """
+        counts = self.window() if counts is None else counts
+        total = sum(counts)
+        if not total:
+            return 0.0
+
+        rank = percent / 100 * total
+        seen = 0
+        for i, count in enumerate(counts):
+            seen += count
+            if seen >= rank and count:
+                return (self.bounds[i] if i < len(self.bounds) else self.bounds[-1]) / 1e9
+        return self.bounds[-1] / 1e9
+
+
+class Metrics:
+    """
+    Registry of every Histogram and counter an instance keeps.
+
+    Histograms are grouped into families (such as proxy pipeline stages), each holding one Histogram per label.
+    """
+    def __init__(self):
+        self.histograms: dict[str, dict[str, Histogram]] = {}
+        self.counters: dict[str, int] = {}
+        # read whenever rendered, for values that are better looked up than tracked (such as queue depths).
+        self.gauges: dict[str, Callable[[], float]] = {}
+
+    def observe(self, family: str, label: str, start_ns: int) -> int:
+        """
+        Record the time passed since `start_ns`.
+
+        Returns the current time, so that consecutive stages can be chained without calling the clock twice:
+
+            now = metrics.observe("proxy_stage", "parse", now)
+
+        :param family: The Histogram family.
+        :type family: str
+        :param label: The label (such as the stage) within that family.
+        :type label: str
+        :param start_ns: When the timed section started, as returned by `time.perf_counter_ns()`.
+        :type start_ns: int
+        :return: The current `time.perf_counter_ns()`.
+        :rtype: int
+        """
+        now = time.perf_counter_ns()
+        try:
+            histogram = self.histograms[family][label]
+        except KeyError:
+            histogram = self.histograms.setdefault(family, {}).setdefault(label, Histogram())
+        histogram.observe(now - start_ns, now)
+        return now
+
+    @contextmanager
+    def time(self, family: str, label: str):
+        """
+        Time the wrapped block of code.
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.observe(family, label, start)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """
+        Increment a counter.
+
+        :param name: The counter's name.
+        :type name: str
+        :param amount: How much to increment it by.
+        :type amount: int
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        """
+        Register a gauge, whose value is read every time metrics are rendered.
+
+        :param name: The gauge's name.
+        :type name: str
+        :param read: Returns the gauge's current value.
+        :type read: Callable[[], float]
+        """
+        self.gauges[name] = read
+
+    def summary(self, family: str) -> dict[str, dict[str, float | int]]:
+        """
+        Summarize a Histogram family over its rolling window.
+
+        :param family: The Histogram family to summarize.
+        :type family: str
+        :return: Each label's observation count and p50/p95/p99 (in seconds) within the window.
+        :rtype: dict[str, dict[str, float | int]]
+        """
+        summary = {}
+        for label, histogram in self.histograms.get(family, {}).items():
+            counts = histogram.window()
+            summary[label] = {
+                "count": sum(counts),
+                "p50": histogram.percentile(50, counts),
+                "p95": histogram.percentile(95, counts),
+                "p99": histogram.percentile(99, counts),
+            }
+        return summary
+
+    def render_prometheus(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        :return: The rendered metrics.
+        :rtype: str
+        """
+        lines = []
+        for family, histograms in self.histograms.items():
+            name = f"psomi_{family}_seconds"
+            label_name = family.rsplit("_", 1)[-1]
+            lines.append(f"# TYPE {name} histogram")
+            for label, histogram in histograms.items():
+                label = label.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound / 1e9:.9g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label_name}="{label}",le="+Inf"}} {histogram.total}')
+                lines.append(f'{name}_sum{{{label_name}="{label}"}} {histogram.sum_ns / 1e9:.9g}')
+                lines.append(f'{name}_count{{{label_name}="{label}"}} {histogram.total}')
+
+        for counter, value in self.counters.items():
+            lines.append(f"# TYPE psomi_{counter}_total counter")
+            lines.append(f"psomi_{counter}_total {value}")
+
+        for gauge, read in self.gauges.items():
+            lines.append(f"# TYPE psomi_{gauge} gauge")
+            lines.append(f"psomi_{gauge} {read()}")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    Optionally exports Metrics, either by periodically writing them to a Prometheus text file, by serving them over
+    a local HTTP endpoint, or both.
+    """
+    def __init__(
+            self,
+            metrics: Metrics,
+            file_path: str | None = None,
+            interval: float = 15.0,
+            http_host: str = "127.0.0.1",
+            http_port: int | None = None
+    ):
+        """
+        Initializes the exporter. Nothing is exported until `start` is called.
+
+        :param metrics: The Metrics to export.
+        :param file_path: Where to write the text file, if at all.
+        :param interval: How often (in seconds) to rewrite the text file.
+        :param http_host: The host the HTTP endpoint binds to.
+        :param http_port: The port the HTTP endpoint binds to, if at all.
+        """
+        self.metrics = metrics
+        self.file_path = file_path
+        self.interval = interval
+        self.http_host = http_host
+        self.http_port = http_port
+
+        self.__file_task: asyncio.Task | None = None
+        self.__runner = None # web.AppRunner, only once serving over HTTP
+
+    async def start(self):
+        if self.file_path and self.__file_task is None:
+            self.__file_task = asyncio.create_task(self.__write_loop())
+        if self.http_port is not None and self.__runner is None:
+            # aiohttp's server side takes a while to import, and most setups never serve metrics over HTTP.
+            from aiohttp import web
+
+            app = web.Application()
+            app.add_routes([web.get("/metrics", self.__serve)])
+            self.__runner = web.AppRunner(app)
+            await self.__runner.setup()
+            await web.TCPSite(self.__runner, self.http_host, self.http_port).start()
+
+    async def stop(self):
+        if self.__file_task:
+            self.__file_task.cancel()
+            self.__file_task = None
+        if self.__runner:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+    def write_file(self):
+        # write to a temporary file first, so that scrapers never read a half-written one.
+        temp_path = f"{self.file_path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.metrics.render_prometheus())
+        os.replace(temp_path, self.file_path)
+
+    async def __write_loop(self):
+        while True:
+            try:
+                self.write_file()
+            except OSError as e:
+                print(f"Failed to write metrics to '{self.file_path}'! ({e!r})")
+            await asyncio.sleep(self.interval)
+
+    async def __serve(self, request):
+        from aiohttp import web
+
+        return web.Response(text=self.metrics.render_prometheus(), content_type="text/plain")
@@ -5,22 +5,13 @@ def parse_message(user: User, message: str) -> list[dict[str, str | Character]]:
     Processes a message and returns a dictionary with the character info.
     """
 
-    brackets = []
+    # split once per (cached) User, rather than once per message.
+    brackets = [
+        {"character": character, "prefix": prefix, "suffix": suffix}
+        for character, prefix, suffix in user.brackets
+    ]
     final = []
 
-    for character in [i for si in user.proxy_groups for i in si]: # flatten all characters into one list
-        prefix, suffix = character.prefix.split("text")
-
-        prefix = None if prefix == "" else prefix
-        suffix = None if suffix == "" else suffix
-
-        brackets.append({
-            "character": character,
-            "prefix": prefix,
-            "suffix": suffix
-        })
-
-
     lines = message.split('\n')
     for i, line in enumerate(lines):
         if not line:
@@ -60,4 +51,16 @@ def parse_message(user: User, message: str) -> list[dict[str, str | Character]]:
                 if parse:
                     final.append({"message": lines[start:start+end+1], "character": character["character"]})
 
-    return final
\ No newline at end of file
+    return final
+
+
+def parse_name_list(value: str) -> list[str]:
+    """
+    Split a comma separated list of names (such as "Alice, Bob,Carol"), dropping blanks and repeats.
+
+    :param value: The list to split.
+    :type value: str
+    :return: Every name, in the order they were first given.
+    :rtype: list[str]
+    """
+    return list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
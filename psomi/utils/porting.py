@@ -0,0 +1,209 @@
+import codecs
+import datetime
+import json
+import re
+from typing import IO, Iterator
+from psomi.utils.data import User
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+
+# bump whenever the export format changes in a way older versions can't import.
+EXPORT_VERSION = 1
+
+
+class JSONStream:
+    """
+    Incrementally reads a JSON document of the shape `{"key": value, "key": [item, item, ...]}`.
+
+    Only one top-level value (or array item) is ever decoded and held in memory at a time, so arbitrarily large
+    exports can be read with a small, fixed buffer.
+    """
+    def __init__(self, fp: IO[bytes], chunk_size: int = 64 * 1024):
+        """
+        :param fp: The (binary) file to read from.
+        :param chunk_size: How much to read at a time, in bytes.
+        """
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.__decoder = codecs.getincrementaldecoder("utf-8-sig")()
+
+    def __fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        self.eof = not chunk
+        # drop whatever was already consumed, so the buffer doesn't grow with the file.
+        self.buffer = self.buffer[self.pos:] + self.__decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    def __peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.__fill():
+                raise ValueError("Unexpected end of file.")
+
+    def __expect(self, char: str):
+        if self.__peek() != char:
+            raise ValueError(f"Expected '{char}' at character {self.pos}, found '{self.buffer[self.pos]}'.")
+        self.pos += 1
+
+    def __decode(self):
+        self.__peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.__fill():
+                    raise
+                continue
+            # a number right at the end of the buffer may have been cut in half.
+            if end == len(self.buffer) and self.__fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self) -> Iterator[tuple[str, object]]:
+        """
+        Walk the document's top-level object.
+
+        :return: A (key, value) pair for every top-level scalar or object, and a (key, item) pair for every item of
+            a top-level array.
+        :raises ValueError: If the document is malformed.
+        """
+        self.__expect("{")
+        if self.__peek() == "}":
+            return
+
+        while True:
+            key = self.__decode()
+            if not isinstance(key, str):
+                raise ValueError("Expected an object key.")
+            self.__expect(":")
+
+            if self.__peek() == "[":
+                self.pos += 1
+                if self.__peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield key, self.__decode()
+                        if self.__peek() == "]":
+                            self.pos += 1
+                            break
+                        self.__expect(",")
+            else:
+                yield key, self.__decode()
+
+            if self.__peek() == "}":
+                return
+            self.__expect(",")
+
+
+def _text(value) -> str | None:
+    return value.strip() if isinstance(value, str) and value.strip() else None
+
+
+def read_roster(fp: IO[bytes]) -> Iterator[dict]:
+    """
+    Stream-parse a roster export, turning it into records `Data.import_roster` understands.
+
+    Besides PSOMI's own exports, PluralKit (`members`) and Tupperbox (`tuppers`) exports are understood too.
+
+    :param fp: The (binary) export to read.
+    :return: A "group", "character" or "membership" record for everything found.
+    :raises ValueError: If the export is malformed.
+    """
+    member_names: dict[str, str] = {} # PluralKit member ID -> name
+    group_titles: dict[str, str] = {} # Tupperbox group ID -> title
+    pending: dict[str, list[str]] = {} # Tupperbox group ID -> names of tuppers waiting for it
+
+    for key, item in JSONStream(fp).items():
+        if not isinstance(item, dict):
+            continue
+
+        match key:
+            case "characters": # PSOMI
+                yield {
+                    "kind": "character",
+                    "name": _text(item.get("name")),
+                    "prefix": item.get("brackets"),
+                    "avatar": _text(item.get("avatar")),
+                    "group": _text(item.get("group")),
+                    "proxy_count": item.get("proxy_count", 0) if isinstance(item.get("proxy_count"), int) else 0
+                }
+            case "members": # PluralKit
+                tags = next((_ for _ in item.get("proxy_tags") or [] if _.get("prefix") or _.get("suffix")), None)
+                name = _text(item.get("name"))
+                if item.get("id") and name:
+                    member_names[item["id"]] = name
+                yield {
+                    "kind": "character",
+                    "name": name,
+                    "prefix": f"{tags.get("prefix") or ""}text{tags.get("suffix") or ""}" if tags else None,
+                    "avatar": _text(item.get("avatar_url")),
+                    "group": None,
+                    "proxy_count": 0
+                }
+            case "tuppers": # Tupperbox
+                brackets = item.get("brackets") or []
+                name = _text(item.get("name"))
+                group_id = str(item["group_id"]) if item.get("group_id") is not None else None
+                yield {
+                    "kind": "character",
+                    "name": name,
+                    "prefix": f"{brackets[0]}text{brackets[1] if len(brackets) > 1 else ""}" if brackets else None,
+                    "avatar": _text(item.get("avatar_url")),
+                    "group": group_titles.get(group_id),
+                    "proxy_count": item.get("posts", 0) if isinstance(item.get("posts"), int) else 0
+                }
+                if group_id is not None and group_id not in group_titles and name:
+                    pending.setdefault(group_id, []).append(name)
+            case "groups":
+                title = _text(item.get("title")) or _text(item.get("name"))
+                if not title:
+                    continue
+                yield {"kind": "group", "title": title}
+
+                if isinstance(item.get("members"), list): # PluralKit groups list their members
+                    for member_id in item["members"]:
+                        if member_id in member_names:
+                            yield {"kind": "membership", "name": member_names[member_id], "group": title}
+                elif item.get("id") is not None: # Tupperbox tuppers point at their group instead
+                    group_titles[str(item["id"])] = title
+                    for name in pending.pop(str(item["id"]), []):
+                        yield {"kind": "membership", "name": name, "group": title}
+
+
+def write_roster(user: User, fp: IO[str]) -> None:
+    """
+    Write a User's entire roster as a PSOMI export, one Character at a time.
+
+    :param user: The User to export.
+    :type user: User
+    :param fp: The (text) file to write to.
+    """
+    fp.write(f'{{"version": {EXPORT_VERSION}, ')
+    fp.write(f'"exported_at": {json.dumps(datetime.datetime.now(datetime.timezone.utc).isoformat())}, ')
+
+    fp.write('"groups": [')
+    groups = [_ for _ in user.proxy_groups if _.tid is not None]
+    for i, group in enumerate(groups):
+        fp.write(("" if i == 0 else ", ") + json.dumps({"title": group.title}))
+
+    fp.write('], "characters": [')
+    for i, character in enumerate(user.characters_flattened):
+        fp.write(("\n" if i == 0 else ",\n") + json.dumps({
+            "name": character.name,
+            "brackets": character.prefix,
+            "avatar": character.avatar,
+            "group": character.proxygroup_name,
+            "proxy_count": character.proxy_count
+        }))
+    fp.write("\n]}\n")
@@ -0,0 +1,62 @@
+class BracketFilter:
+    """
+    A cheap, conservative check of whether a message could possibly be proxied by one of a User's Characters.
+
+    Only remembers the first character of every prefix and the last character of every suffix-only bracket, so it
+    may let through messages that won't end up being proxied, but never rejects one that would.
+    """
+    __slots__ = ("leading", "trailing")
+
+    def __init__(self, brackets: list[str]):
+        """
+        Initializes the filter.
+
+        :param brackets: Every one of the User's Character brackets, in the `<prefix>text<suffix>` format.
+        :type brackets: list[str]
+        """
+        leading = set()
+        trailing = set()
+        for bracket in brackets:
+            prefix, suffix = bracket.split("text", 1)
+            if prefix:
+                leading.add(prefix[0])
+            elif suffix:
+                # suffix-only brackets can only be told apart by how a line ends.
+                trailing.add(suffix[-1])
+
+        self.leading = frozenset(leading)
+        self.trailing = frozenset(trailing)
+
+    @classmethod
+    def from_sets(cls, leading: str | frozenset, trailing: str | frozenset) -> "BracketFilter":
+        """
+        Rebuild a filter from the characters it remembers, such as after restoring a previously saved one.
+
+        :param leading: The first character of every prefix.
+        :type leading: str | frozenset
+        :param trailing: The last character of every suffix-only bracket.
+        :type trailing: str | frozenset
+        :return: The filter.
+        :rtype: BracketFilter
+        """
+        bracket_filter = cls([])
+        bracket_filter.leading = frozenset(leading)
+        bracket_filter.trailing = frozenset(trailing)
+        return bracket_filter
+
+    def may_match(self, content: str) -> bool:
+        """
+        Check whether any line of a message starts (or ends) like one of the brackets would.
+
+        :param content: The message's content.
+        :type content: str
+        :return: False if the message definitely won't be proxied, True if it might be.
+        :rtype: bool
+        """
+        if not self.leading and not self.trailing:
+            return False
+
+        for line in content.split("\n"):
+            if line and (line[0] in self.leading or line[-1] in self.trailing):
+                return True
+        return False
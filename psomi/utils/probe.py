@@ -0,0 +1,54 @@
+import time
+from psomi.errors import NotFoundError
+from psomi.utils.data import Data
+from psomi.utils.timing import summarize
+
+
+def probe_database(data: Data, sample_size: int = 25, characters_per_user: int = 5) -> dict:
+    """
+    Probe the health of a database by timing reads against a random sample of its Users.
+
+    Blocking, and should therefore be ran off of the event loop. The amount of work done is bounded by
+    `sample_size` and `characters_per_user`, no matter how large the database grows.
+
+    :param data: The Database to probe.
+    :type data: Data
+    :param sample_size: How many Users to sample.
+    :type sample_size: int
+    :param characters_per_user: How many Characters to re-fetch per sampled User.
+    :type characters_per_user: int
+    :return: Latency summaries (in seconds) for `get_user` and `get_character`, alongside what was sampled.
+    :rtype: dict
+    """
+    probe_start = time.perf_counter()
+    user_samples = []
+    character_samples = []
+    character_total = 0
+
+    user_ids = data.get_random_user_ids(sample_size)
+    for user_id in user_ids:
+        start = time.perf_counter()
+        try:
+            user = data.get_user(user_id)
+        except NotFoundError: # removed after being sampled, nothing to time
+            continue
+        user_samples.append(time.perf_counter() - start)
+
+        characters = user.characters_flattened
+        character_total += len(characters)
+        for character in characters[:characters_per_user]:
+            start = time.perf_counter()
+            try:
+                data.get_character(user, character.name) # manually fetch the character again
+            except NotFoundError:
+                continue
+            character_samples.append(time.perf_counter() - start)
+
+    return {
+        "get_user": summarize(user_samples),
+        "get_character": summarize(character_samples),
+        "user_count": len(user_ids),
+        "character_count": character_total,
+        "probe_time": round(time.perf_counter() - probe_start, 5),
+        "last_test": time.time()
+    }
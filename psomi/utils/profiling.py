@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    A low-overhead sampling profiler, producing collapsed ("folded") stacks ready to be turned into flame graphs.
+
+    Runs in its own thread, periodically peeking at the current frame of every targeted thread. The profiled
+    threads are never paused or otherwise interrupted.
+    """
+    def __init__(self, thread_ids: list[int], thread_prefixes: list[str] | None = None, interval: float = 0.005):
+        """
+        Initializes the profiler.
+
+        :param thread_ids: The identifiers of the threads to sample, such as the event loop's.
+        :type thread_ids: list[int]
+        :param thread_prefixes: Also sample any thread whose name starts with one of these (such as executors).
+        :type thread_prefixes: list[str] | None
+        :param interval: How long (in seconds) to wait between samples.
+        :type interval: float
+        """
+        self.thread_ids = thread_ids
+        self.thread_prefixes = tuple(thread_prefixes or [])
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def __targets(self) -> dict[int, str]:
+        targets = {}
+        for thread in threading.enumerate():
+            if thread.ident in self.thread_ids or thread.name.startswith(self.thread_prefixes):
+                targets[thread.ident] = thread.name
+        return targets
+
+    @staticmethod
+    def __collapse(thread_name: str, frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)})")
+            frame = frame.f_back
+        stack.append(thread_name)
+        return ";".join(reversed(stack))
+
+    def run(self, duration: float) -> str:
+        """
+        Sample for a set amount of time. Blocking, so should be ran in its own thread.
+
+        :param duration: How long (in seconds) to sample for.
+        :type duration: float
+        :return: The collapsed stacks, one "<stack> <count>" per line.
+        :rtype: str
+        """
+        deadline = time.perf_counter() + duration
+        targets = self.__targets()
+        last_refresh = time.perf_counter()
+
+        while time.perf_counter() < deadline:
+            # executors start their threads lazily, so look for new ones every now and then.
+            if time.perf_counter() - last_refresh > 1:
+                targets = self.__targets()
+                last_refresh = time.perf_counter()
+
+            frames = sys._current_frames()
+            for ident, name in targets.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[self.__collapse(name, frame)] += 1
+            self.samples += 1
+            del frames
+
+            time.sleep(self.interval)
+
+        return self.render()
+
+    def render(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
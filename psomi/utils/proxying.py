@@ -0,0 +1,218 @@
+import asyncio
+import time
+import aiohttp
+import discord
+
+from psomi.errors import NotFoundError, OverloadedError
+from psomi.utils.admission import Priority
+from psomi.utils.bot import PsomiBot
+from psomi.utils.data import User
+from psomi.utils.parsing import parse_message
+
+
+async def handle_message(bot: PsomiBot, message: discord.Message) -> None:
+    """
+    Proxy a message (if it should be), then process any commands within it.
+
+    :param bot: The PsomiBot instance.
+    :param message: The received message.
+    :return:
+    """
+    # every message (including other bots' and our own webhooks') might be replied to later.
+    bot.references.remember(message)
+
+    if message.author.bot:
+        return
+
+    metrics = bot.metrics
+    start = time.perf_counter_ns()
+    metrics.increment("messages_seen")
+
+    uid = str(message.author.id)
+    # most authors aren't registered, so answer that from memory instead of the database.
+    if not bot.database.is_registered(uid):
+        metrics.increment("unregistered_short_circuit")
+        await bot.process_commands(message)
+        return
+
+    # most messages from registered users are ordinary chat too, which can be rejected before any more work.
+    may_match = bot.database.get_bracket_filter(uid).may_match(message.content)
+    # unless they're fronting, which (like the filter) only takes a dict lookup.
+    front = _get_front(bot, message, uid)
+    if not may_match and front is None:
+        metrics.increment("prefilter_short_circuit")
+        await bot.process_commands(message)
+        return
+
+    # anything that might be proxied waits its turn behind the rest of its channel, so that proxied messages can't
+    # overtake each other (other channels are proxied alongside it all the same).
+    try:
+        await bot.proxy_workers.run(
+            message.channel.id, lambda: _admit_proxy(bot, message, start, may_match, front)
+        )
+    except asyncio.QueueFull:
+        # the channel is far enough behind as is, so leave this one be rather than holding up everything after it.
+        metrics.increment("proxy_queue_full")
+    except OverloadedError: # only if proxying was configured to be shed
+        pass
+
+    await bot.process_commands(message)
+
+
+def _get_front(bot: PsomiBot, message: discord.Message, uid: str) -> str | None:
+    # an empty message (such as an attachment on its own) has nothing to autoproxy, and commands or messages
+    # starting with a backslash are left alone on purpose.
+    content = message.content
+    if not content or content.startswith("\\"):
+        return None
+    if isinstance(bot.command_prefix, str) and content.startswith(bot.command_prefix):
+        return None
+    guild_id = str(message.guild.id) if message.guild is not None else None
+    return bot.database.get_front(uid, str(message.channel.id), guild_id)
+
+
+def _autoproxy(bot: PsomiBot, user: User, message: discord.Message, front: str) -> list[dict]:
+    try:
+        character = user.get_character_by_name(front)
+    except ValueError:
+        # renamed (or deleted) since it was set, so find out which it was.
+        bot.database.refresh_fronts(user.uid)
+        front = _get_front(bot, message, user.uid)
+        if front is None:
+            return []
+        try:
+            character = bot.database.get_front_user(user.uid).get_character_by_name(front)
+        except (ValueError, NotFoundError):
+            return []
+    # the whole message, as is (brackets and all).
+    return [{"character": character, "message": message.content.split("\n"), "front": True}]
+
+
+async def _admit_proxy(
+        bot: PsomiBot, message: discord.Message, start: int, may_match: bool, front: str | None
+) -> None:
+    async with bot.admission.admit(Priority.PROXY):
+        await _proxy_message(bot, message, start, may_match, front)
+
+
+async def _proxy_message(
+        bot: PsomiBot, message: discord.Message, start: int, may_match: bool = True, front: str | None = None
+) -> None:
+    metrics = bot.metrics
+    now = time.perf_counter_ns()
+
+    try:
+        # a fronting User's roster is kept in memory, so autoproxying doesn't have to load it for every message.
+        if front is not None:
+            user = bot.database.get_front_user(str(message.author.id))
+        else:
+            user = bot.database.get_user(str(message.author.id))
+    except NotFoundError: # user isn't in the database, we don't need to continue
+        metrics.observe("proxy_stage", "user_lookup", now)
+        return
+    now = metrics.observe("proxy_stage", "user_lookup", now)
+
+    try:
+        psomi_webhook = await bot.channel_webhooks.resolve(bot, message.channel.id)
+    except discord.errors.NotFound:
+        return
+
+    psomi_webhook_id = psomi_webhook.get("id")
+    psomi_webhook_token = psomi_webhook.get("token")
+    psomi_webhook_url = f"https://discord.com/api/webhooks/{psomi_webhook_id}/{psomi_webhook_token}"
+    now = metrics.observe("proxy_stage", "webhook_discovery", now)
+
+    if not psomi_webhook_token:
+        await message.channel.send("Webhook error! Please contact the instance owner!")
+        raise AttributeError(f"Failed to retrieve token for webhook under the name '{bot.webhook_name}!'"
+                             f" Something is wrong!")
+
+    # brackets always win over a front, but don't bother matching them when the filter already ruled them out.
+    parsed_message = parse_message(user, message.content) if may_match else []
+    if not parsed_message and front is not None:
+        parsed_message = _autoproxy(bot, user, message, front)
+        if parsed_message:
+            metrics.increment("autoproxied")
+        now = metrics.observe("proxy_stage", "autoproxy", now)
+    else:
+        now = metrics.observe("proxy_stage", "parse", now)
+
+    # counted in memory, and written to the DB (alongside everything else counted since) every so often.
+    guild_id = str(message.guild.id) if message.guild is not None else None
+    for character in parsed_message:
+        bot.database.record_proxy(user.uid, character["character"].name, guild_id)
+    if parsed_message:
+        now = metrics.observe("proxy_stage", "counter_update", now)
+
+    async with aiohttp.ClientSession() as session:
+        for i, character in enumerate(parsed_message):
+            character_webhook = discord.Webhook.from_url(psomi_webhook_url, session=session)
+            character_content: str = '\n'.join(character["message"])
+            prefix, suffix = character["character"].prefix.split("text")
+            if character.get("front"): # never had any brackets to begin with
+                prefix = suffix = ""
+
+            if prefix:
+                character_content = character_content.removeprefix(prefix)
+            if suffix:
+                character_content = character_content.removesuffix(suffix)
+
+            # construct reference
+            if i == 0 and message.reference:
+                referenced_message = await bot.references.resolve(bot, message.reference, bot.fetch_references)
+                if referenced_message is not None:
+                    referenced_content = referenced_message.content
+                    referenced_content = referenced_content.split("\n")
+
+                    # Get rid of the last reply to make it look cleaner.
+                    for i, _ in enumerate(referenced_content):
+                        if _.startswith("> "):
+                            referenced_content.remove(_)
+
+                    replied_content = " ".join(referenced_content)
+                    replied_content = replied_content.replace(
+                        "\n", " "
+                    )
+                    # print(referenced_message)
+                    channel_id = referenced_message.channel_id
+                    message_id = referenced_message.message_id
+
+                    character_content = (
+                        f"> {replied_content}\n{referenced_message.author_mention} - [Jump](<https://discord.com/channels/@me/{channel_id}/{message_id}>)\n"
+                        + character_content
+                    )
+
+            now = time.perf_counter_ns()
+            send_kwargs = dict(
+                username=character["character"].name,
+                avatar_url=character["character"].avatar if character["character"].avatar else discord.MISSING,
+                wait=True
+            )
+            try:
+                proxied_message = await character_webhook.send(character_content, **send_kwargs)
+            except discord.errors.NotFound:
+                # our webhook was deleted since we learned about it, so find (or create) it again.
+                bot.channel_webhooks.forget(message.channel.id)
+                psomi_webhook = await bot.channel_webhooks.resolve(bot, message.channel.id)
+                psomi_webhook_url = (f"https://discord.com/api/webhooks/{psomi_webhook.get("id")}/"
+                                     f"{psomi_webhook.get("token")}")
+                character_webhook = discord.Webhook.from_url(psomi_webhook_url, session=session)
+                proxied_message = await character_webhook.send(character_content, **send_kwargs)
+            now = metrics.observe("proxy_stage", "webhook_send", now)
+            bot.references.remember(proxied_message)
+
+            bot.webhook_cache.add_user_webhook(user, str(proxied_message.id), character_webhook.url)
+            metrics.observe("proxy_stage", "message_cache", now)
+            # await asyncio.sleep(0.2)
+
+    if parsed_message:
+        bot.startup.mark("first_proxy")
+        bot.channel_webhooks.touch(message.channel.id)
+        now = time.perf_counter_ns()
+        try:
+            await message.delete()
+        except discord.errors.NotFound: # message doesn't exist anymore, no need to do anything
+            pass
+        bot.references.forget(message.id)
+        metrics.observe("proxy_stage", "delete", now)
+        metrics.observe("proxy_stage", "total", start)
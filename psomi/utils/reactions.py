@@ -21,18 +21,10 @@ async def edit_reaction(bot: PsomiBot, payload: RawReactionActionEvent) -> None:
     except (NotFoundError, AttributeError):
         return
     try:
-        channel_webhooks = await bot.http.channel_webhooks(payload.channel_id)
+        psomi_webhook = await bot.channel_webhooks.resolve(bot, payload.channel_id)
     except discord.errors.NotFound:
         return
 
-    psomi_webhook = None
-    for hook in channel_webhooks:
-        if hook.get("name", None) == bot.webhook_name:
-            psomi_webhook = hook
-            break
-    if not psomi_webhook:
-        psomi_webhook = await bot.http.create_webhook(payload.channel_id, name=bot.webhook_name)
-
     psomi_webhook_id = psomi_webhook.get("id")
     psomi_webhook_token = psomi_webhook.get("token")
     psomi_webhook_url = f"https://discord.com/api/webhooks/{psomi_webhook_id}/{psomi_webhook_token}"
@@ -54,16 +46,12 @@ async def edit_reaction(bot: PsomiBot, payload: RawReactionActionEvent) -> None:
 
     original_message = bot.get_channel(payload.channel_id)
     original_message = await original_message.fetch_message(payload.message_id)
-    await payload.member.send("Editing the following message:\n"
-                              f"```{original_message.content}```\n"
-                              "Please respond with the new content:")
+    prompt = await payload.member.send("Editing the following message:\n"
+                                       f"```{original_message.content}```\n"
+                                       "Please respond with the new content:")
 
     try:
-        result: discord.Message = await bot.wait_for(
-            "message",
-            check=lambda x: x.author.id == payload.member.id and isinstance(x.channel, discord.DMChannel),
-            timeout=120.0
-        )
+        result: discord.Message = await bot.conversations.wait(payload.member.id, prompt.channel.id, timeout=120.0)
     except TimeoutError:
         await payload.member.send("Aborting due to lack of accepted response...")
         return
@@ -73,9 +61,11 @@ async def edit_reaction(bot: PsomiBot, payload: RawReactionActionEvent) -> None:
     async with aiohttp.ClientSession() as session:
         proxy_webhook = discord.Webhook.from_url(psomi_webhook_url, session=session)
 
-        await proxy_webhook.edit_message(
+        edited_message = await proxy_webhook.edit_message(
             message_id=proxied_message["message_id"],
             content=result.content
         )
+    # replies to it should quote what it says now.
+    bot.references.edit(edited_message.id, edited_message.content)
 
     await payload.member.send(f"Successfully edited the message!\n\n{original_message.jump_url}")
@@ -0,0 +1,180 @@
+import sys
+from collections import OrderedDict
+import discord
+
+# roughly what a single entry costs besides its content (the object itself, its ids/mention and the LRU's node).
+ENTRY_OVERHEAD = 250
+
+
+class ReferencedMessage:
+    """
+    Just enough of a message to quote it in a reply.
+    """
+    __slots__ = ("message_id", "channel_id", "author_mention", "content")
+
+    def __init__(self, message_id: int, channel_id: int, author_mention: str, content: str):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.author_mention = author_mention
+        self.content = content
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> "ReferencedMessage":
+        return cls(message.id, message.channel.id, sys.intern(message.author.mention), message.content)
+
+    @property
+    def size(self) -> int:
+        """
+        :return: Roughly how many bytes this entry takes up.
+        :rtype: int
+        """
+        return ENTRY_OVERHEAD + len(self.content)
+
+
+class ReferenceStore:
+    """
+    A byte-budgeted LRU of recently seen messages, used to quote whatever a proxied message replies to.
+
+    Entries only keep what the quote needs, so far more messages fit than within py-cord's own message cache.
+    """
+    def __init__(self, max_bytes: int = 4 * 1024 * 1024):
+        """
+        :param max_bytes: Roughly how many bytes the store may take up, before the least recently used are evicted.
+        :type max_bytes: int
+        """
+        self.max_bytes = max_bytes
+        self.__entries: OrderedDict[int, ReferencedMessage] = OrderedDict()
+        self.__bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @property
+    def bytes(self) -> int:
+        """
+        :return: Roughly how many bytes every entry takes up.
+        :rtype: int
+        """
+        return self.__bytes
+
+    def put(self, entry: ReferencedMessage) -> None:
+        old = self.__entries.pop(entry.message_id, None)
+        if old is not None:
+            self.__bytes -= old.size
+
+        self.__entries[entry.message_id] = entry
+        self.__bytes += entry.size
+        while self.__bytes > self.max_bytes and self.__entries:
+            _, evicted = self.__entries.popitem(last=False)
+            self.__bytes -= evicted.size
+
+    def dump(self) -> list[list]:
+        """
+        :return: Every entry (least recently used first), in a JSON serializable form that `load` accepts.
+        :rtype: list[list]
+        """
+        return [
+            [_.message_id, _.channel_id, _.author_mention, _.content] for _ in self.__entries.values()
+        ]
+
+    def load(self, entries: list[list]) -> int:
+        """
+        Restore the entries of a previous `dump`, still within this store's byte budget.
+
+        :param entries: A previous `dump`.
+        :type entries: list[list]
+        :return: How many entries were restored.
+        :rtype: int
+        """
+        restored = 0
+        for message_id, channel_id, author_mention, content in entries:
+            if message_id not in self.__entries:
+                self.put(ReferencedMessage(message_id, channel_id, sys.intern(author_mention), content))
+                restored += 1
+        return restored
+
+    def remember(self, message: discord.Message) -> None:
+        """
+        Store a message, so that replies to it can be quoted later.
+        """
+        self.put(ReferencedMessage.from_message(message))
+
+    def edit(self, message_id: int, content: str) -> bool:
+        """
+        Replace the content of a stored message (such as after it was edited), so that quotes of it stay current.
+
+        :param message_id: The message's ID.
+        :type message_id: int
+        :param content: The message's new content.
+        :type content: str
+        :return: Whether the message was stored at all.
+        :rtype: bool
+        """
+        entry = self.__entries.get(message_id)
+        if entry is None:
+            return False
+        self.__bytes -= entry.size
+        entry.content = content
+        self.__bytes += entry.size
+        # may no longer fit, now.
+        while self.__bytes > self.max_bytes and self.__entries:
+            _, evicted = self.__entries.popitem(last=False)
+            self.__bytes -= evicted.size
+        return True
+
+    def forget(self, message_id: int) -> None:
+        entry = self.__entries.pop(message_id, None)
+        if entry is not None:
+            self.__bytes -= entry.size
+
+    def get(self, message_id: int) -> ReferencedMessage | None:
+        entry = self.__entries.get(message_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__entries.move_to_end(message_id)
+        return entry
+
+    async def resolve(
+            self,
+            bot: discord.Client,
+            reference: discord.MessageReference,
+            fetch: bool = True
+    ) -> ReferencedMessage | None:
+        """
+        Find the message a reply references, from py-cord's cache, the store, or (optionally) Discord's API.
+
+        :param bot: The bot, used to fetch the message on a miss.
+        :type bot: discord.Client
+        :param reference: The reply's reference.
+        :type reference: discord.MessageReference
+        :param fetch: Whether to fetch the message (one REST call) if it is nowhere to be found.
+        :type fetch: bool
+        :return: The referenced message, or None if it couldn't be found.
+        :rtype: ReferencedMessage | None
+        """
+        if reference.message_id is None:
+            return None
+        if reference.cached_message is not None:
+            return ReferencedMessage.from_message(reference.cached_message)
+
+        entry = self.get(reference.message_id)
+        if entry is not None or not fetch:
+            return entry
+
+        channel = bot.get_channel(reference.channel_id)
+        if channel is None:
+            return None
+        try:
+            message = await channel.fetch_message(reference.message_id)
+        except discord.HTTPException: # deleted, or we can't see it
+            return None
+        self.fetches += 1
+
+        entry = ReferencedMessage.from_message(message)
+        self.put(entry)
+        return entry
@@ -0,0 +1,112 @@
+import json
+import math
+import os
+import time
+import discord
+
+# how long (in seconds) a status file may go without being rewritten before its worker is considered unresponsive.
+STALE_AFTER = 30
+
+
+def split_shards(shard_count: int, workers: int) -> list[list[int]]:
+    """
+    Split a set of shards into contiguous ranges, one per worker.
+
+    :param shard_count: The total amount of shards.
+    :type shard_count: int
+    :param workers: How many workers to split them between.
+    :type workers: int
+    :return: Each worker's shard IDs.
+    :rtype: list[list[int]]
+
+    :raises ValueError: If there are fewer shards than workers.
+    """
+    if workers < 1 or shard_count < workers:
+        raise ValueError(f"Can't split {shard_count} shards between {workers} workers!")
+
+    base, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def shard_status(bot: discord.Client) -> list[dict]:
+    """
+    Get the status of every shard a bot owns.
+
+    :param bot: The (possibly sharded) bot.
+    :type bot: discord.Client
+    :return: Each shard's ID, latency (in seconds, None if unknown), whether it's connected and its guild count.
+    :rtype: list[dict]
+    """
+    guild_counts = {}
+    for guild in bot.guilds:
+        guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+
+    if isinstance(bot, discord.AutoShardedClient):
+        # include shards that haven't connected (yet), which would otherwise be missing.
+        shards = []
+        for shard_id in bot.shard_ids if bot.shard_ids is not None else list(bot.shards):
+            shard = bot.shards.get(shard_id)
+            shards.append((shard_id, shard.latency if shard else math.inf, shard is not None and not shard.is_closed()))
+    else:
+        shards = [(bot.shard_id or 0, bot.latency, not bot.is_closed())]
+
+    return [
+        {
+            "id": shard_id,
+            "latency": latency if math.isfinite(latency) else None,
+            "connected": connected,
+            "guilds": guild_counts.get(shard_id, 0)
+        }
+        for shard_id, latency, connected in shards
+    ]
+
+
+def write_status(status_dir: str, name: str, status: dict) -> None:
+    """
+    Atomically (re)write a status file, stamping it with the current time.
+
+    :param status_dir: The directory every status file is kept in.
+    :type status_dir: str
+    :param name: The file's name, without an extension (such as "worker-0").
+    :type name: str
+    :param status: The status to write.
+    :type status: dict
+    """
+    os.makedirs(status_dir, exist_ok=True)
+    path = os.path.join(status_dir, f"{name}.json")
+    # write to a temporary file first, so that readers never see a half-written one.
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({**status, "updated": time.time()}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def read_statuses(status_dir: str) -> dict[str, dict]:
+    """
+    Read every status file within a directory.
+
+    :param status_dir: The directory every status file is kept in.
+    :type status_dir: str
+    :return: Every status, by name, each with a "stale" flag if it hasn't been updated in `STALE_AFTER` seconds.
+    :rtype: dict[str, dict]
+    """
+    statuses = {}
+    if not os.path.isdir(status_dir):
+        return statuses
+
+    for file in sorted(os.listdir(status_dir)):
+        if not file.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(status_dir, file), "r") as f:
+                status = json.load(f)
+        except (OSError, ValueError): # being replaced or corrupted, either way there's nothing to show
+            continue
+        status["stale"] = time.time() - status.get("updated", 0) > STALE_AFTER
+        statuses[file.removesuffix(".json")] = status
+    return statuses
@@ -0,0 +1,150 @@
+import json
+import os
+import time
+from psomi.errors import NotFoundError
+from psomi.utils.data import Character, ProxyGroup, User
+from psomi.utils.prefilter import BracketFilter
+
+# bump whenever the layout changes, so that older snapshots are ignored instead of misread.
+SNAPSHOT_VERSION = 1
+
+
+def _dump_user(user: User, version: int) -> dict:
+    return {
+        "uid": user.uid,
+        "tid": user.tid,
+        "version": version,
+        "groups": [
+            [group.title, group.tid, [[_.name, _.prefix, _.avatar, _.proxy_count] for _ in group.characters]]
+            for group in user.proxy_groups
+        ]
+    }
+
+
+def _load_user(payload: dict) -> User:
+    return User(payload["uid"], payload["tid"], [
+        ProxyGroup(title, tid, [
+            Character(name, prefix, title if tid is not None else None, avatar, proxy_count)
+            for name, prefix, avatar, proxy_count in characters
+        ])
+        for title, tid, characters in payload["groups"]
+    ])
+
+
+def write_snapshot(bot, path: str, include_references: bool = False) -> dict:
+    """
+    Write the bot's hot caches (cached Users, BracketFilters, channel webhooks and, if included, recently seen messages)
+    to disk,
+    so that the next start doesn't have to rebuild them from the database and Discord's API.
+
+    Should be ran while shutting down, before the database is closed.
+
+    :param bot: The PsomiBot whose caches to write.
+    :type bot: PsomiBot
+    :param path: Where to write the snapshot.
+    :type path: str
+    :param include_references: Whether to include recently seen messages (and their content).
+    :type include_references: bool
+    :return: How many of each cache's entries were written.
+    :rtype: dict
+    """
+    uids = bot.cached_user_ids
+    # versions are read before anything they describe, so that anything changing in between is seen as stale (rather
+    # than as up to date) on the next load.
+    versions = bot.database.get_roster_versions(uids | bot.database.bracket_filters.keys())
+    filters = bot.database.bracket_filters
+
+    users = []
+    for uid in uids & versions.keys():
+        # cached Users may be up to a minute old, so take a fresh one instead.
+        try:
+            users.append(_dump_user(bot.database.get_user(uid), versions[uid][1]))
+        except NotFoundError:
+            continue
+
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "written_at": time.time(),
+        "users": users,
+        "bracket_filters": {
+            uid: [versions[uid][0], versions[uid][1], "".join(_.leading), "".join(_.trailing)]
+            for uid, _ in filters.items() if uid in versions
+        },
+        "webhooks": bot.channel_webhooks.dump(),
+        "references": bot.references.dump() if include_references else []
+    }
+
+    # webhook tokens (and possibly message content) are in here, so only we should be able to read it.
+    temp_path = f"{path}.tmp"
+    with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+    return {
+        "users": len(payload["users"]),
+        "bracket_filters": len(payload["bracket_filters"]),
+        "webhooks": len(payload["webhooks"]["hooks"]),
+        "references": len(payload["references"])
+    }
+
+
+def load_snapshot(bot, path: str, max_age: float | None = None) -> dict:
+    """
+    Restore the hot caches written by `write_snapshot`.
+
+    Users and BracketFilters are only restored if their roster version still matches the database's, which is
+    checked for all of them within a single transaction.
+
+    :param bot: The PsomiBot whose caches to restore.
+    :type bot: PsomiBot
+    :param path: Where the snapshot was written.
+    :type path: str
+    :param max_age: How old (in seconds) the snapshot may be before it is ignored, if at all.
+    :type max_age: float | None
+    :return: How many of each cache's entries were restored (or found to be stale), and how long it took.
+    :rtype: dict
+    """
+    start = time.perf_counter()
+    stats = {"users": 0, "bracket_filters": 0, "stale": 0, "webhooks": 0, "references": 0, "load_time": 0.0}
+    try:
+        with open(path, "r") as f:
+            payload = json.load(f)
+    except FileNotFoundError:
+        return stats
+    except (OSError, ValueError) as e:
+        print(f"Failed to read the cache snapshot at '{path}', starting cold! ({e!r})")
+        return stats
+
+    if payload.get("version") != SNAPSHOT_VERSION:
+        print(f"Ignoring the cache snapshot at '{path}', as it was written by a different version.")
+        return stats
+    if max_age is not None and time.time() - payload.get("written_at", 0) > max_age:
+        print(f"Ignoring the cache snapshot at '{path}', as it is too old.")
+        return stats
+
+    users = {_["uid"]: _ for _ in payload.get("users", [])}
+    filters = payload.get("bracket_filters", {})
+    versions = bot.database.get_roster_versions(users.keys() | filters.keys())
+
+    restored = {}
+    for uid, user in users.items():
+        if versions.get(uid) != (user["tid"], user["version"]):
+            stats["stale"] += 1
+            continue
+        restored[uid] = (_load_user(user), user["tid"], user["version"])
+    # not straight into user_cache, or they'd expire (and pull in cachetools) before the bot is even ready.
+    bot.restore_users(restored)
+    stats["users"] = len(restored)
+
+    fresh = {}
+    for uid, (tid, version, leading, trailing) in filters.items():
+        if versions.get(uid) != (tid, version):
+            stats["stale"] += 1
+            continue
+        fresh[uid] = BracketFilter.from_sets(leading, trailing)
+    stats["bracket_filters"] = bot.database.prime_bracket_filters(fresh)
+
+    stats["webhooks"] = bot.channel_webhooks.load(payload.get("webhooks", {}))
+    stats["references"] = bot.references.load(payload.get("references", []))
+    stats["load_time"] = time.perf_counter() - start
+    return stats
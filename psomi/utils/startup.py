@@ -0,0 +1,43 @@
+import time
+
+
+class StartupTimeline:
+    """
+    Records how long each stage of starting up (importing, logging in, becoming ready, ...) took.
+
+    Every stage is measured from the same starting point, and only the first time it is reached, so reconnects
+    (which fire `on_ready` again) don't overwrite the cold start.
+    """
+    def __init__(self, started: float | None = None, log: bool = True):
+        """
+        :param started: When the process started, as a `time.perf_counter()` value. Defaults to now.
+        :type started: float | None
+        :param log: Whether to log every stage as it is reached.
+        :type log: bool
+        """
+        self.started = time.perf_counter() if started is None else started
+        self.log = log
+        self.__stages: dict[str, float] = {}
+
+    def mark(self, stage: str) -> float | None:
+        """
+        Mark a stage as reached, then log it.
+
+        :param stage: The name of the stage.
+        :type stage: str
+        :return: How many seconds after starting the stage was reached, or None if it was already marked.
+        :rtype: float | None
+        """
+        if stage in self.__stages:
+            return None
+        elapsed = self.__stages[stage] = time.perf_counter() - self.started
+        if self.log:
+            print(f"Startup: {stage} after {round(elapsed, 3)} seconds")
+        return elapsed
+
+    def as_dict(self) -> dict[str, float]:
+        """
+        :return: Every reached stage (in the order they were reached), and how many seconds after starting.
+        :rtype: dict[str, float]
+        """
+        return dict(self.__stages)
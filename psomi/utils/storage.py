@@ -0,0 +1,724 @@
+import os.path
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from psomi.errors import NotFoundError, DuplicateError
+from psomi.utils.tracing import QueryTracer
+
+
+class StorageTransaction(ABC):
+    """
+    A single transaction against a StorageBackend, exposing the row-level primitives `Data` is built on.
+
+    Rows support item access by column name (`row["tid"]`), exactly like `sqlite3.Row`, and should be treated as
+    read-only. Every change made through a transaction is applied atomically once it exits, or not at all if it
+    exits with an exception.
+    """
+    def __enter__(self):
+        return self
+
+    @abstractmethod
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    # ---- Users ----
+
+    @abstractmethod
+    def get_all_user_ids(self) -> list[str]:
+        pass
+
+    @abstractmethod
+    def get_random_user_ids(self, limit: int) -> list[str]:
+        pass
+
+    @abstractmethod
+    def get_user_row(self, did: str):
+        """
+        :raises NotFoundError: If there is no user with that (Discord) UUID.
+        """
+
+    @abstractmethod
+    def insert_user(self, tid: str, did: str) -> None:
+        """
+        :raises DuplicateError: If a user with that (Discord) UUID already exists.
+        """
+
+    @abstractmethod
+    def bump_user_version(self, user_tid: str) -> None:
+        """
+        Increment a User's roster version.
+
+        Should be called by every method that modifies a User's Characters or ProxyGroups (besides their proxy counts),
+        so that anything holding onto a version stamp (such as paginator views) can tell that it has gone stale.
+
+        Backends that can be shared between processes also record the change, for `get_user_changes`.
+        """
+
+    @abstractmethod
+    def get_change_seq(self) -> int:
+        """
+        :return: The sequence number of the latest recorded change, to pass to `get_user_changes` later on.
+        """
+
+    @abstractmethod
+    def get_user_changes(self, after: int) -> tuple[int, list[str]]:
+        """
+        :return: The sequence number of the latest recorded change, and the (Discord) UUIDs of every User added or
+            changed by *another* process since `after`.
+        """
+
+    @abstractmethod
+    def prune_user_changes(self, before: float) -> int:
+        """
+        Forget every change recorded before `before` (a UNIX timestamp).
+
+        :return: How many changes were forgotten.
+        """
+
+    # ---- ProxyGroups ----
+
+    @abstractmethod
+    def get_group_rows(self, user_tid: str) -> list:
+        """
+        :return: Every ProxyGroup of a User, in creation order.
+        """
+
+    @abstractmethod
+    def get_group_row(self, user_tid: str, title: str):
+        """
+        :raises NotFoundError: If that User has no ProxyGroup with that title.
+        """
+
+    @abstractmethod
+    def get_group_row_by_tid(self, tid: str | None):
+        """
+        :return: The ProxyGroup, or None if it doesn't exist.
+        """
+
+    @abstractmethod
+    def count_groups(self, user_tid: str) -> int:
+        pass
+
+    @abstractmethod
+    def get_group_sizes(self, user_tid: str, limit: int = -1, offset: int = 0) -> list:
+        """
+        :return: The tid, title and size (Character count) of a User's ProxyGroups, in creation order.
+        """
+
+    @abstractmethod
+    def insert_group(self, tid: str, user_tid: str, title: str) -> None:
+        """
+        :raises DuplicateError: If that User already has a ProxyGroup with that title.
+        """
+
+    @abstractmethod
+    def update_group_title(self, tid: str, title: str) -> None:
+        """
+        :raises DuplicateError: If that User already has a ProxyGroup with that title.
+        """
+
+    @abstractmethod
+    def delete_group(self, tid: str) -> None:
+        """
+        Delete a ProxyGroup, leaving every Character within it Uncategorized.
+        """
+
+    # ---- Characters ----
+
+    @abstractmethod
+    def get_character_rows(self, user_tid: str, group_tid: str | None, limit: int = -1, offset: int = 0) -> list:
+        """
+        :return: A User's Characters within a ProxyGroup (or Uncategorized ones if None), in creation order.
+        """
+
+    @abstractmethod
+    def count_characters(self, user_tid: str, group_tid: str | None) -> int:
+        pass
+
+    @abstractmethod
+    def get_character_row(self, user_tid: str, name: str):
+        """
+        :raises NotFoundError: If that User has no Character with that name.
+        """
+
+    @abstractmethod
+    def get_character_row_by_tid(self, tid: str):
+        pass
+
+    @abstractmethod
+    def get_brackets(self, did: str) -> list[str]:
+        """
+        :return: The brackets of every one of a User's Characters (none if they don't exist).
+        """
+
+    @abstractmethod
+    def insert_character(
+            self,
+            tid: str,
+            user_tid: str,
+            group_tid: str | None,
+            name: str,
+            prefix: str,
+            avatar: str | None,
+            proxy_count: int = 0
+    ) -> None:
+        """
+        :raises DuplicateError: If that User already has a Character with that name or prefix.
+        """
+
+    @abstractmethod
+    def update_character_column(self, tid: str, key: str, value) -> None:
+        """
+        :raises DuplicateError: If the new value failed integrity checks.
+        :raises ValueError: If there is no such column.
+        """
+
+    @abstractmethod
+    def set_character_group(self, tid: str, group_tid: str | None) -> None:
+        pass
+
+    @abstractmethod
+    def delete_character(self, tid: str) -> None:
+        """
+        Also drops any front (see below) the Character was set as.
+        """
+
+    # ---- Fronts ----
+
+    @abstractmethod
+    def get_front_rows(self, user_tid: str | None = None) -> list:
+        """
+        :return: Every front (of a single User, if given) whose Character still exists, as rows of the User's `did`,
+            the `scope` ("guild" or "channel") and `scope_id` it's set in, and the Character's `name`.
+        """
+
+    @abstractmethod
+    def upsert_front(self, user_tid: str, scope_id: str, scope: str, character_tid: str) -> None:
+        """
+        Recorded as a change to the User, like `bump_user_version`.
+        """
+
+    @abstractmethod
+    def delete_front(self, user_tid: str, scope_id: str) -> None:
+        """
+        Recorded as a change to the User, like `bump_user_version`.
+        """
+
+    # ---- Proxy stats ----
+
+    @abstractmethod
+    def add_proxy_count(
+            self, user_tid: str, character_tid: str, guild_id: str, granularity: str, bucket: str, count: int
+    ) -> None:
+        """
+        Add to a Character's proxy count within a bucket, creating it if need be.
+
+        :param granularity: Either "day" (with `bucket` as "YYYY-MM-DD") or "month" (with `bucket` as "YYYY-MM").
+        """
+
+    @abstractmethod
+    def get_proxy_stat_rows(self, user_tid: str, since_day: str, since_month: str) -> list:
+        """
+        :return: Every "day" bucket from `since_day` and "month" bucket from `since_month` onwards, of Characters
+            that still exist, as rows of the Character's `name`, `guild_id`, `granularity`, `bucket` and `count`.
+        """
+
+    @abstractmethod
+    def compact_proxy_stats(self, before_day: str) -> int:
+        """
+        Fold every "day" bucket before `before_day` into its "month" bucket.
+
+        :return: How many "day" buckets were folded.
+        """
+
+
+class StorageBackend(ABC):
+    """
+    Where (and how) `Data` stores every User's roster.
+    """
+    @abstractmethod
+    def transaction(self) -> StorageTransaction:
+        pass
+
+    def data_version(self) -> int | None:
+        """
+        :return: Something that changes whenever another process commits to the same storage, without opening a
+            transaction, or None if that can't be told cheaply.
+        """
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteTransaction(StorageTransaction):
+    def __init__(self, conn: sqlite3.Connection, origin: str):
+        self.conn = conn
+        self.origin = origin
+        self.conn.row_factory = sqlite3.Row
+        self.cursor = conn.cursor()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            return self.conn.__exit__(exc_type, exc_val, exc_tb)
+        finally:
+            self.conn.close()
+
+    # ---- Users ----
+
+    def get_all_user_ids(self) -> list[str]:
+        return [_[0] for _ in self.cursor.execute("SELECT did FROM users").fetchall()]
+
+    def get_random_user_ids(self, limit: int) -> list[str]:
+        return [_[0] for _ in self.cursor.execute(
+            "SELECT did FROM users ORDER BY RANDOM() LIMIT ?",
+            (limit,)
+        ).fetchall()]
+
+    def get_user_row(self, did: str) -> sqlite3.Row:
+        try:
+            return self.cursor.execute(
+                "SELECT * FROM users WHERE did=?",
+                (did,)
+            ).fetchall()[0]
+        except IndexError as e:
+            raise NotFoundError(f"No such user of UUID '{did}'.") from e
+
+    def insert_user(self, tid: str, did: str) -> None:
+        try:
+            self.cursor.execute(
+                "INSERT INTO users (tid, did) VALUES (?, ?)",
+                (tid, did)
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError(f"User of UUID '{did}' already exists in database!") from e
+        self.cursor.execute(
+            "INSERT INTO user_changes (did, origin, changed_at) VALUES (?, ?, ?)",
+            (did, self.origin, time.time())
+        )
+
+    def bump_user_version(self, user_tid: str) -> None:
+        self.cursor.execute(
+            "UPDATE users SET version=version+1 WHERE tid=?",
+            (user_tid,)
+        )
+        self.__log_change(user_tid)
+
+    def __log_change(self, user_tid: str):
+        self.cursor.execute(
+            "INSERT INTO user_changes (did, origin, changed_at) SELECT did, ?, ? FROM users WHERE tid=?",
+            (self.origin, time.time(), user_tid)
+        )
+
+    def get_change_seq(self) -> int:
+        return self.cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM user_changes").fetchone()[0]
+
+    def get_user_changes(self, after: int) -> tuple[int, list[str]]:
+        rows = self.cursor.execute(
+            "SELECT seq, did, origin FROM user_changes WHERE seq>? ORDER BY seq",
+            (after,)
+        ).fetchall()
+        if not rows:
+            return after, []
+        # our own changes were already dealt with when they were made.
+        return rows[-1]["seq"], list(dict.fromkeys(_["did"] for _ in rows if _["origin"] != self.origin))
+
+    def prune_user_changes(self, before: float) -> int:
+        return self.cursor.execute(
+            "DELETE FROM user_changes WHERE changed_at<?",
+            (before,)
+        ).rowcount
+
+    # ---- ProxyGroups ----
+
+    def get_group_rows(self, user_tid: str) -> list:
+        return self.cursor.execute(
+            "SELECT * FROM proxy_groups WHERE user_tid=? ORDER BY rowid",
+            (user_tid,)
+        ).fetchall()
+
+    def get_group_row(self, user_tid: str, title: str) -> sqlite3.Row:
+        try:
+            return self.cursor.execute(
+                "SELECT * FROM proxy_groups WHERE user_tid=? AND title=?",
+                (user_tid, title)
+            ).fetchall()[0]
+        except IndexError as e:
+            raise NotFoundError(f"No such ProxyGroup of name '{title}'.") from e
+
+    def get_group_row_by_tid(self, tid: str | None) -> sqlite3.Row | None:
+        return self.cursor.execute(
+            "SELECT * FROM proxy_groups WHERE tid=?",
+            (tid,)
+        ).fetchone()
+
+    def count_groups(self, user_tid: str) -> int:
+        return self.cursor.execute(
+            "SELECT COUNT(*) FROM proxy_groups WHERE user_tid=?",
+            (user_tid,)
+        ).fetchone()[0]
+
+    def get_group_sizes(self, user_tid: str, limit: int = -1, offset: int = 0) -> list:
+        return self.cursor.execute(
+            "SELECT proxy_groups.tid, proxy_groups.title, COUNT(characters.tid) AS size FROM proxy_groups "
+            "LEFT JOIN characters ON characters.proxygroup_tid=proxy_groups.tid "
+            "WHERE proxy_groups.user_tid=? GROUP BY proxy_groups.tid ORDER BY proxy_groups.rowid "
+            "LIMIT ? OFFSET ?",
+            (user_tid, limit, offset)
+        ).fetchall()
+
+    def insert_group(self, tid: str, user_tid: str, title: str) -> None:
+        try:
+            self.cursor.execute(
+                "INSERT INTO proxy_groups (tid, user_tid, title) VALUES (?, ?, ?)",
+                (tid, user_tid, title)
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError(f"Duplicate ProxyGroup entry ('{title}')!") from e
+
+    def update_group_title(self, tid: str, title: str) -> None:
+        try:
+            self.cursor.execute(
+                "UPDATE proxy_groups SET title=? WHERE tid=?",
+                (title, tid)
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError(f"Duplicate ProxyGroup entry ('{title}')!") from e
+
+    def delete_group(self, tid: str) -> None:
+        # done by hand rather than through "ON DELETE SET NULL", as foreign keys can't be enabled mid-transaction.
+        self.cursor.execute(
+            "UPDATE characters SET proxygroup_tid=NULL WHERE proxygroup_tid=?",
+            (tid,)
+        )
+        self.cursor.execute(
+            "DELETE FROM proxy_groups WHERE tid=?",
+            (tid,)
+        )
+
+    # ---- Characters ----
+
+    def get_character_rows(self, user_tid: str, group_tid: str | None, limit: int = -1, offset: int = 0) -> list:
+        if group_tid is None:
+            return self.cursor.execute(
+                "SELECT * FROM characters WHERE user_tid=? AND proxygroup_tid IS NULL "
+                "ORDER BY rowid LIMIT ? OFFSET ?",
+                (user_tid, limit, offset)
+            ).fetchall()
+        return self.cursor.execute(
+            "SELECT * FROM characters WHERE user_tid=? AND proxygroup_tid=? ORDER BY rowid LIMIT ? OFFSET ?",
+            (user_tid, group_tid, limit, offset)
+        ).fetchall()
+
+    def count_characters(self, user_tid: str, group_tid: str | None) -> int:
+        if group_tid is None:
+            return self.cursor.execute(
+                "SELECT COUNT(*) FROM characters WHERE user_tid=? AND proxygroup_tid IS NULL",
+                (user_tid,)
+            ).fetchone()[0]
+        return self.cursor.execute(
+            "SELECT COUNT(*) FROM characters WHERE user_tid=? AND proxygroup_tid=?",
+            (user_tid, group_tid)
+        ).fetchone()[0]
+
+    def get_character_row(self, user_tid: str, name: str) -> sqlite3.Row:
+        try:
+            return self.cursor.execute(
+                "SELECT * FROM characters WHERE user_tid=? AND name=?",
+                (user_tid, name)
+            ).fetchall()[0]
+        except IndexError as e:
+            raise NotFoundError(f"No such character with name '{name}'.") from e
+
+    def get_character_row_by_tid(self, tid: str) -> sqlite3.Row | None:
+        return self.cursor.execute(
+            "SELECT * FROM characters WHERE tid=?",
+            (tid,)
+        ).fetchone()
+
+    def get_brackets(self, did: str) -> list[str]:
+        return [_[0] for _ in self.cursor.execute(
+            "SELECT characters.prefix FROM characters "
+            "JOIN users ON characters.user_tid = users.tid WHERE users.did=?",
+            (did,)
+        ).fetchall()]
+
+    def insert_character(
+            self,
+            tid: str,
+            user_tid: str,
+            group_tid: str | None,
+            name: str,
+            prefix: str,
+            avatar: str | None,
+            proxy_count: int = 0
+    ) -> None:
+        try:
+            self.cursor.execute(
+                "INSERT INTO characters (tid, proxygroup_tid, user_tid, name, prefix, avatar, proxy_count) VALUES "
+                "(?, ?, ?, ?, ?, ?, ?)",
+                (tid, group_tid, user_tid, name, prefix, avatar, proxy_count)
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError(f"One or more values failed database integrity checks!") from e
+
+    def update_character_column(self, tid: str, key: str, value) -> None:
+        try:
+            self.cursor.execute(
+                f"UPDATE characters SET {key}=? WHERE tid=?",
+                (value, tid)
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError("The requested key failed integrity checks!") from e
+        except sqlite3.OperationalError:
+            raise ValueError("Invalid key name.")
+
+    def set_character_group(self, tid: str, group_tid: str | None) -> None:
+        self.cursor.execute(
+            "UPDATE characters SET proxygroup_tid=? WHERE tid=?",
+            (group_tid, tid)
+        )
+
+    def delete_character(self, tid: str) -> None:
+        self.cursor.execute(
+            "DELETE FROM fronts WHERE character_tid=?",
+            (tid,)
+        )
+        self.cursor.execute(
+            "DELETE FROM proxy_stats WHERE character_tid=?",
+            (tid,)
+        )
+        self.cursor.execute(
+            "DELETE FROM characters WHERE tid=?",
+            (tid,)
+        )
+
+    # ---- Fronts ----
+
+    def get_front_rows(self, user_tid: str | None = None) -> list:
+        query = (
+            "SELECT users.did, fronts.scope, fronts.scope_id, characters.name FROM fronts "
+            "JOIN users ON fronts.user_tid = users.tid "
+            "JOIN characters ON fronts.character_tid = characters.tid"
+        )
+        if user_tid is None:
+            return self.cursor.execute(query).fetchall()
+        return self.cursor.execute(f"{query} WHERE fronts.user_tid=?", (user_tid,)).fetchall()
+
+    def upsert_front(self, user_tid: str, scope_id: str, scope: str, character_tid: str) -> None:
+        self.cursor.execute(
+            "INSERT INTO fronts (user_tid, scope_id, scope, character_tid) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (user_tid, scope_id) DO UPDATE SET scope=excluded.scope, character_tid=excluded.character_tid",
+            (user_tid, scope_id, scope, character_tid)
+        )
+        self.__log_change(user_tid)
+
+    def delete_front(self, user_tid: str, scope_id: str) -> None:
+        self.cursor.execute(
+            "DELETE FROM fronts WHERE user_tid=? AND scope_id=?",
+            (user_tid, scope_id)
+        )
+        self.__log_change(user_tid)
+
+    # ---- Proxy stats ----
+
+    def add_proxy_count(
+            self, user_tid: str, character_tid: str, guild_id: str, granularity: str, bucket: str, count: int
+    ) -> None:
+        self.cursor.execute(
+            "INSERT INTO proxy_stats (user_tid, character_tid, guild_id, granularity, bucket, count) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (character_tid, guild_id, granularity, bucket) DO UPDATE SET count=count+excluded.count",
+            (user_tid, character_tid, guild_id, granularity, bucket, count)
+        )
+
+    def get_proxy_stat_rows(self, user_tid: str, since_day: str, since_month: str) -> list:
+        return self.cursor.execute(
+            "SELECT characters.name, proxy_stats.guild_id, proxy_stats.granularity, proxy_stats.bucket, "
+            "proxy_stats.count FROM proxy_stats JOIN characters ON proxy_stats.character_tid = characters.tid "
+            "WHERE proxy_stats.user_tid=? AND ((proxy_stats.granularity='day' AND proxy_stats.bucket>=?) "
+            "OR (proxy_stats.granularity='month' AND proxy_stats.bucket>=?))",
+            (user_tid, since_day, since_month)
+        ).fetchall()
+
+    def compact_proxy_stats(self, before_day: str) -> int:
+        self.cursor.execute(
+            "INSERT INTO proxy_stats (user_tid, character_tid, guild_id, granularity, bucket, count) "
+            "SELECT user_tid, character_tid, guild_id, 'month', substr(bucket, 1, 7), SUM(count) FROM proxy_stats "
+            "WHERE granularity='day' AND bucket<? GROUP BY character_tid, guild_id, substr(bucket, 1, 7) "
+            "ON CONFLICT (character_tid, guild_id, granularity, bucket) DO UPDATE SET count=count+excluded.count",
+            (before_day,)
+        )
+        return self.cursor.execute(
+            "DELETE FROM proxy_stats WHERE granularity='day' AND bucket<?",
+            (before_day,)
+        ).rowcount
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stores everything within an SQLite database, with every transaction opening its own connection.
+    """
+    def __init__(self, data_path: str, tracer: QueryTracer | None = None):
+        """
+        Initializes the backend, creating the database (and all required tables) if it doesn't exist yet.
+
+        :param data_path: The location of the database.
+        :type data_path: str
+        :param tracer: If supplied, every statement ran will be traced by it.
+        :type tracer: QueryTracer | None
+        """
+        self.data_path = data_path
+        self.tracer = tracer
+        # tags every change this backend records, so that it can tell them apart from other processes' changes.
+        self.origin = str(uuid.uuid4())
+        self._prep()
+
+        # kept open for `data_version`, which only notices commits made since the connection was opened.
+        self.__watcher = sqlite3.connect(data_path, check_same_thread=False)
+        self.__watcher_lock = threading.Lock()
+
+    def _connect(self, method: str) -> sqlite3.Connection:
+        """
+        Open a new connection to the database, traced if a tracer was supplied.
+
+        :param method: What the connection is opened for, which traced statements are attributed to.
+        :type method: str
+        :return: The opened connection.
+        :rtype: sqlite3.Connection
+        """
+        if self.tracer is None:
+            return sqlite3.connect(self.data_path)
+        return self.tracer.connect(self.data_path, method)
+
+    def transaction(self) -> SQLiteTransaction:
+        # attribute statements to whichever (Data) method opened the transaction.
+        return SQLiteTransaction(self._connect(f"Data.{sys._getframe(1).f_code.co_name}"), self.origin)
+
+    def data_version(self) -> int:
+        # changes whenever any other connection (including our own transactions') commits, and costs no I/O otherwise.
+        with self.__watcher_lock:
+            return self.__watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self) -> None:
+        with self.__watcher_lock:
+            self.__watcher.close()
+
+    def _prep(self):
+        if not os.path.exists(self.data_path):
+            with self._connect("Data._prep") as conn:
+                cursor = conn.cursor()
+
+                # Create DB User Table
+                #
+                # tid: Table ID. Used to make table values unique.
+                # did: Discord ID. Refers to the UUID of the User.
+                # version: Roster version. Incremented whenever a User's Characters or ProxyGroups change.
+                #
+                cursor.execute("""
+                CREATE TABLE users (
+                    tid TEXT UNIQUE NOT NULL PRIMARY KEY,
+                    did TEXT UNIQUE NOT NULL,
+                    version INT NOT NULL DEFAULT 0
+                )
+                """)
+                # Store ProxyGroups in their own table.
+                cursor.execute("""
+                CREATE TABLE proxy_groups (
+                    tid TEXT UNIQUE NOT NULL PRIMARY KEY,
+                    user_tid TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    FOREIGN KEY (user_tid) REFERENCES users(tid)
+                    UNIQUE (user_tid, title)
+                )
+                """)
+                # As well as Characters, cross-referencing all of them together.
+                cursor.execute("""
+                CREATE TABLE characters (
+                    tid TEXT UNIQUE NOT NULL PRIMARY KEY,
+                    proxygroup_tid TEXT DEFAULT NULL,
+                    user_tid TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    prefix TEXT NOT NULL,
+                    avatar TEXT,
+                    proxy_count INT NOT NULL DEFAULT 0,
+                    FOREIGN KEY (proxygroup_tid) REFERENCES proxy_groups(tid) ON DELETE SET NULL,
+                    FOREIGN KEY (user_tid) REFERENCES users(tid),
+                    UNIQUE (user_tid, name),
+                    UNIQUE (user_tid, prefix)
+                )
+                """)
+            conn.close()
+
+        self._migrate()
+
+    def _migrate(self):
+        """
+        Bring databases created by older versions of PSOMI up to date with the current schema.
+        """
+        with self._connect("Data._migrate") as conn:
+            cursor = conn.cursor()
+
+            user_columns = [_[1] for _ in cursor.execute("PRAGMA table_info(users)").fetchall()]
+            if "version" not in user_columns:
+                cursor.execute("ALTER TABLE users ADD COLUMN version INT NOT NULL DEFAULT 0")
+
+            # Which Character each User autoproxies as, per guild or channel.
+            #
+            # scope: Either "guild" or "channel", depending on what scope_id refers to.
+            #
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS fronts (
+                user_tid TEXT NOT NULL,
+                scope_id TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                character_tid TEXT NOT NULL,
+                FOREIGN KEY (user_tid) REFERENCES users(tid),
+                FOREIGN KEY (character_tid) REFERENCES characters(tid),
+                PRIMARY KEY (user_tid, scope_id)
+            )
+            """)
+            # How often each Character was proxied, bucketed by day (or, once compacted, by month).
+            #
+            # guild_id: The guild it was proxied in, or an empty string if not tracked (or not in a guild).
+            # granularity: Either "day" or "month", with bucket being "YYYY-MM-DD" or "YYYY-MM" (in UTC).
+            #
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS proxy_stats (
+                user_tid TEXT NOT NULL,
+                character_tid TEXT NOT NULL,
+                guild_id TEXT NOT NULL DEFAULT '',
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                count INT NOT NULL DEFAULT 0,
+                FOREIGN KEY (user_tid) REFERENCES users(tid),
+                FOREIGN KEY (character_tid) REFERENCES characters(tid),
+                PRIMARY KEY (character_tid, guild_id, granularity, bucket)
+            )
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS proxy_stats_by_user ON proxy_stats (user_tid, granularity, bucket)"
+            )
+            # Which Users were added or changed (and by which process), so that every process sharing the database
+            # can drop whatever it has cached of only those Users.
+            #
+            # origin: The SQLiteBackend (see `SQLiteBackend.origin`) that made the change.
+            # changed_at: When the change was made (as a UNIX timestamp), so that old changes can be pruned.
+            #
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                did TEXT NOT NULL,
+                origin TEXT NOT NULL,
+                changed_at REAL NOT NULL
+            )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS user_changes_by_time ON user_changes (changed_at)")
+
+            # let readers and a writer (possibly in other worker processes) work at the same time.
+            # writers still take turns, waiting on each other for up to sqlite3's default 5 second timeout.
+            cursor.execute("PRAGMA journal_mode=WAL")
+        conn.close()
@@ -0,0 +1,46 @@
+import math
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    """
+    Get a percentile out of a list of samples, using the nearest-rank method.
+
+    :param samples: The samples to use. Do not need to be sorted.
+    :type samples: list[float]
+    :param percent: Which percentile to get (0-100).
+    :type percent: float
+    :return: The requested percentile, or 0 if there were no samples.
+    :rtype: float
+    """
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(samples: list[float], precision: int = 5) -> dict[str, float | int]:
+    """
+    Summarize a list of latency samples.
+
+    :param samples: The samples to summarize.
+    :type samples: list[float]
+    :param precision: How many decimal places to round to.
+    :type precision: int
+    :return: A dict containing the sample count, mean, min, max and p50/p95/p99 percentiles.
+    :rtype: dict[str, float | int]
+    """
+    if not samples:
+        return {"count": 0, "mean": 0.0, "min": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), precision),
+        "min": round(ordered[0], precision),
+        "p50": round(percentile(ordered, 50), precision),
+        "p95": round(percentile(ordered, 95), precision),
+        "p99": round(percentile(ordered, 99), precision),
+        "max": round(ordered[-1], precision),
+    }
@@ -0,0 +1,222 @@
+import re
+import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalize an SQL statement, so that statements only differing in their literals or whitespace are grouped.
+
+    :param sql: The statement to normalize.
+    :type sql: str
+    :return: The normalized statement.
+    :rtype: str
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+@dataclass
+class StatementStats:
+    """
+    Aggregate statistics on a single (normalized) statement.
+    """
+    sql: str
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    rows: int = 0
+    methods: Counter = field(default_factory=Counter)
+
+
+class QueryTracer:
+    """
+    Opt-in tracer for every statement ran through `Data` and `WebhookCache`.
+
+    Statements are timed by wrapping the connection's cursors, with sqlite3's trace callback catching anything the
+    wrapper can't see (such as the COMMIT ran when a connection's context manager exits).
+    """
+    def __init__(self, slow_threshold: float | None = 0.05):
+        """
+        Initializes the tracer.
+
+        :param slow_threshold: How long (in seconds) a statement may take before it is logged, or None to disable.
+        :type slow_threshold: float | None
+        """
+        self.slow_threshold = slow_threshold
+        self.stats: dict[str, StatementStats] = {}
+
+    def record(self, sql: str, duration: float, rows: int, method: str) -> None:
+        """
+        Record a single execution of a statement.
+
+        :param sql: The statement that was ran.
+        :type sql: str
+        :param duration: How long it took, in seconds (including fetching its rows).
+        :type duration: float
+        :param rows: How many rows it returned (or modified).
+        :type rows: int
+        :param method: The `Data`/`WebhookCache` method that ran it.
+        :type method: str
+        """
+        normalized = normalize_sql(sql)
+        stats = self.stats.get(normalized)
+        if stats is None:
+            stats = self.stats[normalized] = StatementStats(normalized)
+
+        stats.count += 1
+        stats.total_time += duration
+        stats.max_time = max(stats.max_time, duration)
+        stats.rows += rows
+        stats.methods[method] += 1
+
+        if self.slow_threshold is not None and duration > self.slow_threshold:
+            print(f"Slow query ({round(duration*1000, 3)} ms, {rows} rows) in {method}: {normalized}")
+
+    def top(self, limit: int = 10, key: str = "total_time") -> list[StatementStats]:
+        """
+        Get the most expensive statements.
+
+        :param limit: How many statements to return.
+        :type limit: int
+        :param key: Which statistic to sort by (such as "total_time", "max_time" or "count").
+        :type key: str
+        :return: Up to `limit` statements, most expensive first.
+        :rtype: list[StatementStats]
+        """
+        return sorted(self.stats.values(), key=lambda x: getattr(x, key), reverse=True)[:limit]
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+    def connect(self, data_path: str, method: str) -> sqlite3.Connection:
+        """
+        Open a traced connection.
+
+        :param data_path: The location of the database.
+        :type data_path: str
+        :param method: The method the connection is opened for, which all of its statements are attributed to.
+        :type method: str
+        :return: The traced connection.
+        :rtype: sqlite3.Connection
+        """
+        conn = sqlite3.connect(data_path, factory=TracedConnection)
+        conn.attach_tracer(self, method)
+        return conn
+
+
+class TracedCursor(sqlite3.Cursor):
+    """
+    Cursor which times every statement it runs, including the time spent fetching its rows.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending: list | None = None # [sql, duration, rows]
+
+    def _finish(self):
+        if self._pending is not None:
+            sql, duration, rows = self._pending
+            self._pending = None
+            self.connection.tracer.record(sql, duration, max(rows, self.rowcount, 0), self.connection.method)
+
+    def __timed(self, func, *args):
+        self.connection.wrapped += 1
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.connection.wrapped -= 1
+            if self._pending is not None:
+                self._pending[1] += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._pending = [sql, 0.0, 0]
+        self.__timed(super().execute, sql, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        self._pending = [sql, 0.0, 0]
+        self.__timed(super().executemany, sql, seq_of_parameters)
+        return self
+
+    def fetchone(self):
+        row = self.__timed(super().fetchone)
+        if row is not None and self._pending is not None:
+            self._pending[2] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self.__timed(super().fetchmany, size or self.arraysize)
+        if self._pending is not None:
+            self._pending[2] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.__timed(super().fetchall)
+        if self._pending is not None:
+            self._pending[2] += len(rows)
+        return rows
+
+    def __next__(self):
+        row = self.__timed(super().__next__)
+        if self._pending is not None:
+            self._pending[2] += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class TracedConnection(sqlite3.Connection):
+    """
+    Connection handing out `TracedCursor`s, which also times the commit/rollback ran by its context manager.
+    """
+    def attach_tracer(self, tracer: QueryTracer, method: str):
+        self.tracer = tracer
+        self.method = method
+        self.wrapped = 0
+        self.cursors: list[TracedCursor] = []
+        self.unwrapped: list[str] = []
+        self.set_trace_callback(self.__trace)
+
+    def __trace(self, sql: str):
+        # anything ran while a cursor is executing is already timed by it.
+        if not self.wrapped:
+            self.unwrapped.append(sql)
+
+    def cursor(self, factory=TracedCursor):
+        cursor = super().cursor(factory)
+        self.cursors.append(cursor)
+        return cursor
+
+    def close(self):
+        # we hold onto every cursor, so any left mid-statement (such as an unread PRAGMA) would otherwise keep the
+        # connection (and its locks) alive after closing.
+        for cursor in self.cursors:
+            cursor.close()
+        self.cursors.clear()
+        super().close()
+
+    def __exit__(self, *exc):
+        for cursor in self.cursors:
+            cursor._finish()
+
+        self.unwrapped.clear()
+        start = time.perf_counter()
+        try:
+            return super().__exit__(*exc)
+        finally:
+            duration = time.perf_counter() - start
+            for sql in self.unwrapped:
+                self.tracer.record(sql, duration / len(self.unwrapped), 0, self.method)
+            self.unwrapped.clear()
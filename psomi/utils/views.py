@@ -1,37 +1,157 @@
+import sys
+import weakref
+from abc import ABCMeta, abstractmethod
 import discord
 from typing import cast
-from psomi.errors import OutOfBoundsError
-from psomi.utils.data import User, sort_by_page
+from psomi.errors import OutOfBoundsError, NotFoundError
+from psomi.utils.bot import PsomiBot
+from psomi.utils.data import Data
 
-class CharacterListView(discord.ui.View):
-    def __init__(self, page: int, user: User, author: discord.User, *args, **kwargs):
+# every paginator view that is still alive, used for instrumentation.
+# weak references, so tracking a view never keeps it around any longer than discord would.
+_live_views: weakref.WeakSet = weakref.WeakSet()
+
+
+def get_view_stats() -> dict[str, int]:
+    """
+    Get instrumentation data on all currently alive paginator views.
+
+    Memory is an estimate, only including each view and the state it holds directly (not its buttons).
+
+    :return: A dict containing the amount of live views and the memory (in bytes) they retain.
+    :rtype: dict[str, int]
+    """
+    views = list(_live_views)
+    retained = 0
+    for view in views:
+        retained += sys.getsizeof(view) + sys.getsizeof(view.__dict__)
+        retained += sum(sys.getsizeof(getattr(view, _)) for _ in PaginatorView.STATE)
+
+    return {"live_views": len(views), "retained_bytes": retained}
+
+
+class PaginatorView(discord.ui.View, metaclass=ABCMeta):
+    """
+    Base class for PSOMI's paginators.
+
+    Only holds a cursor into the User's roster (their UUID, the current page and the roster version it was built at),
+    with every page being fetched on demand through the database when needed.
+    """
+    STATE = ("uid", "author_id", "current_page", "max_page", "version")
+    PAGE_SIZE = 20
+
+    def __init__(self, page: int, uid: str, author_id: int, version: int, max_page: int, *args, **kwargs):
+        self.uid = uid
+        self.author_id = author_id
         self.current_page = page
-        self.max_page = sort_by_page([_.characters for _ in user.proxy_groups], 1, 20)["page_total"]
-        self.user = user
-        self.author = author
+        self.max_page = max_page
+        self.version = version
 
         super().__init__(*args, **kwargs)
+        _live_views.add(self)
 
     async def interaction_check(self, interaction: discord.Interaction):
-        return interaction.user.id == self.author.id
+        return interaction.user.id == self.author_id
+
+    @abstractmethod
+    def fetch_page(self, data: Data) -> dict:
+        """
+        Fetch the current page from the database.
+
+        :param data: The Database to fetch from.
+        :type data: Data
+        :return: The fetched page.
+        :rtype: dict
+        """
 
-    async def construct_embed(self):
+    @abstractmethod
+    def build_embed(self, page: dict) -> discord.Embed:
+        """
+        Build an embed out of a fetched page.
+
+        :param page: The page, as returned by `fetch_page`.
+        :type page: dict
+        :return: The constructed embed.
+        :rtype: discord.Embed
+        """
+
+    async def construct_embed(self, data: Data) -> discord.Embed:
+        """
+        Fetch the current page and construct its embed.
+
+        If the User's roster changed since the view was created, the view is refreshed to match it first, moving back
+        to the (new) last page if the current one no longer exists.
+
+        :param data: The Database to fetch from.
+        :type data: Data
+        :return: The constructed embed.
+        :rtype: discord.Embed
+        :raises OutOfBoundsError: If the current page is out of bounds.
+        """
         if self.current_page < 1:
             raise OutOfBoundsError("Cannot have a page number lower than 1!")
 
-        # create the embed
-        characters = sort_by_page([_.characters for _ in self.user.proxy_groups], self.current_page, 20)
+        try:
+            page = self.fetch_page(data)
+        except NotFoundError as e:
+            raise OutOfBoundsError("The User this view belongs to no longer exists!") from e
+
+        if page["version"] != self.version:
+            # stale view, so the amount of pages may have changed.
+            self.version = page["version"]
+            self.max_page = page["page_total"]
+            if self.current_page > max(self.max_page, 1):
+                self.current_page = max(self.max_page, 1)
+                try:
+                    page = self.fetch_page(data)
+                except NotFoundError as e:
+                    raise OutOfBoundsError("The User this view belongs to no longer exists!") from e
+
         if self.current_page > self.max_page:
             raise OutOfBoundsError(f"Cannot have a page number higher than {self.max_page}!")
-        elif characters["group_num"] == 0:
+        elif page["group_num"] == 0:
             raise OutOfBoundsError("The requested page was out of bounds!")
 
+        return self.render(page)
+
+    def render(self, page: dict) -> discord.Embed:
+        """
+        Render a fetched page, including its footer.
+
+        :param page: The page, as returned by `fetch_page`.
+        :type page: dict
+        :return: The rendered embed.
+        :rtype: discord.Embed
+        """
+        embed = self.build_embed(page)
+
+        if not page["page"]:
+            embed.set_footer(text="Nothing here...")
+        elif self.current_page < page["page_total"]:
+            embed.set_footer(text="More on next page...")
+
+        return embed
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+            # self.remove_item(item)
+        try:
+            await self.parent.edit(content="This view has timed out.", view=self)
+        except discord.errors.NotFound: # message was likely deleted, no need to do anything
+            pass
+
+class CharacterListView(PaginatorView):
+    def fetch_page(self, data: Data) -> dict:
+        return data.get_character_page(self.uid, self.current_page, self.PAGE_SIZE)
+
+    def build_embed(self, page: dict) -> discord.Embed:
         embed = discord.Embed(
             title=f"Registered Characters [{self.current_page}/{self.max_page}]"
-                  f"({self.user.proxy_groups[characters["group_num"]-1].title}):"
+                  f"({page["group_title"]}):"
         )
 
-        for i, character in enumerate(characters["page"]):
+        for i, character in enumerate(page["page"]):
             embed.add_field(
                 name=character.name,
                 value=f"Brackets: `{character.prefix}`\n"
@@ -39,32 +159,36 @@ class CharacterListView(discord.ui.View):
                       + (f"Avatar: [linkie]({character.avatar})" if character.avatar else "Avatar: None")
             )
 
-        if not characters["page"]:
-            embed.set_footer(text="Nothing here...")
-        elif self.current_page < characters["page_total"]:
-            embed.set_footer(text="More on next page...")
-
         return embed
 
     @discord.ui.button(label="⏮️", style=discord.ButtonStyle.green)
     async def first_callback(self, button: discord.Button, interaction: discord.Interaction):
-        self.current_page = 1
-        embed = await self.construct_embed()
+        bot = cast(PsomiBot, interaction.client)
+
+        previous_page, self.current_page = self.current_page, 1
+        try:
+            embed = await self.construct_embed(bot.database)
+        except OutOfBoundsError:
+            await interaction.response.send_message("There's nothing to show here anymore!", ephemeral=True)
+            self.current_page = previous_page
+            return
         await interaction.response.edit_message(embed=embed)
 
     @discord.ui.button(label="◀️", style=discord.ButtonStyle.primary)
     async def previous_callback(self, button: discord.Button, interaction: discord.Interaction):
+        bot = cast(PsomiBot, interaction.client)
+
+        previous_page = self.current_page
         self.current_page -= 1
         # self.current_page %=
         try:
-            embed = await self.construct_embed()
+            embed = await self.construct_embed(bot.database)
         except OutOfBoundsError:
             await interaction.response.send_message("There are no more pages!", ephemeral=True)
-            self.current_page += 1
+            self.current_page = previous_page
             return        # await self.message.edit(embed=embed)
         await interaction.response.edit_message(embed=embed)
 
-
     # @discord.ui.button(label="🔢", style=discord.ButtonStyle.secondary)
     # async def jump_to(self, button: discord.Button, interaction: discord.Interaction):
     #     bot = cast(PsomiBot, interaction.client)
@@ -96,102 +220,77 @@ class CharacterListView(discord.ui.View):
 
     @discord.ui.button(label="▶️", style=discord.ButtonStyle.primary)
     async def next_callback(self, button: discord.Button, interaction: discord.Interaction):
+        bot = cast(PsomiBot, interaction.client)
+
+        previous_page = self.current_page
         self.current_page += 1
         # self.current_page %=
         try:
-            embed = await self.construct_embed()
+            embed = await self.construct_embed(bot.database)
         except OutOfBoundsError:
             await interaction.response.send_message("There are no more pages!", ephemeral=True)
-            self.current_page -= 1
+            self.current_page = previous_page
             return
         # await self.message.edit(embed=embed)
         await interaction.response.edit_message(embed=embed)
 
     @discord.ui.button(label="⏭️", style=discord.ButtonStyle.green)
     async def last_callback(self, button: discord.Button, interaction: discord.Interaction):
-        self.current_page = self.max_page
-        embed = await self.construct_embed()
-        await interaction.response.edit_message(embed=embed)
+        bot = cast(PsomiBot, interaction.client)
 
-    async def on_timeout(self):
-        for item in self.children:
-            item.disabled = True
-            # self.remove_item(item)
+        previous_page, self.current_page = self.current_page, self.max_page
         try:
-            await self.parent.edit(content="This view has timed out.", view=self)
-        except discord.errors.NotFound: # message was likely deleted, no need to do anything
-            pass
-
-class ProxyGroupListView(discord.ui.View):
-    def __init__(self, page: int, user: User, author: discord.User, *args, **kwargs):
-        self.current_page = page
-        self.user = user
-        self.author = author
-
-        super().__init__(*args, **kwargs)
-
-    async def interaction_check(self, interaction: discord.Interaction):
-        return interaction.user.id == self.author.id
-
-    async def construct_embed(self):
-        if self.current_page < 1:
-            raise OutOfBoundsError("Cannot have a page number lower than 1!")
+            embed = await self.construct_embed(bot.database)
+        except OutOfBoundsError:
+            await interaction.response.send_message("There's nothing to show here anymore!", ephemeral=True)
+            self.current_page = previous_page
+            return
+        await interaction.response.edit_message(embed=embed)
 
-        # create the embed
-        groups = sort_by_page([self.user.proxy_groups], self.current_page, 20)
-        if self.current_page > groups["page_total"]:
-            raise OutOfBoundsError(f"Cannot have a page number higher than {groups["page_total"]}!")
-        elif groups["group_num"] == 0:
-            raise OutOfBoundsError("The requested page was out of bounds!")
-            # await ctx.respond(f"That's out of bounds! Please choose a number between 0 and {characters["page_total"]}!")
+class ProxyGroupListView(PaginatorView):
+    def fetch_page(self, data: Data) -> dict:
+        return data.get_proxygroup_page(self.uid, self.current_page, self.PAGE_SIZE)
 
+    def build_embed(self, page: dict) -> discord.Embed:
         embed = discord.Embed(
-            title=f"Created ProxyGroups [{self.current_page}/{groups["page_total"]}]"
+            title=f"Created ProxyGroups [{self.current_page}/{self.max_page}]"
         )
 
-        for i, proxygroup in enumerate(groups["page"]):
+        for i, proxygroup in enumerate(page["page"]):
             embed.add_field(
-                name=proxygroup.title,
-                value=f"Character Count: {len(proxygroup.characters)}"
+                name=proxygroup["title"],
+                value=f"Character Count: {proxygroup["character_count"]}"
             )
 
-        if not groups["page"]:
-            embed.set_footer(text="Nothing here...")
-        elif self.current_page < groups["page_total"]:
-            embed.set_footer(text="More on next page...")
-
         return embed
 
     @discord.ui.button(label="◀️", style=discord.ButtonStyle.primary)
     async def previous_callback(self, button: discord.Button, interaction: discord.Interaction):
+        bot = cast(PsomiBot, interaction.client)
+
+        previous_page = self.current_page
         self.current_page -= 1
         # self.current_page %=
         try:
-            embed = await self.construct_embed()
+            embed = await self.construct_embed(bot.database)
         except OutOfBoundsError:
             await interaction.response.send_message("There are no more pages!", ephemeral=True)
-            self.current_page += 1
+            self.current_page = previous_page
             return        # await self.message.edit(embed=embed)
         await interaction.response.edit_message(embed=embed)
 
     @discord.ui.button(label="▶️", style=discord.ButtonStyle.primary)
     async def next_callback(self, button: discord.Button, interaction: discord.Interaction):
+        bot = cast(PsomiBot, interaction.client)
+
+        previous_page = self.current_page
         self.current_page += 1
         # self.current_page %=
         try:
-            embed = await self.construct_embed()
+            embed = await self.construct_embed(bot.database)
         except OutOfBoundsError:
             await interaction.response.send_message("There are no more pages!", ephemeral=True)
-            self.current_page -= 1
+            self.current_page = previous_page
             return
         # await self.message.edit(embed=embed)
         await interaction.response.edit_message(embed=embed)
-
-    async def on_timeout(self):
-        for item in self.children:
-            item.disabled = True
-            # self.remove_item(item)
-        try:
-            await self.parent.edit(content="This view has timed out.", view=self)
-        except discord.errors.NotFound: # message was likely deleted, no need to do anything
-            pass
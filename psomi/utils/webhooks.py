@@ -0,0 +1,202 @@
+import asyncio
+import time
+from collections import OrderedDict
+import discord
+
+
+class ChannelWebhooks:
+    """
+    Which of our webhooks belongs to which channel, so that proxying doesn't have to ask Discord every time.
+
+    Filled a whole guild at a time (one request via the guild-level endpoint) at startup and when joining a guild,
+    falling back to the channel-level endpoint (and creating a webhook if need be) for anything still unknown.
+    """
+    def __init__(self, webhook_name: str, max_recent: int = 1000):
+        """
+        :param webhook_name: The name our webhooks go by. Any other webhook is ignored.
+        :type webhook_name: str
+        :param max_recent: How many recently proxied to channels to remember, for pre-creating webhooks in.
+        :type max_recent: int
+        """
+        self.webhook_name = webhook_name
+        self.max_recent = max_recent
+        self.__hooks: dict[int, dict] = {} # channel id -> webhook
+        # channel id -> when it was last proxied to, least recent first.
+        self.__recent: OrderedDict[int, float] = OrderedDict()
+        self.__guilds: set[int] = set() # every prefetched guild's id
+        # lookups still waiting on Discord, so concurrent messages to a new channel don't create a webhook each.
+        self.__pending: dict[int, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+
+    def __len__(self):
+        return len(self.__hooks)
+
+    @property
+    def prefetched_guilds(self) -> int:
+        return len(self.__guilds)
+
+    def knows_guild(self, guild_id: int) -> bool:
+        """
+        :return: Whether the guild was already prefetched.
+        :rtype: bool
+        """
+        return guild_id in self.__guilds
+
+    @property
+    def recent(self) -> dict[int, float]:
+        """
+        :return: Every recently proxied to channel, and when it was last proxied to.
+        :rtype: dict[int, float]
+        """
+        return dict(self.__recent)
+
+    def get(self, channel_id: int) -> dict | None:
+        return self.__hooks.get(channel_id)
+
+    def put(self, channel_id: int, hook: dict) -> None:
+        self.__hooks[channel_id] = hook
+
+    def forget(self, channel_id: int) -> None:
+        """
+        Forget a channel's webhook, such as after it turned out to be deleted.
+        """
+        self.__hooks.pop(channel_id, None)
+
+    def touch(self, channel_id: int, when: float | None = None) -> None:
+        """
+        Remember that a channel was just proxied to.
+        """
+        self.__recent[channel_id] = time.time() if when is None else when
+        self.__recent.move_to_end(channel_id)
+        while len(self.__recent) > self.max_recent:
+            self.__recent.popitem(last=False)
+
+    def dump(self) -> dict:
+        """
+        :return: Everything known, in a JSON serializable form that `load` accepts.
+        :rtype: dict
+        """
+        return {
+            # only what's needed to send through them.
+            "hooks": {
+                str(channel_id): {"id": hook.get("id"), "token": hook.get("token"), "channel_id": str(channel_id)}
+                for channel_id, hook in self.__hooks.items()
+            },
+            "guilds": list(self.__guilds),
+            "recent": [[channel_id, when] for channel_id, when in self.__recent.items()]
+        }
+
+    def load(self, payload: dict) -> int:
+        """
+        Restore what a previous `dump` knew, without overwriting anything learned since.
+
+        Restored webhooks may since have been deleted, in which case they are found (or created) again once sending
+        through them fails.
+
+        :param payload: A previous `dump`.
+        :type payload: dict
+        :return: How many channels' webhooks were restored.
+        :rtype: int
+        """
+        restored = 0
+        for channel_id, hook in payload.get("hooks", {}).items():
+            if int(channel_id) not in self.__hooks and hook.get("token"):
+                self.__hooks[int(channel_id)] = hook
+                restored += 1
+        self.__guilds.update(payload.get("guilds", []))
+        for channel_id, when in payload.get("recent", []):
+            if channel_id not in self.__recent:
+                self.touch(channel_id, when)
+        return restored
+
+    async def resolve(self, bot: discord.Client, channel_id: int) -> dict:
+        """
+        Get our webhook for a channel, from memory if possible, otherwise finding (or creating) it via Discord's API.
+
+        :param bot: The bot, used to make any requests.
+        :type bot: discord.Client
+        :param channel_id: The ID of the channel.
+        :type channel_id: int
+        :return: The webhook's payload.
+        :rtype: dict
+
+        :raises discord.NotFound: If the channel doesn't exist (anymore).
+        """
+        hook = self.__hooks.get(channel_id)
+        if hook is not None:
+            self.hits += 1
+            return hook
+        self.misses += 1
+
+        task = self.__pending.get(channel_id)
+        if task is None:
+            task = self.__pending[channel_id] = asyncio.create_task(self.__lookup(bot, channel_id))
+            task.add_done_callback(lambda _: self.__pending.pop(channel_id, None))
+        return await asyncio.shield(task)
+
+    async def __lookup(self, bot: discord.Client, channel_id: int) -> dict:
+        for hook in await bot.http.channel_webhooks(channel_id):
+            if hook.get("name", None) == self.webhook_name:
+                break
+        else:
+            hook = await bot.http.create_webhook(channel_id, name=self.webhook_name)
+            self.created += 1
+
+        self.__hooks[channel_id] = hook
+        return hook
+
+    async def prefetch_guild(self, bot: discord.Client, guild: discord.Guild, create_recent: bool = False) -> int:
+        """
+        Learn every one of our webhooks within a guild, using a single request.
+
+        :param bot: The bot, used to make any requests.
+        :type bot: discord.Client
+        :param guild: The guild to prefetch.
+        :type guild: discord.Guild
+        :param create_recent: Whether to also create webhooks for recently proxied to channels still without one.
+        :type create_recent: bool
+        :return: How many channels' webhooks were learned (or created).
+        :rtype: int
+        """
+        try:
+            hooks = await bot.http.guild_webhooks(guild.id)
+        except discord.HTTPException as e: # most likely missing the Manage Webhooks permission
+            print(f"Failed to prefetch webhooks for guild {guild.id}! ({e!r})")
+            return 0
+        self.__guilds.add(guild.id)
+
+        learned = 0
+        for hook in hooks:
+            # webhooks created by other bots (or users) don't come with a token, and aren't ours to use anyway.
+            if hook.get("name", None) != self.webhook_name or not hook.get("token") or not hook.get("channel_id"):
+                continue
+            channel_id = int(hook["channel_id"])
+            if channel_id not in self.__hooks:
+                self.__hooks[channel_id] = hook
+                learned += 1
+
+        if create_recent:
+            for channel_id in list(self.__recent):
+                if channel_id in self.__hooks or guild.get_channel(channel_id) is None:
+                    continue
+                try:
+                    await self.resolve(bot, channel_id)
+                except discord.HTTPException as e:
+                    print(f"Failed to create a webhook in channel {channel_id}! ({e!r})")
+                    continue
+                learned += 1
+        return learned
+
+    async def prefetch(self, bot: discord.Client, guilds: list[discord.Guild], create_recent: bool = False) -> int:
+        """
+        Prefetch several guilds one after another, so as not to burst into the rate limits.
+
+        :return: How many channels' webhooks were learned (or created).
+        :rtype: int
+        """
+        learned = 0
+        for guild in guilds:
+            learned += await self.prefetch_guild(bot, guild, create_recent)
+        return learned
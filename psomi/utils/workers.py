@@ -0,0 +1,155 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+from psomi.utils.metrics import Metrics
+
+
+class ChannelWorkers:
+    """
+    One FIFO queue (and worker) per channel, so that messages proxied within the same channel are sent in the order
+    they were received, while different channels are still proxied in parallel.
+
+    Workers are only started for channels with something queued, and stop again once their channel has been idle for a
+    while.
+    """
+    def __init__(
+            self,
+            metrics: Metrics | None = None,
+            max_queue: int = 100,
+            idle_timeout: float = 30.0
+    ):
+        """
+        :param metrics: Where to record how long jobs spent queued, if anywhere.
+        :type metrics: Metrics | None
+        :param max_queue: How many jobs a single channel may have queued before any more are rejected.
+        :type max_queue: int
+        :param idle_timeout: How long (in seconds) a channel's worker waits for another job before stopping.
+        :type idle_timeout: float
+        """
+        self.metrics = metrics
+        self.max_queue = max_queue
+        self.idle_timeout = idle_timeout
+        self.__queues: dict[int, asyncio.Queue] = {} # channel id -> queued jobs
+        self.__workers: dict[int, asyncio.Task] = {} # channel id -> its worker
+        self.__closing = False
+        self.running = 0
+        self.processed = 0
+        self.rejected = 0
+        self.max_depth = 0
+
+    @property
+    def active_channels(self) -> int:
+        """
+        :return: How many channels currently have a worker.
+        :rtype: int
+        """
+        return len(self.__workers)
+
+    @property
+    def depth(self) -> int:
+        """
+        :return: How many jobs are queued (not counting running ones) across every channel.
+        :rtype: int
+        """
+        return sum(_.qsize() for _ in self.__queues.values())
+
+    def channel_depth(self, channel_id: int) -> int:
+        queue = self.__queues.get(channel_id)
+        return queue.qsize() if queue is not None else 0
+
+    async def run(self, channel_id: int, job: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Queue a job behind everything else queued within its channel, then wait for it to finish.
+
+        Cancelling the wait before the job started skips it, once it started it runs to completion regardless.
+
+        :param channel_id: The ID of the channel the job belongs to.
+        :type channel_id: int
+        :param job: Called (and awaited) once it's the job's turn.
+        :type job: Callable[[], Awaitable[Any]]
+        :return: Whatever the job returned.
+        :rtype: Any
+
+        :raises asyncio.QueueFull: If the channel already has `max_queue` jobs queued, or the workers are closing.
+        """
+        if self.__closing:
+            self.rejected += 1
+            raise asyncio.QueueFull()
+
+        queue = self.__queues.get(channel_id)
+        if queue is None:
+            queue = self.__queues[channel_id] = asyncio.Queue(self.max_queue)
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            queue.put_nowait((job, future, time.perf_counter_ns()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise
+        self.max_depth = max(self.max_depth, queue.qsize())
+
+        if channel_id not in self.__workers:
+            self.__workers[channel_id] = asyncio.create_task(self.__work(channel_id, queue))
+        return await future
+
+    async def __work(self, channel_id: int, queue: asyncio.Queue):
+        while True:
+            try:
+                job, future, queued_at = await asyncio.wait_for(queue.get(), self.idle_timeout)
+            except TimeoutError:
+                # nothing's changed between timing out and here (no awaits), so nothing can sneak into the queue.
+                if queue.empty():
+                    self.__queues.pop(channel_id, None)
+                    self.__workers.pop(channel_id, None)
+                    return
+                continue
+
+            if future.done(): # whoever queued it stopped waiting, so don't bother
+                continue
+            if self.metrics is not None:
+                self.metrics.observe("proxy_queue", "wait", queued_at)
+
+            self.running += 1
+            try:
+                result = await job()
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except BaseException as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.running -= 1
+                self.processed += 1
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """
+        Stop accepting jobs, give whatever is still queued a little while to finish, then cancel the rest.
+
+        :param timeout: How long (in seconds) to wait for queued jobs.
+        :type timeout: float
+        """
+        self.__closing = True
+        workers = list(self.__workers.values())
+        if not workers:
+            return
+
+        deadline = time.monotonic() + timeout
+        while (self.running or self.depth) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        # anyone still waiting on a job that never ran shouldn't wait forever.
+        for queue in self.__queues.values():
+            while not queue.empty():
+                _, future, _ = queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+        self.__queues.clear()
+        self.__workers.clear()